@@ -0,0 +1,81 @@
+import os
+import threading
+
+from instrumentation import REGISTRY, Counter
+
+# Requests each endpoint may serve at once per server process. Endpoints not
+# listed (diseases, algorithms, job status, model versions, metrics) are cheap
+# and never limited. Each limit can be overridden with an environment
+# variable such as MEDICOMPARE_LIMIT_COMPARE=2.
+DEFAULT_ENDPOINT_LIMITS = {
+    'train': 2,
+    'compare': 1,
+    'search': 1,
+    'append_dataset_rows': 1,
+    'predict': 8,
+    'create_job': 4,
+    # Event streams hold their connection for the whole job
+    'stream_job_events': 8
+}
+
+# Seconds clients are asked to wait before retrying a rejected request
+ADMISSION_RETRY_AFTER = 5
+
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    'medicompare_admission_rejected_total',
+    'Requests rejected because their endpoint was at its concurrency limit',
+    ['endpoint']
+))
+
+class AdmissionRejectedError(Exception):
+    """Raised when an endpoint is at its concurrency limit"""
+
+def endpoint_limits():
+    """Return the concurrency limit of every limited endpoint, with environment overrides applied"""
+    return {
+        endpoint: int(os.environ.get(f"MEDICOMPARE_LIMIT_{endpoint.upper()}", limit))
+        for endpoint, limit in DEFAULT_ENDPOINT_LIMITS.items()
+    }
+
+class ConcurrencyLimiter:
+    """
+    Non-blocking cap on the number of requests an endpoint serves at once
+
+    A request over the limit is not queued: try_acquire fails immediately so
+    the caller can be told to retry later, instead of tying up a server
+    thread while it waits.
+    """
+
+    def __init__(self, endpoint, limit):
+        self.endpoint = endpoint
+        self.limit = limit
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._active
+
+    def try_acquire(self):
+        """Take a slot if one is free; returns whether the request was admitted"""
+        with self._lock:
+            if self._active >= self.limit:
+                admitted = False
+            else:
+                self._active += 1
+                admitted = True
+        if not admitted:
+            ADMISSION_REJECTED.inc(endpoint=self.endpoint)
+        return admitted
+
+    def acquire(self):
+        """Take a slot, raising AdmissionRejectedError if none is free"""
+        if not self.try_acquire():
+            raise AdmissionRejectedError(
+                f"Too many concurrent {self.endpoint} requests (limit {self.limit}); retry later"
+            )
+
+    def release(self):
+        """Give back a slot taken by try_acquire"""
+        with self._lock:
+            self._active -= 1
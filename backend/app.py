@@ -1,15 +1,35 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-import joblib
 import os
 import json
-from models.model_factory import create_model, train_model, evaluate_model
-from data.data_processor import load_data, preprocess_data, split_data
+import time
+import socket
+import threading
+from models.executor import (run_training_tasks, fit_and_evaluate_stored, fit_and_evaluate_streaming,
+                             fit_and_evaluate_fold, shutdown_executor, CANCELLED, TIMED_OUT)
+from models.model_factory import INCREMENTAL_ALGORITHMS, ALGORITHM_COMPLEXITY, evaluate_model, summarize_fold_metrics
+from models.incremental import UPDATE_METHODS, DEFAULT_DRIFT_THRESHOLD, feature_drift, appended_split, update_model
+from models.result_cache import ResultCache, make_key
+from models.search import run_search, DEFAULT_SEARCH_SPACES
+from models.registry import ModelRegistry, ModelNotFoundError, predict_batch
+from models.artifact_store import ArtifactStore
+from data.data_processor import load_data, dataset_hash, dataset_rows, append_rows
+from data.dataset_store import materialize, materialize_folds, open_pipeline, open_store, DEFAULT_STORE_DIR
+from data.pipeline import fit_pipeline, DISEASE_SCHEMAS
+from data.streaming import fit_pipeline_streaming, dataset_stats, DEFAULT_CHUNK_SIZE
+from jobs import JobManager, QueueFullError
+from single_flight import SingleFlight, make_flight_key
+from work_queue import WorkQueue
+from admission import ConcurrencyLimiter, AdmissionRejectedError, endpoint_limits, ADMISSION_RETRY_AFTER
+from http_encoding import NegotiatingJSONProvider, compress_response
+from instrumentation import (REGISTRY, Gauge, HTTP_REQUESTS, HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT,
+                             RESULT_CACHE_LOOKUPS, stage, collect_stages)
 
 app = Flask(__name__)
-CORS(app)
+# Responses are JSON, or MessagePack for clients that send Accept: application/msgpack
+app.json = NegotiatingJSONProvider(app)
+# Let the browser client read ETags to revalidate the metadata it caches
+CORS(app, expose_headers=['ETag'])
 
 # Available diseases and their datasets
 DISEASES = {
@@ -32,131 +52,1134 @@ ALGORITHMS = [
     'logistic_regression',
     'random_forest',
     'svm',
-    'neural_network'
+    'neural_network',
+    'sgd_logistic_regression',
+    'sgd_linear_svm',
+    'incremental_neural_network',
+    'naive_bayes',
+    'hist_gradient_boosting',
+    'linear_svm',
+    'nystroem_kernel',
+    'parallel_random_forest'
 ]
 
+# Number of worker processes used to fit models (None uses one per CPU core)
+N_WORKERS = int(os.environ.get('MEDICOMPARE_WORKERS', 0)) or None
+
+# Wall-clock seconds and resident memory (MB) a single train/compare/search fit
+# may use before it is stopped, unless a request sets its own budgets; None is
+# unlimited. Only fits with a limit run in a process of their own; the others
+# share the worker pool.
+DEFAULT_TIME_BUDGET_SECONDS = float(os.environ.get('MEDICOMPARE_TIME_BUDGET_SECONDS', 0)) or None
+DEFAULT_MEMORY_BUDGET_MB = float(os.environ.get('MEDICOMPARE_MEMORY_BUDGET_MB', 0)) or None
+
+# Most configurations a search may sample per algorithm
+MAX_SEARCH_CANDIDATES = 243
+
+# Background training jobs: how many run at once and how many may be queued
+job_manager = JobManager(
+    max_workers=int(os.environ.get('MEDICOMPARE_JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('MEDICOMPARE_MAX_PENDING_JOBS', 16))
+)
+
+# Seconds clients are asked to wait before retrying when the job queue is full
+JOB_RETRY_AFTER = 5
+
+REGISTRY.register(Gauge(
+    'medicompare_jobs_pending',
+    'Background jobs queued or running',
+    function=lambda: job_manager.pending
+))
+
+# Cache of evaluation metrics keyed by dataset contents and request parameters
+result_cache = ResultCache()
+
+# Directory of the preprocessed dataset stores fits memory-map
+dataset_store_dir = DEFAULT_STORE_DIR
+
+# Versioned store of trained models, written in the background
+artifact_store = ArtifactStore()
+
+# Trained models kept resident for /api/predict
+model_registry = ModelRegistry(artifact_store)
+
+# Per-endpoint caps on concurrent requests; requests over a cap get a 429
+limiters = {endpoint: ConcurrencyLimiter(endpoint, limit) for endpoint, limit in endpoint_limits().items()}
+
+# Identical train/compare requests arriving while one is running share its result
+train_flights = SingleFlight('train')
+compare_flights = SingleFlight('compare')
+
+# Endpoints admitted inside their single-flight group rather than before the
+# request, so requests joining a run in flight don't need a slot of their own
+COALESCED_ENDPOINTS = ('train', 'compare')
+
+# Shared directory queue of comparison units run by compare_worker.py processes on any node
+work_queue = WorkQueue()
+
+# Seconds between checks of a distributed comparison's finished units
+DISTRIBUTED_POLL_SECONDS = 1
+
+# Seconds a distributed comparison waits for a worker to claim its first unit
+# before giving up on it as timed out (no compare_worker.py is running)
+DISTRIBUTED_START_SECONDS = float(os.environ.get('MEDICOMPARE_DISTRIBUTED_START_SECONDS', 60))
+
+# Seconds counted towards a distributed comparison's deadline for each unit
+# whose algorithm has no time budget
+DISTRIBUTED_UNIT_SECONDS = 900
+
+# Pipelines fitted on the current datasets, for models saved without their own pipeline
+_pipelines = {}
+
+def _get_pipeline(disease):
+    """Return the preprocessing pipeline fitted on the current dataset for a disease"""
+    data_hash = _dataset_hash(disease)
+    cached = _pipelines.get(disease)
+    if cached is None or cached[0] != data_hash:
+        with stage('pipeline_fit', disease):
+            cached = (data_hash, fit_pipeline(load_data(DISEASES[disease]['filename'], disease), disease))
+        _pipelines[disease] = cached
+    return cached[1]
+
+def _dataset_hash(disease):
+    """Return the content hash of a disease dataset, creating the sample file if needed"""
+    filename = DISEASES[disease]['filename']
+    if not os.path.exists(filename):
+        load_data(filename)
+    return dataset_hash(filename)
+
+def _dataset_rows(disease):
+    """Return the number of rows of a disease dataset, creating the sample file if needed"""
+    filename = DISEASES[disease]['filename']
+    if not os.path.exists(filename):
+        load_data(filename)
+    return dataset_rows(filename)
+
+# Streaming-mode pipelines and target classes, keyed by disease and refitted when the dataset changes
+_streaming_pipelines = {}
+
+def _get_streaming_pipeline(disease, chunk_size):
+    """Return the pipeline and target classes computed in one chunked pass over a dataset"""
+    data_hash = _dataset_hash(disease)
+    cached = _streaming_pipelines.get(disease)
+    if cached is None or cached[0] != data_hash:
+        with stage('pipeline_fit', disease):
+            cached = (data_hash, fit_pipeline_streaming(DISEASES[disease]['filename'], disease, chunk_size))
+        _streaming_pipelines[disease] = cached
+    return cached[1]
+
+# Running statistics of each dataset, kept up to date as rows are appended
+_dataset_stats = {}
+
+# Appends to a dataset, and the model updates that follow them, run one at a time per disease
+_dataset_locks = {disease: threading.Lock() for disease in DISEASES}
+
+def _get_dataset_stats(disease):
+    """Return the running statistics of the current dataset for a disease"""
+    data_hash = _dataset_hash(disease)
+    cached = _dataset_stats.get(disease)
+    if cached is None or cached[0] != data_hash:
+        with stage('pipeline_fit', disease):
+            cached = (data_hash, dataset_stats(DISEASES[disease]['filename'], disease))
+        _dataset_stats[disease] = cached
+    return cached[1]
+
+def _run_training(diseases, algorithms, test_size, random_state, save_models=False, on_result=None, streaming=None,
+                  cv_folds=None, budgets=None, should_cancel=None):
+    """
+    Train and evaluate every (disease, algorithm) pair, reusing cached results
+    
+    Args:
+        diseases: List of disease identifiers
+        algorithms: List of algorithm identifiers
+        test_size: Proportion of the dataset to include in the test split
+        random_state: Random seed for reproducibility
+        save_models: Whether to save each trained model to models/
+        on_result: Optional callback called as on_result(disease, algorithm, metrics)
+            as soon as each pair's result is available, or as
+            on_result(disease, algorithm, None, status) when a pair is stopped
+        streaming: Optional dict with 'chunk_size' and 'epochs' to train
+            incremental algorithms out of core instead of in memory
+        cv_folds: Optional number of folds to cross-validate with instead of
+            a single hold-out split; fold models are evaluated but not saved
+        budgets: Optional dictionary mapping each algorithm to the 'seconds'
+            and 'memory_mb' one of its fits may use; fits then run in their own
+            processes and are killed when they go over budget
+        should_cancel: Optional callable; unfinished budgeted fits are killed
+            once it returns True
+        
+    Returns:
+        metrics_by_pair: Dictionary mapping (disease, algorithm) to its metrics
+            for every pair that finished
+        stopped: Dictionary mapping each pair that was stopped to why
+            ('timed_out', 'memory_exceeded' or 'cancelled')
+    """
+    metrics_by_pair = {}
+    stopped = {}
+    pending = {}
+    save_models = save_models and not cv_folds
+    
+    for disease in diseases:
+        data_hash = _dataset_hash(disease)
+        for algo in algorithms:
+            key = make_key(data_hash, disease, algo, test_size, random_state, streaming=streaming, cv_folds=cv_folds)
+            cached = result_cache.get(key)
+            # A saving run still has to train unless the saved model came from this exact run
+            if cached is not None and (not save_models or _saved_run_key(disease, algo) == key):
+                RESULT_CACHE_LOOKUPS.inc(result='hit')
+                metrics_by_pair[(disease, algo)] = cached
+                if on_result is not None:
+                    on_result(disease, algo, cached)
+            else:
+                RESULT_CACHE_LOOKUPS.inc(result='miss')
+                pending.setdefault(disease, {})[algo] = key
+    
+    def _record(disease, algo, key, metrics):
+        result_cache.set(key, metrics)
+        metrics_by_pair[(disease, algo)] = metrics
+        if on_result is not None:
+            on_result(disease, algo, metrics)
+    
+    def _stop(disease, algo, status):
+        # Stopped runs are neither cached nor saved
+        if (disease, algo) in stopped:
+            return
+        stopped[(disease, algo)] = status
+        if on_result is not None:
+            on_result(disease, algo, None, status)
+    
+    if cv_folds:
+        _run_cross_validation(pending, random_state, cv_folds, _record, budgets, should_cancel, _stop)
+        return metrics_by_pair, stopped
+    
+    # Only prepare the datasets that have cache misses. In memory, workers
+    # memory-map the preprocessed store; in streaming mode they read the CSV in chunks.
+    tasks = []
+    task_keys = []
+    n_rows = {}
+    for disease, algo_keys in pending.items():
+        if streaming:
+            pipeline, classes = _get_streaming_pipeline(disease, streaming['chunk_size'])
+            for algo, key in algo_keys.items():
+                tasks.append((algo, random_state, DISEASES[disease]['filename'], pipeline, classes,
+                              test_size, streaming['chunk_size'], streaming['epochs']))
+                task_keys.append((disease, algo, key, lambda pipeline=pipeline: pipeline))
+        else:
+            path = materialize(disease, DISEASES[disease]['filename'], dataset_store_dir)
+            n_rows[disease] = len(open_store(path)[1])
+            for algo, key in algo_keys.items():
+                tasks.append((algo, random_state, path, test_size))
+                task_keys.append((disease, algo, key, lambda path=path: open_pipeline(path)))
+    
+    def _finish(index, outcome):
+        disease, algo, key, get_pipeline = task_keys[index]
+        trained_model, metrics = outcome
+        if save_models:
+            _save_model(disease, algo, trained_model, get_pipeline(), {
+                'run_key': key,
+                'metrics': metrics,
+                'dataset_hash': _dataset_hash(disease),
+                'n_rows': n_rows.get(disease),
+                'params': {'test_size': test_size, 'random_state': random_state, 'streaming': streaming}
+            })
+        _record(disease, algo, key, metrics)
+    
+    def _abort(index, status):
+        disease, algo, _, _ = task_keys[index]
+        _stop(disease, algo, status)
+    
+    stage_labels = [{'disease': disease, 'algorithm': algo} for disease, algo, _, _ in task_keys]
+    task_budgets = [budgets[algo] for _, algo, _, _ in task_keys] if budgets is not None else None
+    run_training_tasks(tasks, N_WORKERS, return_models=save_models,
+                       task_fn=fit_and_evaluate_streaming if streaming else fit_and_evaluate_stored,
+                       on_result=_finish, stage_labels=stage_labels, budgets=task_budgets,
+                       should_cancel=should_cancel, on_abort=_abort)
+    
+    return metrics_by_pair, stopped
+
+def _save_model(disease, algo, model, pipeline, metadata):
+    """Queue a trained model and its pipeline as a new version in the artifact store"""
+    artifact_store.save_async(disease, algo, model, pipeline, metadata)
+
+def _saved_run_key(disease, algo):
+    """Return the cache key of the training run that produced the latest saved model, if any"""
+    latest = artifact_store.latest_version(disease, algo)
+    return latest.get('run_key') if latest is not None else None
+
+def _run_cross_validation(pending, random_state, cv_folds, record, budgets=None, should_cancel=None, stop=None):
+    """
+    Fit every (disease, fold, algorithm) triple of a cross-validation run in one parallel batch
+    
+    Fold indices and per-fold scaled matrices are computed once per dataset
+    and cached next to its store, and all fits share the same worker pool,
+    so k folds cost about k fits spread over the available cores.
+    
+    Args:
+        pending: Dictionary mapping disease to {algorithm: cache key} for uncached pairs
+        random_state: Random seed for the folds and the models
+        cv_folds: Number of folds
+        record: Callback called as record(disease, algorithm, key, metrics) once
+            every fold of a pair has finished
+        budgets: Optional dictionary mapping each algorithm to the budget of one fold fit
+        should_cancel: Optional callable; unfinished budgeted fits are killed once it returns True
+        stop: Optional callback called as stop(disease, algorithm, status) when
+            a fold of a pair is stopped, which leaves the pair without metrics
+    """
+    tasks = []
+    task_keys = []
+    for disease, algo_keys in pending.items():
+        folds_path = materialize_folds(disease, DISEASES[disease]['filename'], cv_folds, random_state,
+                                       dataset_store_dir)
+        for algo, key in algo_keys.items():
+            for fold in range(cv_folds):
+                tasks.append((algo, random_state, folds_path, fold))
+                task_keys.append((disease, algo, key))
+    
+    fold_metrics = {}
+    
+    def _finish(index, outcome):
+        disease, algo, key = task_keys[index]
+        completed = fold_metrics.setdefault((disease, algo), [])
+        completed.append(outcome[1])
+        if len(completed) == cv_folds:
+            record(disease, algo, key, summarize_fold_metrics(completed))
+    
+    def _abort(index, status):
+        disease, algo, _ = task_keys[index]
+        if stop is not None:
+            stop(disease, algo, status)
+    
+    run_training_tasks(tasks, N_WORKERS, return_models=False, task_fn=fit_and_evaluate_fold, on_result=_finish,
+                       stage_labels=[{'disease': disease, 'algorithm': algo} for disease, algo, _ in task_keys],
+                       budgets=[budgets[algo] for _, algo, _ in task_keys] if budgets is not None else None,
+                       should_cancel=should_cancel, on_abort=_abort)
+
+def _run_distributed(diseases, algorithms, test_size, seeds, budgets, on_result=None, should_cancel=None):
+    """
+    Run every (disease, algorithm, seed) unit on the workers sharing work_queue, reusing cached results
+    
+    Uncached units are submitted as one sweep and fitted by compare_worker.py
+    processes; this process only waits for their results and aggregates them.
+    
+    Args:
+        diseases: List of disease identifiers
+        algorithms: List of algorithm identifiers
+        test_size: Proportion of the dataset to include in the test split
+        seeds: List of random seeds; each pair is evaluated once per seed
+        budgets: Dictionary mapping each algorithm to the 'seconds' and
+            'memory_mb' one of its fits may use
+        on_result: Optional callback, called as in _run_training once all
+            seeds of a pair are in
+        should_cancel: Optional callable; the sweep is cancelled once it returns True
+        
+    The sweep is given up as timed out if no worker claims a unit within
+    DISTRIBUTED_START_SECONDS, or once it has run for as long as one worker
+    needs to fit every unit back to back within its time budget.
+        
+    Returns:
+        metrics_by_pair: Dictionary mapping (disease, algorithm) to its metrics
+            for every pair that finished. With several seeds these are the
+            mean metrics across seeds, with their standard deviations under
+            'std' and the seeds under 'seeds'.
+        stopped: Dictionary mapping each pair that didn't finish to why
+            ('timed_out', 'memory_exceeded', 'cancelled' or 'failed')
+    """
+    metrics_by_pair = {}
+    stopped = {}
+    # (status, metrics) of each seed of each pair
+    outcomes = {(disease, algo): {} for disease in diseases for algo in algorithms}
+    units = []
+    unit_keys = {}
+    datasets = {}
+    
+    for disease in diseases:
+        data_hash = _dataset_hash(disease)
+        for algo in algorithms:
+            for seed in seeds:
+                key = make_key(data_hash, disease, algo, test_size, seed, streaming=None, cv_folds=None)
+                cached = result_cache.get(key)
+                if cached is not None:
+                    RESULT_CACHE_LOOKUPS.inc(result='hit')
+                    outcomes[(disease, algo)][seed] = ('completed', cached)
+                    continue
+                RESULT_CACHE_LOOKUPS.inc(result='miss')
+                if disease not in datasets:
+                    datasets[disease] = work_queue.add_dataset(disease, DISEASES[disease]['filename'], data_hash)
+                unit_id = f"{disease}.{algo}.{seed}"
+                units.append({'id': unit_id, 'disease': disease, 'algorithm': algo, 'seed': seed})
+                unit_keys[unit_id] = (disease, algo, seed, key)
+    
+    def _finish_ready():
+        for pair, seed_outcomes in outcomes.items():
+            if pair in metrics_by_pair or pair in stopped or len(seed_outcomes) < len(seeds):
+                continue
+            statuses = [status for status, _ in seed_outcomes.values() if status != 'completed']
+            if statuses:
+                stopped[pair] = statuses[0]
+                if on_result is not None:
+                    on_result(*pair, None, statuses[0])
+                continue
+            if len(seeds) == 1:
+                metrics = seed_outcomes[seeds[0]][1]
+            else:
+                metrics = summarize_fold_metrics([seed_outcomes[seed][1] for seed in seeds])
+                del metrics['cv_folds']
+                metrics['seeds'] = list(seeds)
+            metrics_by_pair[pair] = metrics
+            if on_result is not None:
+                on_result(*pair, metrics)
+    
+    _finish_ready()
+    if not units:
+        return metrics_by_pair, stopped
+    
+    sweep_id = work_queue.submit({'test_size': test_size, 'budgets': budgets, 'datasets': datasets}, units)
+    submitted = time.monotonic()
+    deadline = submitted + DISTRIBUTED_START_SECONDS + sum(
+        budgets[unit['algorithm']]['seconds'] or DISTRIBUTED_UNIT_SECONDS for unit in units
+    )
+    claimed = False
+    try:
+        collected = set()
+        while len(collected) < len(units):
+            now = time.monotonic()
+            if not claimed:
+                claimed = work_queue.counts(sweep_id)['pending'] < len(units)
+            status = None
+            if should_cancel is not None and should_cancel():
+                status = CANCELLED
+            elif now > deadline or (not claimed and now - submitted > DISTRIBUTED_START_SECONDS):
+                status = TIMED_OUT
+            if status is not None:
+                work_queue.cancel(sweep_id)
+                for disease, algo, seed, _ in unit_keys.values():
+                    outcomes[(disease, algo)].setdefault(seed, (status, None))
+                break
+            time.sleep(DISTRIBUTED_POLL_SECONDS)
+            
+            for unit_id, result in work_queue.results(sweep_id).items():
+                if unit_id in collected:
+                    continue
+                collected.add(unit_id)
+                disease, algo, seed, key = unit_keys[unit_id]
+                if result['status'] == 'completed':
+                    result_cache.set(key, result['metrics'])
+                outcomes[(disease, algo)][seed] = (result['status'], result.get('metrics'))
+            _finish_ready()
+        _finish_ready()
+    finally:
+        work_queue.purge(sweep_id)
+    
+    return metrics_by_pair, stopped
+
+def _streaming_params(data):
+    """Read the optional streaming-mode settings of a request"""
+    if not data.get('streaming'):
+        return None
+    return {
+        'chunk_size': int(data.get('chunk_size', DEFAULT_CHUNK_SIZE)),
+        'epochs': int(data.get('epochs', 5))
+    }
+
+def _algorithm_params(data, streaming):
+    """Read the requested algorithms, keeping only those usable in the requested mode"""
+    available = INCREMENTAL_ALGORITHMS if streaming else ALGORITHMS
+    return [algo for algo in dict.fromkeys(data.get('algorithms', available)) if algo in available]
+
+def _cv_folds_param(data):
+    """Read the optional number of cross-validation folds of a request"""
+    cv_folds = data.get('cv_folds')
+    return int(cv_folds) if cv_folds else None
+
+def _number_or_per_algorithm(value, algorithms, default):
+    """Read a setting given either as one number or as a dictionary of numbers per algorithm"""
+    if isinstance(value, dict):
+        return {algo: float(value[algo]) if value.get(algo) else default for algo in algorithms}
+    return {algo: float(value) if value else default for algo in algorithms}
+
+def _budget_params(data, algorithms):
+    """
+    Read the per-algorithm fit budgets of a request
+    
+    time_budget_seconds and memory_budget_mb may each be one number applied
+    to every algorithm or a dictionary of numbers per algorithm; algorithms
+    without a value get the server defaults.
+    """
+    seconds = _number_or_per_algorithm(data.get('time_budget_seconds'), algorithms, DEFAULT_TIME_BUDGET_SECONDS)
+    memory_mb = _number_or_per_algorithm(data.get('memory_budget_mb'), algorithms, DEFAULT_MEMORY_BUDGET_MB)
+    return {algo: {'seconds': seconds[algo], 'memory_mb': memory_mb[algo]} for algo in algorithms}
+
+def _seeds_param(data, random_state):
+    """Read the random seeds a distributed comparison is repeated with (default: just random_state)"""
+    return [int(seed) for seed in dict.fromkeys(data.get('seeds') or [random_state])]
+
+def _params_error(params):
+    """Return why a request's parameters cannot be run together, or None if they can"""
+    if params.get('n_candidates') is not None and not 1 <= params['n_candidates'] <= MAX_SEARCH_CANDIDATES:
+        return f'n_candidates must be between 1 and {MAX_SEARCH_CANDIDATES}'
+    if params.get('distributed'):
+        if params['streaming'] or params['cv_folds']:
+            return 'distributed comparisons support neither streaming nor cv_folds'
+    elif params.get('seeds', [params.get('random_state')]) != [params.get('random_state')]:
+        return 'seeds requires distributed'
+    if params.get('cv_folds') is None:
+        return None
+    if params['cv_folds'] < 2:
+        return 'cv_folds must be at least 2'
+    if params['streaming']:
+        return 'cv_folds is not supported in streaming mode'
+    return None
+
+def _train_params(data):
+    """Read the parameters of a single-disease training request"""
+    streaming = _streaming_params(data)
+    algorithms = _algorithm_params(data, streaming)
+    return {
+        'disease': data.get('disease'),
+        'algorithms': algorithms,
+        'test_size': float(data.get('test_size', 0.2)),
+        'random_state': int(data.get('random_state', 42)),
+        'streaming': streaming,
+        'cv_folds': _cv_folds_param(data),
+        'budgets': _budget_params(data, algorithms),
+        'timings': bool(data.get('timings'))
+    }
+
+def _compare_params(data):
+    """Read the parameters of a multi-disease comparison request"""
+    streaming = _streaming_params(data)
+    algorithms = _algorithm_params(data, streaming)
+    random_state = int(data.get('random_state', 42))
+    return {
+        'diseases': [disease for disease in dict.fromkeys(data.get('diseases', DISEASES)) if disease in DISEASES],
+        'algorithms': algorithms,
+        'test_size': float(data.get('test_size', 0.2)),
+        'random_state': random_state,
+        'streaming': streaming,
+        'cv_folds': _cv_folds_param(data),
+        'budgets': _budget_params(data, algorithms),
+        'distributed': bool(data.get('distributed')),
+        'seeds': _seeds_param(data, random_state),
+        'timings': bool(data.get('timings'))
+    }
+
+def _search_params(data):
+    """Read the parameters of a hyperparameter search request"""
+    spaces = data.get('spaces') or {}
+    algorithms = data.get('algorithms', list(spaces) or list(DEFAULT_SEARCH_SPACES))
+    budget_seconds = data.get('budget_seconds')
+    spaces = {algo: spaces.get(algo, DEFAULT_SEARCH_SPACES[algo]) for algo in algorithms if algo in DEFAULT_SEARCH_SPACES}
+    return {
+        'disease': data.get('disease'),
+        'spaces': spaces,
+        'budget_seconds': float(budget_seconds) if budget_seconds else None,
+        'n_candidates': int(data.get('n_candidates', 27)),
+        'eta': int(data.get('eta', 3)),
+        'metric': data.get('metric', 'accuracy'),
+        'test_size': float(data.get('test_size', 0.2)),
+        'random_state': int(data.get('random_state', 42)),
+        'budgets': _budget_params(data, list(spaces)),
+        'save_models': bool(data.get('save_models', True))
+    }
+
+def _search_response(params, on_result=None, should_cancel=None):
+    """Run a successive-halving search on one disease and build the /api/search response"""
+    disease = params['disease']
+    path = materialize(disease, DISEASES[disease]['filename'], dataset_store_dir)
+    
+    results, models = run_search(
+        disease, _dataset_hash(disease), path, params['spaces'],
+        test_size=params['test_size'], random_state=params['random_state'],
+        budget_seconds=params['budget_seconds'], n_candidates=params['n_candidates'],
+        eta=params['eta'], metric=params['metric'], cache=result_cache, n_workers=N_WORKERS,
+        budgets=params['budgets'], should_cancel=should_cancel
+    )
+    
+    entries = []
+    for algo, result in results.items():
+        if algo in models and params['save_models']:
+            _save_model(disease, algo, models[algo], open_pipeline(path), {
+                'metrics': result['metrics'],
+                'dataset_hash': _dataset_hash(disease),
+                'n_rows': len(open_store(path)[1]),
+                'params': dict(result['best_params'], test_size=params['test_size'],
+                               random_state=params['random_state']),
+                'search': {'metric': params['metric'], 'best_score': result['best_score']}
+            })
+        if on_result is not None and 'metrics' in result:
+            on_result(disease, algo, result['metrics'])
+        entries.append(dict(_format_result(algo, result.get('metrics'), result.get('status', 'completed')), **{
+            name: value for name, value in result.items() if name not in ('metrics', 'status')
+        }))
+    
+    return {
+        'disease': disease,
+        'disease_name': disease.replace('_', ' ').title(),
+        'metric': params['metric'],
+        'results': entries
+    }
+
+def _train_response(params, on_result=None, should_cancel=None):
+    """Train every requested algorithm on one disease and build the /api/train response"""
+    disease = params['disease']
+    algorithms = params['algorithms']
+    
+    # Train and evaluate each requested algorithm, reusing cached results
+    with collect_stages() as stages:
+        metrics_by_pair, stopped = _run_training(
+            [disease], algorithms, params['test_size'], params['random_state'], save_models=True,
+            on_result=on_result, streaming=params['streaming'], cv_folds=params['cv_folds'],
+            budgets=params['budgets'], should_cancel=should_cancel
+        )
+    
+    response = {
+        'disease': disease,
+        'disease_name': disease.replace('_', ' ').title(),
+        'results': [
+            _format_result(algo, metrics_by_pair.get((disease, algo)), stopped.get((disease, algo), 'completed'))
+            for algo in algorithms
+        ]
+    }
+    if params['timings']:
+        response['timings'] = stages.summary()
+    return response
+
+def _compare_response(params, on_result=None, should_cancel=None):
+    """Train every requested (disease, algorithm) pair and build the /api/compare response"""
+    diseases = params['diseases']
+    algorithms = params['algorithms']
+    
+    # Fan out every uncached (disease, algorithm) pair over the worker pool,
+    # or over the compare workers sharing the queue directory
+    with collect_stages() as stages:
+        if params['distributed']:
+            metrics_by_pair, stopped = _run_distributed(
+                diseases, algorithms, params['test_size'], params['seeds'], params['budgets'],
+                on_result=on_result, should_cancel=should_cancel
+            )
+        else:
+            metrics_by_pair, stopped = _run_training(
+                diseases, algorithms, params['test_size'], params['random_state'], on_result=on_result,
+                streaming=params['streaming'], cv_folds=params['cv_folds'], budgets=params['budgets'],
+                should_cancel=should_cancel
+            )
+    
+    all_results = {}
+    
+    for disease in diseases:
+        all_results[disease] = {
+            'disease_name': disease.replace('_', ' ').title(),
+            'results': [
+                _format_result(algo, metrics_by_pair.get((disease, algo)), stopped.get((disease, algo), 'completed'))
+                for algo in algorithms
+            ]
+        }
+    
+    if params['timings']:
+        # Keyed by disease id, so the timings can't sit next to the diseases
+        return {'results': all_results, 'timings': stages.summary()}
+    
+    return all_results
+
+def _append_params(data):
+    """Read the parameters of a request appending rows to a dataset"""
+    rows = data.get('rows') or []
+    return {
+        # Accept a single record as well as a list of records
+        'rows': [rows] if isinstance(rows, dict) else rows,
+        'algorithms': [algo for algo in dict.fromkeys(data.get('algorithms', ALGORITHMS)) if algo in ALGORITHMS],
+        'drift_threshold': float(data.get('drift_threshold', DEFAULT_DRIFT_THRESHOLD))
+    }
+
+def _append_response(disease, params):
+    """Append rows to a dataset, update its statistics and bring its saved models up to date"""
+    filename = DISEASES[disease]['filename']
+    
+    with _dataset_locks[disease]:
+        stats = _get_dataset_stats(disease)
+        with stage('append', disease):
+            stats.update(append_rows(filename, params['rows'], disease))
+        
+        # Only the new rows were read, so refresh every cached pipeline from the merged statistics
+        data_hash = _dataset_hash(disease)
+        pipeline = stats.pipeline()
+        _dataset_stats[disease] = (data_hash, stats)
+        _pipelines[disease] = (data_hash, pipeline)
+        _streaming_pipelines[disease] = (data_hash, (pipeline, stats.classes))
+        
+        artifact_store.flush()
+        dataset = {}
+        entries = []
+        for algo in params['algorithms']:
+            entry = _update_saved_model(disease, algo, pipeline, params['drift_threshold'], dataset)
+            entries.append(dict(_format_result(algo, entry.pop('metrics', None)), **entry))
+    
+    response = {
+        'disease': disease,
+        'appended_rows': len(params['rows']),
+        'total_rows': stats.n_rows,
+        'dataset_hash': data_hash,
+        'results': entries,
+        'retrain_job': None
+    }
+    
+    # Models the data has drifted away from get a full retrain in the background
+    drifted = [entry['algorithm'] for entry in entries if entry['status'] == 'retrain_required']
+    if drifted:
+        try:
+            job = _submit_job('train', _train_params({'disease': disease, 'algorithms': drifted}),
+                              len(drifted), _train_response)
+        except QueueFullError:
+            return response
+        response['retrain_job'] = _job_links(job)
+        for entry in entries:
+            if entry['status'] == 'retrain_required':
+                entry['status'] = 'retrain_scheduled'
+    
+    return response
+
+def _update_saved_model(disease, algo, pipeline, drift_threshold, dataset):
+    """
+    Update the latest saved model of a pair with the rows it has not seen yet
+    
+    Args:
+        disease: Disease identifier
+        algo: Algorithm identifier
+        pipeline: FeaturePipeline of the dataset including the new rows
+        drift_threshold: Largest feature drift still handled in place
+        dataset: Dictionary shared across calls, caching the loaded dataset
+            and its transform by each model pipeline
+        
+    Returns:
+        Dictionary with the update 'status' ('updated', 'retrain_required'
+        or 'skipped'), the model's 'drift' and its new 'metrics', or the
+        'reason' it was skipped
+    """
+    version = artifact_store.latest_version(disease, algo, include_pending=False)
+    if version is None:
+        return {'status': 'skipped', 'reason': 'No trained model'}
+    
+    model, reference = artifact_store.load(version, mmap=False)
+    if reference is None:
+        return {'status': 'skipped', 'reason': 'Model was saved without its preprocessing pipeline'}
+    drift = feature_drift(reference, pipeline)
+    if drift is None or drift > drift_threshold:
+        return {'status': 'retrain_required', 'drift': drift}
+    
+    split_params = version.get('params') or {}
+    if algo not in UPDATE_METHODS:
+        return {'status': 'skipped', 'drift': drift, 'reason': f"{algo} models can't be updated incrementally"}
+    if version.get('n_rows') is None or split_params.get('streaming'):
+        return {'status': 'skipped', 'drift': drift, 'reason': 'Model was saved without the row split it was trained on'}
+    
+    if 'df' not in dataset:
+        with stage('read_csv', disease):
+            dataset['df'] = load_data(DISEASES[disease]['filename'], disease)
+    df = dataset['df']
+    if version['pipeline'] not in dataset:
+        with stage('pipeline_transform', disease):
+            dataset[version['pipeline']] = reference.transform(df)
+    X = dataset[version['pipeline']]
+    y = df[DISEASE_SCHEMAS[disease]['target']].to_numpy()
+    
+    base_rows = version.get('base_rows', version['n_rows'])
+    train_idx, test_idx = appended_split(base_rows, len(df), split_params['test_size'], split_params['random_state'])
+    new_idx = train_idx[train_idx >= version['n_rows']]
+    try:
+        with stage('update', disease, algo):
+            update_model(algo, model, X, y, train_idx, new_idx)
+    except ValueError as e:
+        return {'status': 'skipped', 'drift': drift, 'reason': str(e)}
+    
+    metrics = evaluate_model(model, X[test_idx], y[test_idx])
+    _save_model(disease, algo, model, reference, {
+        'metrics': metrics,
+        'dataset_hash': _dataset_hash(disease),
+        'n_rows': len(df),
+        'base_rows': base_rows,
+        'params': split_params,
+        'update': {'method': UPDATE_METHODS[algo], 'rows': len(new_idx), 'drift': drift}
+    })
+    return {'status': 'updated', 'drift': drift, 'metrics': metrics}
+
+def _flight_key(params, diseases):
+    """Key identifying a train/compare run by its parameters and the contents of its datasets"""
+    return make_flight_key(params=params, datasets=[_dataset_hash(disease) for disease in diseases])
+
+def _submit_job(kind, params, total, build_response):
+    """Queue build_response(params) as a background job reporting each finished result"""
+    def run(job):
+        def report(disease, algo, metrics, status='completed'):
+            job.report(dict(_format_result(algo, metrics, status), disease=disease))
+        return build_response(params, on_result=report, should_cancel=job.cancel_requested.is_set)
+    
+    return job_manager.submit(kind, params, total, run)
+
+def _job_links(job):
+    """Describe a queued job and where to follow it"""
+    return {
+        'id': job.id,
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.id}',
+        'events_url': f'/api/jobs/{job.id}/events'
+    }
+
+def shutdown():
+    """
+    Stop taking jobs and wait for queued and running ones, then for pending model writes
+    
+    Called by the server (see serve.py) when a worker exits, so a restart
+    never drops training that was already accepted.
+    """
+    job_manager.shutdown(wait=True)
+    artifact_store.flush()
+    shutdown_executor()
+
+def _format_result(algo, metrics, status='completed'):
+    """Build the JSON entry describing one trained algorithm (metrics is None if it was stopped)"""
+    return {
+        'algorithm': algo,
+        'algorithm_name': algo.replace('_', ' ').title(),
+        'status': status,
+        'metrics': metrics
+    }
+
+def _disconnect_probe():
+    """
+    Return a callable telling whether the client of the current request has hung up
+    
+    The request's socket is peeked without blocking: a closed connection
+    reads as end of file. Returns None when the server doesn't expose the
+    socket or the platform can't peek without blocking.
+    """
+    sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+    if sock is None or not hasattr(socket, 'MSG_DONTWAIT'):
+        return None
+    
+    def disconnected():
+        try:
+            return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+        except BlockingIOError:
+            return False
+        except ValueError:
+            # TLS sockets can't be peeked
+            return False
+        except OSError:
+            return True
+    
+    return disconnected
+
+def _flight_cancel(flights, key):
+    """Cancellation check of a coalesced request: its client hung up and no other client is waiting"""
+    disconnected = _disconnect_probe()
+    if disconnected is None:
+        return None
+    return lambda: disconnected() and flights.followers(key) == 0
+
+@app.before_request
+def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or 'unknown'
+    HTTP_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+@app.before_request
+def _admit_request():
+    limiter = limiters.get(request.endpoint)
+    if limiter is None or request.endpoint in COALESCED_ENDPOINTS:
+        return None
+    try:
+        limiter.acquire()
+    except AdmissionRejectedError as e:
+        return _rejected(e)
+    g.admitted_by = limiter
+    return None
+
+def _rejected(error):
+    """429 response for a request turned away by admission control"""
+    return jsonify({'error': str(error)}), 429, {'Retry-After': str(ADMISSION_RETRY_AFTER)}
+
+@app.after_request
+def _record_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.after_request
+def _compress_response(response):
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
+def _revalidated(response):
+    """
+    Tag a metadata response with an ETag and answer 304 if the client already has it
+    
+    Clients may cache the response but must revalidate it on every use, so
+    dataset changes (e.g. appended rows) show up immediately while an
+    unchanged list costs only a 304 without a body.
+    """
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.teardown_request
+def _finish_request_metrics(error=None):
+    if 'admitted_by' in g:
+        g.pop('admitted_by').release()
+    if 'request_started' not in g:
+        return
+    endpoint = g.metrics_endpoint
+    HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=g.get('response_status', 500))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose counters and histograms in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/diseases', methods=['GET'])
 def get_diseases():
     """Return the list of available diseases for analysis"""
-    return jsonify({
+    return _revalidated(jsonify({
         'diseases': [
             {
                 'id': key,
                 'name': key.replace('_', ' ').title(),
-                'description': value['description']
+                'description': value['description'],
+                'rows': _dataset_rows(key)
             } for key, value in DISEASES.items()
         ]
-    })
+    }))
 
 @app.route('/api/algorithms', methods=['GET'])
 def get_algorithms():
-    """Return the list of available ML algorithms"""
-    return jsonify({
+    """Return the list of available ML algorithms and how their training cost scales"""
+    return _revalidated(jsonify({
         'algorithms': [
             {
                 'id': algo,
-                'name': algo.replace('_', ' ').title()
+                'name': algo.replace('_', ' ').title(),
+                'complexity': ALGORITHM_COMPLEXITY[algo]
             } for algo in ALGORITHMS
         ]
-    })
+    }))
 
 @app.route('/api/train', methods=['POST'])
 def train():
     """Train and compare multiple models on a disease dataset"""
-    data = request.json
-    disease = data.get('disease')
-    algorithms = data.get('algorithms', ALGORITHMS)
-    test_size = float(data.get('test_size', 0.2))
-    random_state = int(data.get('random_state', 42))
+    params = _train_params(request.json)
     
-    if disease not in DISEASES:
-        return jsonify({'error': f'Disease {disease} not found'}), 404
+    if params['disease'] not in DISEASES:
+        return jsonify({'error': f"Disease {params['disease']} not found"}), 404
+    error = _params_error(params)
+    if error:
+        return jsonify({'error': error}), 400
     
     try:
-        # Load and preprocess the data
-        df = load_data(DISEASES[disease]['filename'])
-        X, y = preprocess_data(df, disease)
-        X_train, X_test, y_train, y_test = split_data(X, y, test_size, random_state)
-        
-        results = []
-        
-        # Train and evaluate each requested algorithm
-        for algo in algorithms:
-            if algo not in ALGORITHMS:
-                continue
-                
-            model = create_model(algo, random_state)
-            trained_model = train_model(model, X_train, y_train)
-            
-            # Evaluate the model
-            metrics = evaluate_model(trained_model, X_test, y_test)
-            
-            # Save the model
-            model_filename = f"models/{disease}_{algo}.joblib"
-            joblib.dump(trained_model, model_filename)
-            
-            results.append({
-                'algorithm': algo,
-                'algorithm_name': algo.replace('_', ' ').title(),
-                'metrics': metrics
-            })
-        
-        return jsonify({
-            'disease': disease,
-            'disease_name': disease.replace('_', ' ').title(),
-            'results': results
-        })
-        
+        key = _flight_key(params, [params['disease']])
+        should_cancel = _flight_cancel(train_flights, key)
+        return jsonify(train_flights.do(key, lambda: _train_response(params, should_cancel=should_cancel),
+                                        limiter=limiters.get('train')))
+    
+    except AdmissionRejectedError as e:
+        return _rejected(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/compare', methods=['POST'])
 def compare():
     """Compare model performance across multiple diseases and algorithms"""
-    data = request.json
-    diseases = data.get('diseases', list(DISEASES.keys()))
-    algorithms = data.get('algorithms', ALGORITHMS)
-    test_size = float(data.get('test_size', 0.2))
-    random_state = int(data.get('random_state', 42))
+    params = _compare_params(request.json)
+    error = _params_error(params)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        key = _flight_key(params, params['diseases'])
+        should_cancel = _flight_cancel(compare_flights, key)
+        return jsonify(compare_flights.do(key, lambda: _compare_response(params, should_cancel=should_cancel),
+                                          limiter=limiters.get('compare')))
+    
+    except AdmissionRejectedError as e:
+        return _rejected(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search', methods=['POST'])
+def search():
+    """Tune hyperparameters of several algorithms on a disease dataset with successive halving"""
+    params = _search_params(request.json)
+    
+    if params['disease'] not in DISEASES:
+        return jsonify({'error': f"Disease {params['disease']} not found"}), 404
+    error = _params_error(params)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        return jsonify(_search_response(params))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/datasets/<disease>/rows', methods=['POST'])
+def append_dataset_rows(disease):
+    """Append new records to a disease dataset and update its trained models incrementally"""
+    if disease not in DISEASES:
+        return jsonify({'error': f'Disease {disease} not found'}), 404
     
     try:
-        all_results = {}
+        return jsonify(_append_response(disease, _append_params(request.json or {})))
         
-        for disease in diseases:
-            if disease not in DISEASES:
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a train or compare run in the background and return its job id"""
+    data = request.json or {}
+    kind = data.get('type', 'compare')
+    
+    if kind == 'train':
+        params = _train_params(data)
+        if params['disease'] not in DISEASES:
+            return jsonify({'error': f"Disease {params['disease']} not found"}), 404
+        total = len(params['algorithms'])
+        build_response = _train_response
+    elif kind == 'compare':
+        params = _compare_params(data)
+        total = len(params['diseases']) * len(params['algorithms'])
+        build_response = _compare_response
+    elif kind == 'search':
+        params = _search_params(data)
+        if params['disease'] not in DISEASES:
+            return jsonify({'error': f"Disease {params['disease']} not found"}), 404
+        total = len(params['spaces'])
+        build_response = _search_response
+    else:
+        return jsonify({'error': f'Unknown job type {kind}'}), 400
+    error = _params_error(params)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        job = _submit_job(kind, params, total, build_response)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(JOB_RETRY_AFTER)}
+    
+    return jsonify(_job_links(job)), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return the status and partial results of a background job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a background job; a running job keeps the results it already has"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    
+    if not job.done:
+        job.cancel()
+    return jsonify(_job_links(job)), 202
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Stream the progress of a background job as Server-Sent Events"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    
+    # Resume after the last event the client received, if it reconnects
+    last_event_id = request.headers.get('Last-Event-ID')
+    after = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    
+    def format_event(event):
+        return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    def generate(after):
+        while True:
+            events = job.wait_for_events(after, timeout=15)
+            if not events:
+                final = job.events[-1] if job.done and job.events else None
+                if final is not None and final['event'] in ('completed', 'failed', 'cancelled'):
+                    # The client reconnected after the end (EventSource does so
+                    # by itself): repeat the final status so it can stop
+                    yield format_event(final)
+                    return
+                yield ': keep-alive\n\n'
                 continue
-                
-            # Load and preprocess the data
-            df = load_data(DISEASES[disease]['filename'])
-            X, y = preprocess_data(df, disease)
-            X_train, X_test, y_train, y_test = split_data(X, y, test_size, random_state)
-            
-            disease_results = []
-            
-            # Train and evaluate each requested algorithm
-            for algo in algorithms:
-                if algo not in ALGORITHMS:
-                    continue
-                    
-                model = create_model(algo, random_state)
-                trained_model = train_model(model, X_train, y_train)
-                
-                # Evaluate the model
-                metrics = evaluate_model(trained_model, X_test, y_test)
-                
-                disease_results.append({
-                    'algorithm': algo,
-                    'algorithm_name': algo.replace('_', ' ').title(),
-                    'metrics': metrics
-                })
-            
-            all_results[disease] = {
-                'disease_name': disease.replace('_', ' ').title(),
-                'results': disease_results
-            }
+            for event in events:
+                yield format_event(event)
+                after = event['id'] + 1
+                if event['event'] in ('completed', 'failed', 'cancelled'):
+                    return
+    
+    return Response(stream_with_context(generate(after)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/models/<disease>/<algorithm>/versions', methods=['GET'])
+def list_model_versions(disease, algorithm):
+    """List the stored versions of a trained model, newest first"""
+    if disease not in DISEASES:
+        return jsonify({'error': f'Disease {disease} not found'}), 404
+    if algorithm not in ALGORITHMS:
+        return jsonify({'error': f'Algorithm {algorithm} not found'}), 404
+    
+    latest = artifact_store.latest_version_id(disease, algorithm)
+    return jsonify({
+        'disease': disease,
+        'algorithm': algorithm,
+        'latest': latest,
+        'versions': artifact_store.versions(disease, algorithm)
+    })
+
+@app.route('/api/predict', methods=['POST'])
+def predict():
+    """Score a batch of raw patient records with a trained model"""
+    data = request.json
+    disease = data.get('disease')
+    algorithm = data.get('algorithm')
+    records = data.get('records')
+    version = data.get('version')
+    
+    if disease not in DISEASES:
+        return jsonify({'error': f'Disease {disease} not found'}), 404
+    if algorithm not in ALGORITHMS:
+        return jsonify({'error': f'Algorithm {algorithm} not found'}), 404
+    
+    # Accept a single record as well as a list of records
+    if isinstance(records, dict):
+        records = [records]
+    if not records or not isinstance(records, list):
+        return jsonify({'error': 'records must be a record or a non-empty list of records'}), 400
+    
+    try:
+        model, pipeline = model_registry.get(disease, algorithm, version)
+        if pipeline is None:
+            pipeline = _get_pipeline(disease)
+        X = pipeline.transform_records(records)
+        predictions, probabilities = predict_batch(model, X)
         
-        return jsonify(all_results)
+        return jsonify({
+            'disease': disease,
+            'algorithm': algorithm,
+            'predictions': predictions,
+            'probabilities': probabilities
+        })
         
+    except ModelNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
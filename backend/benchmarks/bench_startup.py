@@ -0,0 +1,123 @@
+"""
+Benchmark cold start of the Flask API and the Streamlit app
+
+Each run starts a fresh interpreter and measures the time until the first
+request is answered: for the Flask app, importing app.py and serving
+GET /api/diseases through the test client; for the Streamlit app, the first
+full run of streamlit_app.py through streamlit.testing. Wall time includes
+interpreter startup. The median over all runs is reported.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --save-baseline
+    python -m benchmarks.bench_startup --compare
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import importlib.util
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.common import add_report_arguments, report
+
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, 'benchmarks', 'startup_baseline.json')
+
+FLASK_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/diseases')
+assert response.status_code == 200, response.status_code
+answered = time.perf_counter()
+print(json.dumps({'import': imported - start, 'first_request': answered - imported}))
+"""
+
+STREAMLIT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file('streamlit_app.py', default_timeout=120).run()
+assert not app.exception, app.exception
+answered = time.perf_counter()
+print(json.dumps({'import': imported - start, 'first_request': answered - imported}))
+"""
+
+TARGETS = {
+    'flask': (FLASK_SCRIPT, BACKEND_DIR),
+    'streamlit': (STREAMLIT_SCRIPT, REPO_DIR)
+}
+
+def _streamlit_available():
+    return importlib.util.find_spec('streamlit') is not None
+
+def measure(target):
+    """
+    Start a fresh interpreter for a target and time it until the first request is served
+
+    Returns:
+        Dictionary of stage timings in seconds, including the 'total' wall time
+    """
+    script, cwd = TARGETS[target]
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', script], cwd=cwd, capture_output=True, text=True)
+    total = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(f"{target} startup failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total'] = total
+    return timings
+
+def run_benchmarks(targets, runs):
+    """
+    Measure every target `runs` times
+
+    Returns:
+        List of records with the median seconds of each (target, stage)
+    """
+    records = []
+    for target in targets:
+        samples = [measure(target) for _ in range(runs)]
+        for stage in ('import', 'first_request', 'total'):
+            records.append({
+                'target': target,
+                'stage': stage,
+                'seconds': statistics.median(sample[stage] for sample in samples),
+                'runs': runs
+            })
+    return records
+
+def _record_key(record):
+    return f"{record['target']}|{record['stage']}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters started per target')
+    add_report_arguments(parser, DEFAULT_BASELINE)
+    args = parser.parse_args(argv)
+
+    targets = args.targets
+    if 'streamlit' in targets and not _streamlit_available():
+        print('streamlit is not installed; skipping the Streamlit app')
+        targets = [target for target in targets if target != 'streamlit']
+
+    records = run_benchmarks(targets, args.runs)
+    for record in records:
+        print(f"  {record['target']:<10} {record['stage']:<14} {record['seconds']:>8.3f}s")
+
+    return report(records, args, _record_key, digits=3)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Benchmark the /api/train path on synthetic datasets of increasing size
+
+Datasets are produced by data.synthetic with the sample-data schemas.
+
+Every stage of the training path (load, preprocess, split, fit, evaluate,
+save and the HTTP endpoint itself) is timed for each disease and algorithm,
+with wall time, throughput and peak RSS recorded. Results can be saved as a
+baseline and later runs compared against it, so regressions show up before
+deploy.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_train --sizes 1000 100000
+    python -m benchmarks.bench_train --sizes 1000 --save-baseline
+    python -m benchmarks.bench_train --sizes 1000 --compare
+
+Each (size, disease) case runs in a fresh process. Peak RSS is the
+process high-water mark after each stage, so it shows which stage first
+pushes memory to its peak.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.model_factory import ALGORITHM_COMPLEXITY
+from benchmarks.common import add_report_arguments, report
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, 'benchmarks', 'baseline.json')
+DEFAULT_SIZES = [1000, 100000]
+DISEASES = ['diabetes', 'brain_stroke', 'heart_disease']
+ALGORITHMS = ['logistic_regression', 'random_forest', 'svm', 'neural_network']
+
+# Algorithms whose fit time grows too fast to run above these sizes by default
+# (the same sizes the API reports to clients as slow)
+SLOW_ALGORITHM_LIMITS = {
+    algo: info['max_rows'] for algo, info in ALGORITHM_COMPLEXITY.items() if info['max_rows'] is not None
+}
+
+def _peak_rss_mb():
+    """High-water mark of this process's resident set size, in megabytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+def generate_dataset(disease, n_rows, path, positive_rate=0.5):
+    """Write a synthetic dataset with the sample-data schema in streamed chunks"""
+    from data.synthetic import write_dataset
+    write_dataset(disease, path, n_rows, positive_rate=positive_rate)
+
+class _StageRecorder:
+    def __init__(self, size, disease):
+        self.size = size
+        self.disease = disease
+        self.records = []
+
+    def run(self, stage, fn, rows, algorithm=None):
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        self.records.append({
+            'size': self.size,
+            'disease': self.disease,
+            'algorithm': algorithm,
+            'stage': stage,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds > 0 else None,
+            'peak_rss_mb': _peak_rss_mb()
+        })
+        return result
+
+def run_case(size, disease, algorithms, csv_path, work_dir, http):
+    """
+    Time every stage of the training path for one dataset size and disease
+
+    Returns:
+        List of timing records
+    """
+    from data.data_processor import load_data
+    from data.pipeline import fit_pipeline, DISEASE_SCHEMAS
+    from data.dataset_store import materialize
+    from models.executor import _split_indices
+    from models.model_factory import create_model, train_model, evaluate_model
+    from models.artifact_store import ArtifactStore
+
+    recorder = _StageRecorder(size, disease)
+
+    df = recorder.run('load', lambda: load_data(csv_path, disease), size)
+    # The frame is bound as a default so it can be released below
+    pipeline = recorder.run('preprocess_fit', lambda df=df: fit_pipeline(df, disease), size)
+    X = recorder.run('preprocess_transform', lambda df=df: pipeline.transform(df), size)
+    y = df[DISEASE_SCHEMAS[disease]['target']].to_numpy()
+    del df
+
+    store_dir = os.path.join(work_dir, 'store')
+    recorder.run('materialize_store', lambda: materialize(disease, csv_path, store_dir), size)
+
+    def split():
+        train_idx, test_idx = _split_indices(len(X), 0.2, 42)
+        return X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+    X_train, X_test, y_train, y_test = recorder.run('split', split, size)
+
+    store = ArtifactStore(os.path.join(work_dir, 'artifacts'))
+    for algo in algorithms:
+        model = recorder.run('fit', lambda: train_model(create_model(algo, 42), X_train, y_train), len(X_train), algo)
+        recorder.run('evaluate', lambda: evaluate_model(model, X_test, y_test), len(X_test), algo)
+        recorder.run('save', lambda: store.save(disease, algo, model, pipeline), size, algo)
+
+    if http:
+        recorder.records.extend(_run_http(size, disease, algorithms, csv_path, work_dir))
+
+    return recorder.records
+
+def _run_http(size, disease, algorithms, csv_path, work_dir):
+    """Time POST /api/train end to end, cold and then served from the result cache"""
+    import app as backend_app
+    from models.result_cache import ResultCache
+    from models.artifact_store import ArtifactStore
+    from models.registry import ModelRegistry
+
+    # Point the app at the synthetic dataset and keep its writes inside work_dir
+    backend_app.DISEASES[disease]['filename'] = csv_path
+    backend_app.dataset_store_dir = os.path.join(work_dir, 'http_store')
+    backend_app.result_cache = ResultCache(os.path.join(work_dir, 'results'))
+    backend_app.artifact_store = ArtifactStore(os.path.join(work_dir, 'artifacts'))
+    backend_app.model_registry = ModelRegistry(backend_app.artifact_store)
+    os.chdir(work_dir)
+
+    recorder = _StageRecorder(size, disease)
+    client = backend_app.app.test_client()
+    payload = {'disease': disease, 'algorithms': algorithms}
+
+    for stage in ('http_train_cold', 'http_train_cached'):
+        response = recorder.run(stage, lambda: client.post('/api/train', json=payload), size)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/train failed: {response.get_json()}")
+
+    return recorder.records
+
+def _case_worker(queue, *args):
+    try:
+        queue.put(('ok', run_case(*args)))
+    except Exception as e:
+        queue.put(('error', repr(e)))
+
+def run_benchmarks(sizes, diseases, algorithms, http=True, apply_limits=True, data_dir=None, positive_rate=0.5):
+    """
+    Run every (size, disease) case in its own process
+
+    Returns:
+        List of timing records
+    """
+    # Only a directory created here is removed afterwards; a --data-dir is kept for reuse
+    created_data_dir = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix='medicompare-bench-')
+    context = multiprocessing.get_context('spawn')
+    records = []
+
+    try:
+        for size in sizes:
+            for disease in diseases:
+                case_algorithms = [
+                    algo for algo in algorithms
+                    if not apply_limits or size <= SLOW_ALGORITHM_LIMITS.get(algo, size)
+                ]
+                skipped = sorted(set(algorithms) - set(case_algorithms))
+                if skipped:
+                    print(f"[{size} rows] {disease}: skipping {', '.join(skipped)} (too slow at this size)")
+
+                csv_path = os.path.join(data_dir, f"{disease}_{size}.csv")
+                if not os.path.exists(csv_path):
+                    print(f"[{size} rows] {disease}: generating dataset")
+                    generate_dataset(disease, size, csv_path, positive_rate)
+
+                work_dir = tempfile.mkdtemp(dir=data_dir)
+                queue = context.Queue()
+                process = context.Process(
+                    target=_case_worker,
+                    args=(queue, size, disease, case_algorithms, csv_path, work_dir, http)
+                )
+                process.start()
+                status, payload = queue.get()
+                process.join()
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+                if status != 'ok':
+                    raise RuntimeError(f"Benchmark case {disease} @ {size} rows failed: {payload}")
+                records.extend(payload)
+                print_records(payload)
+    finally:
+        if created_data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    return records
+
+def _record_key(record):
+    return f"{record['size']}|{record['disease']}|{record['algorithm'] or '-'}|{record['stage']}"
+
+def print_records(records):
+    for record in records:
+        throughput = f"{record['rows_per_second']:>14,.0f} rows/s" if record['rows_per_second'] else ' ' * 21
+        print(f"  {record['size']:>10,} {record['disease']:<14} {record['algorithm'] or '-':<22} "
+              f"{record['stage']:<22} {record['seconds']:>10.4f}s {throughput} {record['peak_rss_mb']:>9.1f} MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Dataset sizes in rows (e.g. 1000 100000 10000000)')
+    parser.add_argument('--diseases', nargs='+', default=DISEASES, choices=DISEASES)
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS)
+    parser.add_argument('--no-http', action='store_true', help='Skip the end-to-end HTTP stages')
+    parser.add_argument('--no-limits', action='store_true', help='Run slow algorithms at every size')
+    parser.add_argument('--data-dir', help='Keep generated datasets in this directory for reuse')
+    parser.add_argument('--positive-rate', type=float, default=0.5, help='Class balance of the generated datasets')
+    add_report_arguments(parser, DEFAULT_BASELINE)
+    args = parser.parse_args(argv)
+
+    records = run_benchmarks(
+        args.sizes, args.diseases, args.algorithms,
+        http=not args.no_http, apply_limits=not args.no_limits, data_dir=args.data_dir,
+        positive_rate=args.positive_rate
+    )
+
+    return report(records, args, _record_key)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import platform
+
+# Differences below this many seconds are treated as noise when comparing
+NOISE_FLOOR_SECONDS = 0.05
+
+def add_report_arguments(parser, default_baseline):
+    """Add the output, baseline and comparison options every benchmark takes"""
+    parser.add_argument('--output', help='Write the timing records to this JSON file')
+    parser.add_argument('--baseline', default=default_baseline, help='Baseline file to save or compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='Fail if a stage is slower than the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed relative slowdown before a stage counts as a regression')
+
+def compare_to_baseline(records, baseline_records, threshold, record_key):
+    """
+    Compare a run against a stored baseline
+
+    Args:
+        records: Timing records of the current run
+        baseline_records: Timing records loaded from the baseline file
+        threshold: Allowed relative slowdown before a stage counts as a regression
+        record_key: Callable returning the key that matches a record to its baseline
+
+    Returns:
+        List of (key, baseline seconds, current seconds) for every regression
+    """
+    baseline = {record_key(record): record['seconds'] for record in baseline_records}
+    regressions = []
+
+    for record in records:
+        key = record_key(record)
+        if key not in baseline:
+            continue
+        before, after = baseline[key], record['seconds']
+        if after > before * (1 + threshold) and after - before > NOISE_FLOOR_SECONDS:
+            regressions.append((key, before, after))
+
+    return regressions
+
+def report(records, args, record_key, digits=4):
+    """
+    Write, save and compare the records of a run as the report options ask
+
+    Args:
+        records: Timing records of the run
+        args: Parsed arguments with the options of add_report_arguments
+        record_key: Callable returning the key that matches a record to its baseline
+        digits: Decimals of the seconds printed for a regression
+
+    Returns:
+        Exit status: 1 if there is no baseline to compare against or a stage
+        regressed, 0 otherwise
+    """
+    result = {'created_at': time.time(), 'python': platform.python_version(),
+              'machine': platform.machine(), 'cpu_count': os.cpu_count(), 'records': records}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        with open(args.baseline, 'r') as f:
+            baseline_records = json.load(f)['records']
+        regressions = compare_to_baseline(records, baseline_records, args.threshold, record_key)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.{digits}f}s -> {after:.{digits}f}s ({after / before - 1:+.0%})")
+        if regressions:
+            return 1
+        print('No regressions against the baseline')
+
+    return 0
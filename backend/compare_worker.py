@@ -0,0 +1,143 @@
+"""
+Run comparison work units from a shared file-system queue
+
+/api/compare with "distributed": true (directly or as a background job)
+splits the comparison into (disease, algorithm, seed) units and queues them
+under MEDICOMPARE_QUEUE_DIR (see work_queue.py). Start any number of these
+workers, on any nodes that mount the queue directory, to run them. Each
+worker claims one unit at a time, fits and evaluates it within the unit's
+time and memory budget, and writes the metrics back to the queue, where the
+API collects them into the usual /api/compare response.
+
+A worker renews the lease on its unit while the fit runs. If it dies, the
+lease expires and another worker retries the unit; a unit whose fit keeps
+raising is recorded as failed after a few attempts.
+
+Run from the backend directory:
+
+    python compare_worker.py --queue-dir /shared/medicompare-queue
+    python compare_worker.py --exit-when-idle      # drain the queue, then stop
+
+For a local test, start several workers against the same directory as the API.
+"""
+import os
+import sys
+import time
+import shutil
+import socket
+import hashlib
+import argparse
+import tempfile
+import threading
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from work_queue import WorkQueue, DEFAULT_QUEUE_DIR
+
+def default_store_dir(queue_dir, worker_id):
+    """
+    Local directory of a worker's preprocessed dataset stores
+
+    Each worker keeps its own stores, so replacing a store with a newer
+    version of a dataset never removes one that the API server or another
+    worker on the same node is using.
+    """
+    queue_key = hashlib.sha256(os.path.abspath(queue_dir).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), 'medicompare-worker-stores', queue_key, worker_id)
+
+def run_unit(queue, lease, store_dir):
+    """
+    Fit and evaluate one leased unit and record its outcome in the queue
+
+    Args:
+        queue: WorkQueue the unit was claimed from
+        lease: Lease returned by queue.claim
+        store_dir: Directory to materialize the unit's dataset store in
+
+    Returns:
+        Status of the unit ('completed', 'timed_out', 'memory_exceeded',
+        'cancelled', 'lost' when the lease expired, or 'error' if the fit raised)
+    """
+    from data.dataset_store import materialize
+    from models.executor import run_budgeted_task, evaluate_stored, CANCELLED
+
+    unit = lease.unit
+    record = queue.sweep(lease.sweep_id)
+    if record is None:
+        return 'lost'
+    spec = record['spec']
+
+    # Renew the lease a few times per lease period while the fit runs
+    lost = threading.Event()
+    finished = threading.Event()
+
+    def heartbeat():
+        while not finished.wait(record['lease_seconds'] / 3):
+            if not lease.renew():
+                lost.set()
+                return
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    started = time.time()
+    try:
+        store = materialize(unit['disease'], queue.dataset_path(spec['datasets'][unit['disease']]), store_dir)
+        status, metrics = run_budgeted_task(
+            evaluate_stored, (unit['algorithm'], unit['seed'], store, spec['test_size']),
+            budget=spec['budgets'].get(unit['algorithm']),
+            should_cancel=lambda: lost.is_set() or queue.is_cancelled(lease.sweep_id),
+            # A worker runs one unit at a time, so its fit may use every core of the node
+            n_threads=os.cpu_count() or 1
+        )
+    except Exception as e:
+        finished.set()
+        queue.fail(lease, f"{type(e).__name__}: {e}")
+        return 'error'
+    finished.set()
+
+    if lost.is_set():
+        # Another worker owns the unit now
+        return 'lost'
+    if status == CANCELLED and not queue.is_cancelled(lease.sweep_id):
+        return 'lost'
+    queue.complete(lease, {'status': status, 'metrics': metrics, 'seconds': time.time() - started})
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queue-dir', default=DEFAULT_QUEUE_DIR, help='Shared queue directory')
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}",
+                        help='Name recorded on the units this worker runs')
+    parser.add_argument('--poll-seconds', type=float, default=2.0, help='Wait between checks of an empty queue')
+    parser.add_argument('--exit-when-idle', action='store_true', help='Stop once no unit is pending')
+    parser.add_argument('--store-dir', help='Keep preprocessed dataset stores here (default: a temporary '
+                                            'directory of this worker, removed when it exits)')
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(args.queue_dir)
+    store_dir = args.store_dir or default_store_dir(args.queue_dir, args.worker_id)
+    print(f"[{args.worker_id}] watching {os.path.abspath(args.queue_dir)}", flush=True)
+
+    try:
+        while True:
+            lease = queue.claim(args.worker_id)
+            if lease is None:
+                if args.exit_when_idle:
+                    return 0
+                time.sleep(args.poll_seconds)
+                continue
+
+            unit = lease.unit
+            status = run_unit(queue, lease, store_dir)
+            print(f"[{args.worker_id}] {lease.sweep_id} {unit['disease']} {unit['algorithm']} "
+                  f"seed={unit['seed']} attempt={unit['attempts']}: {status}", flush=True)
+    except KeyboardInterrupt:
+        # The lease of an interrupted unit expires and another worker retries it
+        return 130
+    finally:
+        if not args.store_dir:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
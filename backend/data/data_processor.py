@@ -1,31 +1,176 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+import io
 import os
+import hashlib
 
-def load_data(file_path):
+from data.pipeline import DISEASE_SCHEMAS, categorical_dtypes
+
+# Memoized dataset hashes and row counts, keyed by path and invalidated on (mtime, size) changes
+_hash_cache = {}
+_rows_cache = {}
+
+def load_data(file_path, disease_type=None):
     """
     Load a dataset from a CSV file
     
     Args:
         file_path: Path to the CSV file
+        disease_type: Optional disease identifier; when given, the dataset's
+            categorical columns are parsed straight into `category` dtype,
+            which stores each label once instead of once per row
         
     Returns:
         pandas DataFrame containing the dataset
     """
+    dtype = categorical_dtypes(disease_type) if disease_type else None
     try:
-        return pd.read_csv(file_path)
+        return pd.read_csv(file_path, dtype=dtype)
     except FileNotFoundError:
         # If the file doesn't exist, create a sample dataset
-        if 'diabetes' in file_path:
-            return create_sample_diabetes_data()
-        elif 'brain_stroke' in file_path:
-            return create_sample_brain_stroke_data()
-        elif 'heart_disease' in file_path:
-            return create_sample_heart_disease_data()
-        else:
+        sample_disease = next((disease for disease in DISEASE_SCHEMAS if disease in file_path), None)
+        if sample_disease is None:
             raise FileNotFoundError(f"File {file_path} not found and no sample data available.")
+        df = create_sample_data(sample_disease, output_path=file_path)
+        return df.astype(dtype) if dtype else df
+
+def dataset_hash(file_path):
+    """
+    Compute a content hash of a dataset file
+    
+    The hash is memoized per path and only recomputed when the file's
+    modification time or size changes.
+    
+    Args:
+        file_path: Path to the CSV file
+        
+    Returns:
+        Hex digest of the file contents
+    """
+    stat = os.stat(file_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    
+    cached = _hash_cache.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    
+    _hash_cache[file_path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+def dataset_rows(file_path):
+    """
+    Count the data rows of a dataset file without parsing it
+    
+    Like dataset_hash, the count is memoized per path and only recomputed
+    when the file's modification time or size changes.
+    
+    Args:
+        file_path: Path to the CSV file
+        
+    Returns:
+        Number of lines after the header, not counting a trailing empty line
+    """
+    stat = os.stat(file_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    
+    cached = _rows_cache.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    lines = 0
+    last = b'\n'
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    
+    rows = max(lines - 1, 0)
+    _rows_cache[file_path] = (signature, rows)
+    return rows
+
+def _is_number(value):
+    """Whether a raw record value can be stored in a numeric column"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float, np.number)):
+        return True
+    if not isinstance(value, str):
+        return False
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+def _record_error(index, record, columns, target, categorical_cols):
+    """Return why a record can't be appended to a dataset with these columns, or None if it can"""
+    if not isinstance(record, dict):
+        return f"Row {index} is not an object"
+    missing = [col for col in columns if col not in record]
+    if missing:
+        return f"Row {index} is missing {', '.join(missing)}"
+    if record[target] is None or not _is_number(record[target]):
+        return f"Row {index} needs a numeric value for {target}"
+    for col in columns:
+        value = record[col]
+        if col == target or value is None:
+            continue
+        if col in categorical_cols:
+            if not isinstance(value, str):
+                return f"Row {index} has a non-text value for {col}"
+        elif not _is_number(value):
+            return f"Row {index} has a non-numeric value for {col}"
+    return None
+
+def append_rows(file_path, records, disease_type):
+    """
+    Append raw records to the end of a dataset CSV
+    
+    Records are written in the file's column order; keys that are not
+    columns of the file are ignored. Every record must have every column
+    of the file, with a number in the target and numeric feature columns
+    and text in the categorical ones (null marks an unknown feature
+    value). Nothing is written unless all records are valid.
+    
+    Args:
+        file_path: Path to the CSV file
+        records: List of record dictionaries
+        disease_type: String indicating the type of disease dataset
+        
+    Returns:
+        pandas DataFrame of the appended rows, parsed as they will be read back
+    """
+    if not records:
+        raise ValueError("No rows to append")
+    
+    schema = DISEASE_SCHEMAS[disease_type]
+    columns = list(pd.read_csv(file_path, nrows=0).columns)
+    for index, record in enumerate(records):
+        error = _record_error(index, record, columns, schema['target'], schema['categorical_cols'])
+        if error:
+            raise ValueError(error)
+    rows = pd.DataFrame.from_records(records, columns=columns)
+    
+    text = rows.to_csv(header=False, index=False)
+    # Make sure the new rows start on their own line
+    with open(file_path, 'rb') as f:
+        needs_newline = False
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    with open(file_path, 'a', newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        f.write(text)
+    
+    return pd.read_csv(io.StringIO(text), header=None, names=columns)
 
 def preprocess_data(df, disease_type):
     """
@@ -48,6 +193,43 @@ def preprocess_data(df, disease_type):
     else:
         raise ValueError(f"Preprocessing for {disease_type} not implemented")
 
+def _encode_and_impute(df, categorical_cols):
+    """
+    One-hot encode the categorical columns and impute missing values in bulk
+    
+    All categorical columns are converted to `category` dtype and encoded
+    with a single get_dummies call (first level dropped), instead of
+    rebuilding the frame once per column. Numeric columns are then imputed
+    with their means and any remaining columns with their modes, each in one
+    fillna pass.
+    
+    Args:
+        df: pandas DataFrame containing the dataset
+        categorical_cols: Columns to one-hot encode (missing ones are skipped)
+        
+    Returns:
+        Encoded and imputed pandas DataFrame
+    """
+    categorical_cols = [col for col in categorical_cols if col in df.columns]
+    df = df.astype({col: 'category' for col in categorical_cols})
+    df = pd.get_dummies(df, columns=categorical_cols, drop_first=True)
+    
+    numeric = df.select_dtypes(include=['float64', 'int64'])
+    df = df.fillna(numeric.mean())
+    
+    other = df.select_dtypes(exclude=['number', 'bool'])
+    if other.isna().any().any():
+        df = df.fillna(other.mode().iloc[0])
+    
+    return df
+
+def _scale_features(X):
+    """Standardize the features into a contiguous float32 DataFrame"""
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(np.ascontiguousarray(X.to_numpy(dtype=np.float32)))
+    return pd.DataFrame(X_scaled, columns=X.columns, copy=False)
+
 def split_data(X, y, test_size=0.2, random_state=42):
     """
     Split data into training and testing sets
@@ -61,6 +243,7 @@ def split_data(X, y, test_size=0.2, random_state=42):
     Returns:
         X_train, X_test, y_train, y_test: Split datasets
     """
+    from sklearn.model_selection import train_test_split
     return train_test_split(X, y, test_size=test_size, random_state=random_state)
 
 def preprocess_diabetes_data(df):
@@ -89,10 +272,7 @@ def preprocess_diabetes_data(df):
     y = df_processed['Outcome'] if 'Outcome' in df_processed.columns else df_processed.iloc[:, -1]
     
     # Feature scaling
-    scaler = StandardScaler()
-    X_scaled = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
-    
-    return X_scaled, y
+    return _scale_features(X), y
 
 def preprocess_brain_stroke_data(df):
     """
@@ -105,21 +285,9 @@ def preprocess_brain_stroke_data(df):
         X: Features DataFrame
         y: Target Series
     """
-    # Create a copy to avoid modifying the original dataframe
-    df_processed = df.copy()
-    
-    # Handle categorical variables
+    # Encode categorical variables and handle missing values
     categorical_cols = ['gender', 'ever_married', 'work_type', 'Residence_type', 'smoking_status']
-    for col in categorical_cols:
-        if col in df_processed.columns:
-            df_processed = pd.get_dummies(df_processed, columns=[col], drop_first=True)
-    
-    # Handle missing values
-    for col in df_processed.columns:
-        if df_processed[col].dtype in ['float64', 'int64']:
-            df_processed[col] = df_processed[col].fillna(df_processed[col].mean())
-        else:
-            df_processed[col] = df_processed[col].fillna(df_processed[col].mode()[0])
+    df_processed = _encode_and_impute(df, categorical_cols)
     
     # Feature selection
     target_col = 'stroke' if 'stroke' in df_processed.columns else -1
@@ -131,10 +299,7 @@ def preprocess_brain_stroke_data(df):
         y = df_processed.iloc[:, -1]
     
     # Feature scaling
-    scaler = StandardScaler()
-    X_scaled = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
-    
-    return X_scaled, y
+    return _scale_features(X), y
 
 def preprocess_heart_disease_data(df):
     """
@@ -147,21 +312,9 @@ def preprocess_heart_disease_data(df):
         X: Features DataFrame
         y: Target Series
     """
-    # Create a copy to avoid modifying the original dataframe
-    df_processed = df.copy()
-    
-    # Handle categorical variables
+    # Encode categorical variables and handle missing values
     categorical_cols = ['Sex', 'ChestPainType', 'RestingECG', 'ExerciseAngina', 'ST_Slope']
-    for col in categorical_cols:
-        if col in df_processed.columns:
-            df_processed = pd.get_dummies(df_processed, columns=[col], drop_first=True)
-    
-    # Handle missing values
-    for col in df_processed.columns:
-        if df_processed[col].dtype in ['float64', 'int64']:
-            df_processed[col] = df_processed[col].fillna(df_processed[col].mean())
-        else:
-            df_processed[col] = df_processed[col].fillna(df_processed[col].mode()[0])
+    df_processed = _encode_and_impute(df, categorical_cols)
     
     # Feature selection
     target_col = 'HeartDisease' if 'HeartDisease' in df_processed.columns else -1
@@ -173,115 +326,44 @@ def preprocess_heart_disease_data(df):
         y = df_processed.iloc[:, -1]
     
     # Feature scaling
-    scaler = StandardScaler()
-    X_scaled = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
-    
-    return X_scaled, y
+    return _scale_features(X), y
 
-def create_sample_diabetes_data():
-    """Create a sample diabetes dataset"""
-    # Based on Pima Indians Diabetes Database
-    columns = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
-               'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age', 'Outcome']
+def create_sample_data(disease_type, n_samples=100, output_path=None):
+    """
+    Create a sample dataset with a disease's schema
     
-    # Create sample data (100 rows)
-    np.random.seed(42)
-    n_samples = 100
-    
-    data = {
-        'Pregnancies': np.random.randint(0, 17, n_samples),
-        'Glucose': np.random.randint(70, 200, n_samples),
-        'BloodPressure': np.random.randint(40, 120, n_samples),
-        'SkinThickness': np.random.randint(10, 50, n_samples),
-        'Insulin': np.random.randint(15, 250, n_samples),
-        'BMI': np.random.uniform(18, 40, n_samples),
-        'DiabetesPedigreeFunction': np.random.uniform(0.1, 1.5, n_samples),
-        'Age': np.random.randint(21, 80, n_samples),
-        'Outcome': np.random.randint(0, 2, n_samples)
-    }
-    
-    df = pd.DataFrame(data, columns=columns)
+    Every feature column is drawn from the range given in DISEASE_SCHEMAS
+    and the target is a fair coin flip, from a fixed seed.
     
-    # Save the dataset
-    os.makedirs(os.path.dirname('data/diabetes.csv'), exist_ok=True)
-    df.to_csv('data/diabetes.csv', index=False)
+    Args:
+        disease_type: String indicating the type of disease dataset
+        n_samples: Number of rows to generate
+        output_path: Where to save the dataset as CSV (None to skip saving)
+        
+    Returns:
+        pandas DataFrame containing the dataset
+    """
+    schema = DISEASE_SCHEMAS[disease_type]
     
-    return df
-
-def create_sample_brain_stroke_data():
-    """Create a sample brain stroke dataset"""
-    # Define columns based on a typical brain stroke dataset
-    columns = ['gender', 'age', 'hypertension', 'heart_disease', 'ever_married', 
-               'work_type', 'Residence_type', 'avg_glucose_level', 
-               'bmi', 'smoking_status', 'stroke']
-    
-    # Create sample data (100 rows)
+    # Create sample data
     np.random.seed(42)
-    n_samples = 100
-    
-    genders = ['Male', 'Female']
-    married = ['Yes', 'No']
-    work_types = ['Private', 'Self-employed', 'Govt_job', 'children', 'Never_worked']
-    residence_types = ['Urban', 'Rural']
-    smoking_statuses = ['formerly smoked', 'never smoked', 'smokes', 'Unknown']
-    
-    data = {
-        'gender': [genders[np.random.randint(0, 2)] for _ in range(n_samples)],
-        'age': np.random.uniform(18, 85, n_samples),
-        'hypertension': np.random.randint(0, 2, n_samples),
-        'heart_disease': np.random.randint(0, 2, n_samples),
-        'ever_married': [married[np.random.randint(0, 2)] for _ in range(n_samples)],
-        'work_type': [work_types[np.random.randint(0, 5)] for _ in range(n_samples)],
-        'Residence_type': [residence_types[np.random.randint(0, 2)] for _ in range(n_samples)],
-        'avg_glucose_level': np.random.uniform(70, 250, n_samples),
-        'bmi': np.random.uniform(15, 45, n_samples),
-        'smoking_status': [smoking_statuses[np.random.randint(0, 4)] for _ in range(n_samples)],
-        'stroke': np.random.randint(0, 2, n_samples)
-    }
-    
-    df = pd.DataFrame(data, columns=columns)
-    
-    # Save the dataset
-    os.makedirs(os.path.dirname('data/brain_stroke.csv'), exist_ok=True)
-    df.to_csv('data/brain_stroke.csv', index=False)
     
-    return df
-
-def create_sample_heart_disease_data():
-    """Create a sample heart disease dataset"""
-    # Define columns based on a typical heart disease dataset
-    columns = ['Age', 'Sex', 'ChestPainType', 'RestingBP', 'Cholesterol', 'FastingBS', 
-               'RestingECG', 'MaxHR', 'ExerciseAngina', 'Oldpeak', 'ST_Slope', 'HeartDisease']
+    data = {}
+    for name, kind, *params in schema['columns']:
+        if kind == 'int':
+            data[name] = np.random.randint(params[0], params[1], n_samples)
+        elif kind == 'uniform':
+            data[name] = np.random.uniform(params[0], params[1], n_samples)
+        else:
+            levels = params[0]
+            data[name] = [levels[np.random.randint(0, len(levels))] for _ in range(n_samples)]
+    data[schema['target']] = np.random.randint(0, 2, n_samples)
     
-    # Create sample data (100 rows)
-    np.random.seed(42)
-    n_samples = 100
-    
-    sex_values = ['M', 'F']
-    chest_pain_types = ['TA', 'ATA', 'NAP', 'ASY']
-    resting_ecg = ['Normal', 'ST', 'LVH']
-    exercise_angina = ['Y', 'N']
-    st_slope = ['Up', 'Flat', 'Down']
-    
-    data = {
-        'Age': np.random.randint(28, 80, n_samples),
-        'Sex': [sex_values[np.random.randint(0, 2)] for _ in range(n_samples)],
-        'ChestPainType': [chest_pain_types[np.random.randint(0, 4)] for _ in range(n_samples)],
-        'RestingBP': np.random.randint(90, 200, n_samples),
-        'Cholesterol': np.random.randint(100, 400, n_samples),
-        'FastingBS': np.random.randint(0, 2, n_samples),
-        'RestingECG': [resting_ecg[np.random.randint(0, 3)] for _ in range(n_samples)],
-        'MaxHR': np.random.randint(60, 200, n_samples),
-        'ExerciseAngina': [exercise_angina[np.random.randint(0, 2)] for _ in range(n_samples)],
-        'Oldpeak': np.random.uniform(0, 5, n_samples),
-        'ST_Slope': [st_slope[np.random.randint(0, 3)] for _ in range(n_samples)],
-        'HeartDisease': np.random.randint(0, 2, n_samples)
-    }
-    
-    df = pd.DataFrame(data, columns=columns)
+    df = pd.DataFrame(data)
     
     # Save the dataset
-    os.makedirs(os.path.dirname('data/heart_disease.csv'), exist_ok=True)
-    df.to_csv('data/heart_disease.csv', index=False)
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        df.to_csv(output_path, index=False)
     
-    return df 
\ No newline at end of file
+    return df
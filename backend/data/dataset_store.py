@@ -0,0 +1,229 @@
+import os
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+from data.data_processor import load_data, dataset_hash
+from data.pipeline import DISEASE_SCHEMAS, fit_pipeline, save_pipeline, load_pipeline
+from instrumentation import stage
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'datasets')
+
+# Bump when the layout or dtype of the stored matrices changes, so stores
+# written by older code are rebuilt
+STORE_VERSION = 2
+
+# Stores opened by this process, keyed by path, so repeated tasks reuse the same mapping
+_open_stores = {}
+
+def store_path(disease, file_path, store_dir=DEFAULT_STORE_DIR):
+    """
+    Return the store directory for the current contents of a dataset file
+
+    Args:
+        disease: String indicating the type of disease dataset
+        file_path: Path to the CSV file
+        store_dir: Root directory of the preprocessed-dataset store
+
+    Returns:
+        Path of the store directory (which may not exist yet)
+    """
+    return os.path.join(store_dir, f"{disease}-{dataset_hash(file_path)[:16]}-v{STORE_VERSION}")
+
+def materialize(disease, file_path, store_dir=DEFAULT_STORE_DIR):
+    """
+    Preprocess a dataset once and write X and y as .npy files
+
+    The fitted FeaturePipeline that produced X is saved alongside it, so
+    models trained from the store can be shipped with the exact transform
+    they expect. The store is keyed by the content hash of the CSV, so it is
+    only rebuilt when the source file changes. Stores for older versions of
+    the same dataset are removed.
+
+    Args:
+        disease: String indicating the type of disease dataset
+        file_path: Path to the CSV file
+        store_dir: Root directory of the preprocessed-dataset store
+
+    Returns:
+        Path of the store directory
+    """
+    if not os.path.exists(file_path):
+        # load_data writes a sample dataset when the file is missing
+        load_data(file_path)
+
+    path = store_path(disease, file_path, store_dir)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return path
+
+    with stage('read_csv', disease):
+        df = load_data(file_path, disease)
+    with stage('pipeline_fit', disease):
+        pipeline = fit_pipeline(df, disease)
+    with stage('pipeline_transform', disease):
+        X = pipeline.transform(df)
+    y = df[DISEASE_SCHEMAS[disease]['target']].to_numpy()
+
+    # Build in a private directory and rename it into place so concurrent
+    # builders never observe a half-written store
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with stage('store_write', disease):
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'X.npy'), np.ascontiguousarray(X))
+        np.save(os.path.join(tmp_path, 'y.npy'), np.ascontiguousarray(y))
+        save_pipeline(pipeline, os.path.join(tmp_path, 'pipeline.joblib'))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({
+                'disease': disease,
+                'dataset_hash': dataset_hash(file_path),
+                'columns': [str(col) for col in pipeline.columns],
+                'n_rows': int(len(X))
+            }, f)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process finished the same build first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    _remove_stale_stores(disease, path, store_dir)
+    return path
+
+def materialize_folds(disease, file_path, n_folds, random_state, store_dir=DEFAULT_STORE_DIR):
+    """
+    Compute stratified k-fold splits once and write the scaled matrices of every fold
+
+    Each fold gets its own FeaturePipeline fitted on its training rows only,
+    so no statistics of the held-out rows leak into the scaling. The folds
+    live inside the dataset's store directory and are keyed by the number of
+    folds and the seed, so repeated cross-validation runs only pay for
+    fitting the models.
+
+    Args:
+        disease: String indicating the type of disease dataset
+        file_path: Path to the CSV file
+        n_folds: Number of folds
+        random_state: Random seed for shuffling the rows before splitting
+        store_dir: Root directory of the preprocessed-dataset store
+
+    Returns:
+        Path of the folds directory, to be read with open_fold
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    path = os.path.join(materialize(disease, file_path, store_dir), f"folds-{n_folds}-{random_state}")
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return path
+
+    with stage('read_csv', disease):
+        df = load_data(file_path, disease)
+    y = df[DISEASE_SCHEMAS[disease]['target']].to_numpy()
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_path)
+    for fold, (train_idx, test_idx) in enumerate(splitter.split(np.zeros(len(y)), y)):
+        train_df = df.iloc[train_idx]
+        with stage('pipeline_fit', disease):
+            pipeline = fit_pipeline(train_df, disease)
+        with stage('pipeline_transform', disease):
+            X_train = pipeline.transform(train_df)
+            X_test = pipeline.transform(df.iloc[test_idx])
+        fold_path = os.path.join(tmp_path, f"fold{fold}")
+        with stage('store_write', disease):
+            os.makedirs(fold_path)
+            np.save(os.path.join(fold_path, 'X_train.npy'), np.ascontiguousarray(X_train))
+            np.save(os.path.join(fold_path, 'X_test.npy'), np.ascontiguousarray(X_test))
+            np.save(os.path.join(fold_path, 'y_train.npy'), np.ascontiguousarray(y[train_idx]))
+            np.save(os.path.join(fold_path, 'y_test.npy'), np.ascontiguousarray(y[test_idx]))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'n_folds': int(n_folds), 'random_state': int(random_state)}, f)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return path
+
+def open_fold(path, fold):
+    """
+    Open the matrices of one fold written by materialize_folds
+
+    Args:
+        path: Folds directory returned by materialize_folds
+        fold: Index of the fold
+
+    Returns:
+        X_train, X_test, y_train, y_test: Read-only arrays backed by memory maps
+    """
+    fold_path = os.path.join(path, f"fold{fold}")
+    return tuple(
+        np.asarray(np.load(os.path.join(fold_path, f"{name}.npy"), mmap_mode='r'))
+        for name in ('X_train', 'X_test', 'y_train', 'y_test')
+    )
+
+def open_store(path, mmap=True):
+    """
+    Open a materialized store
+
+    Args:
+        path: Store directory returned by materialize
+        mmap: Whether to memory-map the arrays instead of reading them
+
+    Returns:
+        X: Feature matrix (read-only memory map when mmap is True)
+        y: Target vector
+        columns: List of feature names
+    """
+    if mmap and path in _open_stores:
+        return _open_stores[path]
+
+    mmap_mode = 'r' if mmap else None
+    X = np.load(os.path.join(path, 'X.npy'), mmap_mode=mmap_mode)
+    y = np.load(os.path.join(path, 'y.npy'), mmap_mode=mmap_mode)
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        columns = json.load(f)['columns']
+
+    if mmap:
+        _open_stores[path] = (X, y, columns)
+    return X, y, columns
+
+def open_pipeline(path):
+    """
+    Load the fitted preprocessing pipeline of a materialized store
+
+    Args:
+        path: Store directory returned by materialize
+
+    Returns:
+        FeaturePipeline that produced the store's feature matrix
+    """
+    return load_pipeline(os.path.join(path, 'pipeline.joblib'))
+
+def load_preprocessed(disease, file_path, store_dir=DEFAULT_STORE_DIR):
+    """
+    Load the preprocessed dataset, building the store if needed
+
+    Args:
+        disease: String indicating the type of disease dataset
+        file_path: Path to the CSV file
+        store_dir: Root directory of the preprocessed-dataset store
+
+    Returns:
+        X: Features DataFrame
+        y: Target Series
+    """
+    X, y, columns = open_store(materialize(disease, file_path, store_dir))
+    return pd.DataFrame(X, columns=columns, copy=False), pd.Series(y)
+
+def _remove_stale_stores(disease, current_path, store_dir):
+    """Delete stores built from older versions of a dataset"""
+    prefix = f"{disease}-"
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if name.startswith(prefix) and not name.endswith('.tmp') and path != current_path:
+            _open_stores.pop(path, None)
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,274 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Column layout of each disease dataset, mirroring the preprocess_*_data functions.
+# 'columns' lists the feature columns in file order with the values the sample
+# and synthetic datasets draw for them: ('int', low, high) integers in
+# [low, high), ('uniform', low, high) floats in [low, high) and ('choice', levels)
+# categorical labels.
+DISEASE_SCHEMAS = {
+    'diabetes': {
+        'target': 'Outcome',
+        'columns': [
+            ('Pregnancies', 'int', 0, 17),
+            ('Glucose', 'int', 70, 200),
+            ('BloodPressure', 'int', 40, 120),
+            ('SkinThickness', 'int', 10, 50),
+            ('Insulin', 'int', 15, 250),
+            ('BMI', 'uniform', 18, 40),
+            ('DiabetesPedigreeFunction', 'uniform', 0.1, 1.5),
+            ('Age', 'int', 21, 80)
+        ],
+        'zero_cols': ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
+    },
+    'brain_stroke': {
+        'target': 'stroke',
+        'columns': [
+            ('gender', 'choice', ['Male', 'Female']),
+            ('age', 'uniform', 18, 85),
+            ('hypertension', 'int', 0, 2),
+            ('heart_disease', 'int', 0, 2),
+            ('ever_married', 'choice', ['Yes', 'No']),
+            ('work_type', 'choice', ['Private', 'Self-employed', 'Govt_job', 'children', 'Never_worked']),
+            ('Residence_type', 'choice', ['Urban', 'Rural']),
+            ('avg_glucose_level', 'uniform', 70, 250),
+            ('bmi', 'uniform', 15, 45),
+            ('smoking_status', 'choice', ['formerly smoked', 'never smoked', 'smokes', 'Unknown'])
+        ],
+        'zero_cols': []
+    },
+    'heart_disease': {
+        'target': 'HeartDisease',
+        'columns': [
+            ('Age', 'int', 28, 80),
+            ('Sex', 'choice', ['M', 'F']),
+            ('ChestPainType', 'choice', ['TA', 'ATA', 'NAP', 'ASY']),
+            ('RestingBP', 'int', 90, 200),
+            ('Cholesterol', 'int', 100, 400),
+            ('FastingBS', 'int', 0, 2),
+            ('RestingECG', 'choice', ['Normal', 'ST', 'LVH']),
+            ('MaxHR', 'int', 60, 200),
+            ('ExerciseAngina', 'choice', ['Y', 'N']),
+            ('Oldpeak', 'uniform', 0, 5),
+            ('ST_Slope', 'choice', ['Up', 'Flat', 'Down'])
+        ],
+        'zero_cols': []
+    }
+}
+
+# The categorical columns are the ones drawn from a set of levels
+for _schema in DISEASE_SCHEMAS.values():
+    _schema['categorical_cols'] = [name for name, kind, *_ in _schema['columns'] if kind == 'choice']
+
+# Feature matrices are produced in single precision: half the memory of
+# float64 and accurate well beyond what the models can use
+FEATURE_DTYPE = np.float32
+
+def categorical_dtypes(disease_type):
+    """
+    Column dtypes that make read_csv parse a dataset's categorical columns as `category`
+
+    Args:
+        disease_type: String indicating the type of disease dataset
+
+    Returns:
+        Dictionary mapping each categorical column to 'category'
+    """
+    return {col: 'category' for col in DISEASE_SCHEMAS[disease_type]['categorical_cols']}
+
+def _numeric_column(df, col):
+    """Read a column as float64, mapping missing or invalid values to NaN"""
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _to_float(value):
+    """Convert a raw record value to float, mapping missing or invalid values to NaN"""
+    if value is None or value == '':
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+class FeaturePipeline:
+    """
+    Fitted preprocessing state for one disease dataset
+
+    Holds the imputation values, the one-hot category vocabulary and the
+    scaler statistics learned from a training frame, so raw patient records
+    can be turned into the exact feature layout the models were trained on.
+    The state is compiled into flat numpy arrays and lookup tables so that
+    transform_records never goes through pandas. Both transforms return
+    C-contiguous FEATURE_DTYPE matrices.
+    """
+
+    def __init__(self, disease, numeric_cols, fill_values, categories, columns, mean, scale):
+        self.disease = disease
+        self.numeric_cols = numeric_cols
+        self.fill_values = fill_values
+        self.categories = categories
+        self.columns = columns
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self._compile()
+
+    def _compile(self):
+        zero_cols = DISEASE_SCHEMAS[self.disease]['zero_cols']
+        self._fill = np.array([self.fill_values[col] for col in self.numeric_cols], dtype=np.float64)
+        self._zero_mask = np.array([col in zero_cols for col in self.numeric_cols], dtype=bool)
+        self._inv_scale = 1.0 / self.scale
+
+        # Map each categorical level straight to its output column
+        self._one_hot = []
+        i = len(self.numeric_cols)
+        for col, levels in self.categories.items():
+            self._one_hot.append((col, i, list(levels), {level: i + k for k, level in enumerate(levels)}))
+            i += len(levels)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if not key.startswith('_')}
+
+    def _finish(self, numeric, X):
+        """Impute, place the numeric block and standardize in place"""
+        numeric[:, self._zero_mask] = np.where(numeric[:, self._zero_mask] == 0, np.nan, numeric[:, self._zero_mask])
+        missing = np.isnan(numeric)
+        if missing.any():
+            np.copyto(numeric, self._fill, where=missing)
+        X[:, :len(self.numeric_cols)] = numeric
+        X -= self.mean.astype(X.dtype)
+        X *= self._inv_scale.astype(X.dtype)
+        return X
+
+    def transform(self, df):
+        """
+        Turn a DataFrame of raw records into a scaled feature matrix
+
+        Args:
+            df: pandas DataFrame of raw records (the target column is ignored)
+
+        Returns:
+            numpy array of shape (n_records, n_features)
+        """
+        n = len(df)
+        X = np.zeros((n, len(self.columns)), dtype=FEATURE_DTYPE)
+        numeric = np.empty((n, len(self.numeric_cols)), dtype=np.float64)
+
+        for j, col in enumerate(self.numeric_cols):
+            numeric[:, j] = _numeric_column(df, col) if col in df.columns else np.nan
+
+        # One-hot encode each categorical column in a single scatter: its
+        # category codes (-1 for the dropped or unknown levels) select the output column
+        rows = np.arange(n)
+        for col, offset, levels, _ in self._one_hot:
+            if col in df.columns and levels:
+                codes = pd.Categorical(df[col], categories=levels).codes
+                known = codes >= 0
+                X[rows[known], offset + codes[known]] = 1
+
+        return self._finish(numeric, X)
+
+    def transform_records(self, records):
+        """
+        Turn raw records (dictionaries) into a scaled feature matrix
+
+        This is the online scoring path: it reads the records directly into
+        a preallocated array without building a DataFrame.
+
+        Args:
+            records: A record dictionary or a list of record dictionaries
+
+        Returns:
+            numpy array of shape (n_records, n_features)
+        """
+        if isinstance(records, dict):
+            records = [records]
+
+        n = len(records)
+        X = np.zeros((n, len(self.columns)), dtype=FEATURE_DTYPE)
+        numeric = np.empty((n, len(self.numeric_cols)), dtype=np.float64)
+
+        for r, record in enumerate(records):
+            numeric[r] = [_to_float(record.get(col)) for col in self.numeric_cols]
+            for col, _, _, index in self._one_hot:
+                i = index.get(record.get(col))
+                if i is not None:
+                    X[r, i] = 1.0
+
+        return self._finish(numeric, X)
+
+def fit_pipeline(df, disease_type):
+    """
+    Learn the preprocessing state for a disease dataset
+
+    Produces the same features as preprocess_data: zeros in the diabetes
+    measurement columns and missing values are imputed with column means,
+    categorical columns are one-hot encoded with the first (sorted) level
+    dropped and appended after the numeric columns, and every feature is
+    standardized.
+
+    The statistics are computed one column at a time in float64, so fitting
+    never materializes a full feature matrix. Categorical columns may be
+    plain strings or `category` dtype (see categorical_dtypes).
+
+    Args:
+        df: pandas DataFrame containing the training dataset
+        disease_type: String indicating the type of disease dataset
+
+    Returns:
+        Fitted FeaturePipeline
+    """
+    if disease_type not in DISEASE_SCHEMAS:
+        raise ValueError(f"Preprocessing for {disease_type} not implemented")
+
+    schema = DISEASE_SCHEMAS[disease_type]
+    categorical_cols = [col for col in schema['categorical_cols'] if col in df.columns]
+    numeric_cols = [col for col in df.columns if col not in categorical_cols and col != schema['target']]
+
+    n_rows = len(df)
+    fill_values = {}
+    means = []
+    stds = []
+    for col in numeric_cols:
+        values = _numeric_column(df, col).copy()
+        if col in schema['zero_cols']:
+            values[values == 0] = np.nan
+        missing = np.isnan(values)
+        fill_values[col] = float(values[~missing].mean()) if not missing.all() else np.nan
+        values[missing] = fill_values[col]
+        # Scaler statistics, computed the same way as StandardScaler
+        means.append(values.mean())
+        stds.append(values.std())
+
+    categories = {}
+    for col in categorical_cols:
+        counts = df[col].value_counts()
+        levels = sorted(counts[counts > 0].index)
+        categories[col] = list(levels[1:])
+        for level in categories[col]:
+            p = counts[level] / n_rows
+            means.append(p)
+            stds.append(np.sqrt(p * (1 - p)))
+
+    columns = list(numeric_cols)
+    for col, levels in categories.items():
+        columns.extend(f"{col}_{level}" for level in levels)
+
+    std = np.asarray(stds, dtype=np.float64)
+    return FeaturePipeline(
+        disease_type, numeric_cols, fill_values, categories, columns,
+        np.asarray(means, dtype=np.float64), np.where(std == 0, 1.0, std)
+    )
+
+def save_pipeline(pipeline, path):
+    """Save a fitted pipeline next to its model"""
+    import joblib
+    joblib.dump(pipeline, path)
+
+def load_pipeline(path):
+    """Load a pipeline saved with save_pipeline"""
+    import joblib
+    return joblib.load(path)
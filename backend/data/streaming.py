@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+from data.pipeline import DISEASE_SCHEMAS, FeaturePipeline
+
+# Rows read from the CSV per chunk in streaming mode
+DEFAULT_CHUNK_SIZE = 100000
+
+def iter_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a CSV file in chunks
+
+    Args:
+        file_path: Path to the CSV file
+        chunk_size: Number of rows per chunk
+
+    Returns:
+        Iterator of pandas DataFrames
+    """
+    return pd.read_csv(file_path, chunksize=chunk_size)
+
+class RunningMoments:
+    """
+    Count, mean and sum of squared deviations of a column, merged chunk by chunk
+
+    Uses the parallel update of Chan et al., which stays numerically stable
+    when combining many chunks.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        """Merge the non-missing values of one chunk"""
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return
+
+        chunk_mean = values.mean()
+        chunk_m2 = ((values - chunk_mean) ** 2).sum()
+
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+class DatasetStats:
+    """
+    Running statistics of a disease dataset, merged chunk by chunk
+
+    Keeps the moments of every numeric column, the counts of every
+    categorical level and the target classes: everything needed to derive
+    the dataset's FeaturePipeline without reading it again. New rows can be
+    merged at any time, so the pipeline of a growing dataset is updated with
+    work proportional to the appended rows only.
+    """
+
+    def __init__(self, disease_type):
+        if disease_type not in DISEASE_SCHEMAS:
+            raise ValueError(f"Preprocessing for {disease_type} not implemented")
+        self.disease = disease_type
+        self.n_rows = 0
+        self.numeric_cols = None
+        self.categorical_cols = None
+        self.moments = {}
+        self.level_counts = {}
+        self._classes = set()
+
+    def update(self, chunk):
+        """Merge the rows of one DataFrame chunk"""
+        schema = DISEASE_SCHEMAS[self.disease]
+        if self.numeric_cols is None:
+            self.categorical_cols = [col for col in schema['categorical_cols'] if col in chunk.columns]
+            self.numeric_cols = [
+                col for col in chunk.columns if col not in self.categorical_cols and col != schema['target']
+            ]
+            self.moments = {col: RunningMoments() for col in self.numeric_cols}
+            self.level_counts = {col: {} for col in self.categorical_cols}
+
+        self.n_rows += len(chunk)
+
+        for col in self.numeric_cols:
+            values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            if col in schema['zero_cols']:
+                values = np.where(values == 0, np.nan, values)
+            self.moments[col].update(values)
+
+        for col in self.categorical_cols:
+            for level, count in chunk[col].value_counts().items():
+                if count:
+                    self.level_counts[col][level] = self.level_counts[col].get(level, 0) + int(count)
+
+        self._classes.update(chunk[schema['target']].dropna().unique().tolist())
+
+    @property
+    def classes(self):
+        """Sorted array of the target classes seen so far"""
+        return np.array(sorted(self._classes))
+
+    def pipeline(self):
+        """
+        Derive the FeaturePipeline of all rows merged so far
+
+        Equivalent to data.pipeline.fit_pipeline on the same rows. Imputing a
+        column with its mean leaves the mean unchanged and adds no deviation,
+        so the scaler statistics of imputed columns follow directly from the
+        moments of the observed values; one-hot columns follow from the level
+        counts.
+
+        Returns:
+            fitted FeaturePipeline
+        """
+        if not self.n_rows:
+            raise ValueError(f"No rows of the {self.disease} dataset have been seen")
+
+        n_rows = self.n_rows
+        moments = self.moments
+        fill_values = {col: float(moments[col].mean) if moments[col].count else np.nan for col in self.numeric_cols}
+        means = [moments[col].mean for col in self.numeric_cols]
+        variances = [moments[col].m2 / n_rows for col in self.numeric_cols]
+
+        categories = {}
+        for col in self.categorical_cols:
+            levels = sorted(self.level_counts[col])
+            categories[col] = list(levels[1:])
+            for level in categories[col]:
+                p = self.level_counts[col][level] / n_rows
+                means.append(p)
+                variances.append(p * (1 - p))
+
+        columns = list(self.numeric_cols)
+        for col, levels in categories.items():
+            columns.extend(f"{col}_{level}" for level in levels)
+
+        std = np.sqrt(np.asarray(variances, dtype=np.float64))
+        return FeaturePipeline(
+            self.disease, self.numeric_cols, fill_values, categories, columns,
+            np.asarray(means, dtype=np.float64), np.where(std == 0, 1.0, std)
+        )
+
+def dataset_stats(file_path, disease_type, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Compute the running statistics of a dataset in a single pass over its chunks
+
+    Args:
+        file_path: Path to the CSV file
+        disease_type: String indicating the type of disease dataset
+        chunk_size: Number of rows per chunk
+
+    Returns:
+        DatasetStats of the whole file
+    """
+    stats = DatasetStats(disease_type)
+    for chunk in iter_chunks(file_path, chunk_size):
+        stats.update(chunk)
+
+    if not stats.n_rows:
+        raise ValueError(f"Dataset {file_path} is empty")
+    return stats
+
+def fit_pipeline_streaming(file_path, disease_type, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Learn the preprocessing state of a dataset in a single pass over its chunks
+
+    Equivalent to data.pipeline.fit_pipeline on the whole file (see
+    DatasetStats.pipeline).
+
+    Args:
+        file_path: Path to the CSV file
+        disease_type: String indicating the type of disease dataset
+        chunk_size: Number of rows per chunk
+
+    Returns:
+        fitted FeaturePipeline
+        classes: Sorted array of the target classes present in the file
+    """
+    stats = dataset_stats(file_path, disease_type, chunk_size)
+    return stats.pipeline(), stats.classes
+
+def iter_split_chunks(file_path, pipeline, test_size, random_state, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream transformed chunks with a reproducible train/test assignment
+
+    Each row is assigned to the test set with probability test_size using a
+    generator seeded with random_state, so every pass over the file sees the
+    same split for the same chunk size.
+
+    Args:
+        file_path: Path to the CSV file
+        pipeline: Fitted FeaturePipeline
+        test_size: Proportion of rows assigned to the test set
+        random_state: Random seed for the row assignment
+        chunk_size: Number of rows per chunk
+
+    Returns:
+        Iterator of (X, y, test_mask) tuples
+    """
+    target = DISEASE_SCHEMAS[pipeline.disease]['target']
+    rng = np.random.default_rng(random_state)
+
+    for chunk in iter_chunks(file_path, chunk_size):
+        test_mask = rng.random(len(chunk)) < test_size
+        yield pipeline.transform(chunk), chunk[target].to_numpy(), test_mask
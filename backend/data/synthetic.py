@@ -0,0 +1,115 @@
+"""
+Vectorized synthetic dataset generators for load testing
+
+Produces datasets with the column ranges of data.pipeline.DISEASE_SCHEMAS,
+like data_processor.create_sample_data, at any row count and class balance.
+Every column is drawn with a local numpy Generator in one vectorized call per
+chunk, and large datasets are written to CSV chunk by chunk so memory stays
+constant.
+
+    python -m data.synthetic brain_stroke stroke_50m.csv --rows 50000000 --positive-rate 0.05
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+from data.pipeline import DISEASE_SCHEMAS
+
+# Rows generated and written per chunk by write_dataset
+DEFAULT_CHUNK_SIZE = 1000000
+
+def generate_dataset(disease, n_rows, positive_rate=0.5, random_state=42, rng=None):
+    """
+    Generate a synthetic dataset in memory
+
+    Args:
+        disease: Disease identifier (a key of DISEASE_SCHEMAS)
+        n_rows: Number of rows to generate
+        positive_rate: Expected fraction of rows with a positive target
+        random_state: Seed for a local numpy Generator (ignored if rng is given)
+        rng: Optional numpy Generator to draw from
+
+    Returns:
+        pandas DataFrame with the disease's columns and target
+    """
+    if disease not in DISEASE_SCHEMAS:
+        raise ValueError(f"No synthetic schema for {disease}")
+    if not 0 <= positive_rate <= 1:
+        raise ValueError("positive_rate must be between 0 and 1")
+
+    rng = rng if rng is not None else np.random.default_rng(random_state)
+    schema = DISEASE_SCHEMAS[disease]
+    data = {}
+
+    for name, kind, *params in schema['columns']:
+        if kind == 'int':
+            data[name] = rng.integers(params[0], params[1], n_rows)
+        elif kind == 'uniform':
+            data[name] = rng.uniform(params[0], params[1], n_rows)
+        else:
+            levels = params[0]
+            data[name] = pd.Categorical.from_codes(rng.integers(0, len(levels), n_rows), categories=levels)
+
+    data[schema['target']] = (rng.random(n_rows) < positive_rate).astype(np.int64)
+
+    return pd.DataFrame(data)
+
+def iter_dataset_chunks(disease, n_rows, positive_rate=0.5, random_state=42, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Generate a synthetic dataset as a sequence of chunks
+
+    Every chunk draws from its own Generator seeded with (random_state,
+    chunk index), so the output is reproducible for a given chunk size.
+
+    Returns:
+        Iterator of pandas DataFrames with at most chunk_size rows each
+    """
+    for index, start in enumerate(range(0, n_rows, chunk_size)):
+        rng = np.random.default_rng([random_state, index])
+        yield generate_dataset(disease, min(chunk_size, n_rows - start), positive_rate, rng=rng)
+
+def write_dataset(disease, path, n_rows, positive_rate=0.5, random_state=42, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write a synthetic dataset to CSV in streamed chunks
+
+    Only one chunk is held in memory at a time, so arbitrarily large files
+    can be produced with constant memory.
+
+    Args:
+        disease: Disease identifier (a key of DISEASE_SCHEMAS)
+        path: Output CSV path
+        n_rows: Number of rows to generate
+        positive_rate: Expected fraction of rows with a positive target
+        random_state: Seed for the chunk generators
+        chunk_size: Number of rows generated and written at a time
+
+    Returns:
+        The output path
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, 'w', newline='') as f:
+        for index, chunk in enumerate(iter_dataset_chunks(disease, n_rows, positive_rate, random_state, chunk_size)):
+            chunk.to_csv(f, index=False, header=index == 0)
+
+    os.replace(tmp_path, path)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('disease', choices=sorted(DISEASE_SCHEMAS))
+    parser.add_argument('path', help='Output CSV path')
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--positive-rate', type=float, default=0.5)
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    write_dataset(args.disease, args.path, args.rows, args.positive_rate, args.random_state, args.chunk_size)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, from sub-millisecond cache hits to multi-minute fits
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed when scraped"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        if self.function is not None:
+            self.set(self.function())
+        return super().render()
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['buckets'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), series['buckets']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'medicompare_stage_duration_seconds',
+    'Duration of each stage of the training path',
+    ['stage', 'disease', 'algorithm']
+))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'medicompare_http_requests_total',
+    'HTTP requests handled, by endpoint, method and status',
+    ['endpoint', 'method', 'status']
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'medicompare_http_request_duration_seconds',
+    'Time spent handling HTTP requests',
+    ['endpoint']
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'medicompare_http_requests_in_flight',
+    'HTTP requests currently being handled',
+    ['endpoint']
+))
+JOB_QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'medicompare_job_queue_wait_seconds',
+    'Time background jobs spent queued before starting',
+    ['type']
+))
+FITS_STOPPED = REGISTRY.register(Counter(
+    'medicompare_fits_stopped_total',
+    'Model fits stopped before finishing, by whether they ran out of time or memory or were cancelled',
+    ['reason']
+))
+RESULT_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'medicompare_result_cache_lookups_total',
+    'Result cache lookups, by outcome',
+    ['result']
+))
+
+_local = threading.local()
+
+def record_stage(stage, seconds, disease='', algorithm=''):
+    """
+    Record the duration of one stage
+
+    Inside a worker task (see collect_task_stages) the timing is only
+    collected, to be sent back to the parent process and recorded there with
+    its disease and algorithm. Otherwise it is observed in the stage
+    histogram and added to the current request's stage log, if any.
+
+    Args:
+        stage: Stage name (e.g. 'read_csv', 'fit', 'predict')
+        seconds: Duration of the stage
+        disease: Disease the stage worked on, if known
+        algorithm: Algorithm the stage worked on, if known
+    """
+    task_stages = getattr(_local, 'task_stages', None)
+    if task_stages is not None:
+        task_stages.append((stage, seconds))
+        return
+
+    STAGE_SECONDS.observe(seconds, stage=stage, disease=disease, algorithm=algorithm)
+    log = getattr(_local, 'stage_log', None)
+    if log is not None:
+        log.entries.append((stage, disease, algorithm, seconds))
+
+@contextmanager
+def stage(name, disease='', algorithm=''):
+    """Time the body of a with block as one stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start, disease, algorithm)
+
+@contextmanager
+def collect_task_stages():
+    """Collect the stages recorded by a worker task as a list of (stage, seconds)"""
+    previous = getattr(_local, 'task_stages', None)
+    _local.task_stages = []
+    try:
+        yield _local.task_stages
+    finally:
+        _local.task_stages = previous
+
+class StageLog:
+    """Stages recorded on one thread while serving a request or job"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.entries = []
+
+    def summary(self):
+        """
+        Summarize the recorded stages
+
+        Returns:
+            Dictionary with the elapsed wall time, the count and total
+            duration of each stage, and the per-stage durations of every
+            (disease, algorithm) pair
+        """
+        stages = {}
+        by_model = {}
+        for name, disease, algorithm, seconds in self.entries:
+            totals = stages.setdefault(name, {'count': 0, 'seconds': 0.0})
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            if algorithm:
+                model = by_model.setdefault((disease, algorithm), {})
+                model[name] = model.get(name, 0.0) + seconds
+
+        return {
+            'total_seconds': time.perf_counter() - self.started,
+            'stages': stages,
+            'by_model': [
+                {'disease': disease, 'algorithm': algorithm, 'stages': model_stages}
+                for (disease, algorithm), model_stages in by_model.items()
+            ]
+        }
+
+@contextmanager
+def collect_stages():
+    """Log every stage recorded on this thread inside the with block"""
+    previous = getattr(_local, 'stage_log', None)
+    _local.stage_log = StageLog()
+    try:
+        yield _local.stage_log
+    finally:
+        _local.stage_log = previous
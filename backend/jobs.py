@@ -0,0 +1,189 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import JOB_QUEUE_WAIT_SECONDS
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+class Job:
+    """
+    A training run executed in the background
+
+    Progress is recorded as a list of events. Each event has a sequential id,
+    so stream consumers can resume from the last event they saw.
+    """
+
+    def __init__(self, kind, params, total):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.total = total
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.partial_results = []
+        self.result = None
+        self.error = None
+        self.events = []
+        self.cancel_requested = threading.Event()
+        self._condition = threading.Condition()
+
+    def publish(self, event, data):
+        """Append an event and wake up any stream waiting for it"""
+        with self._condition:
+            self.events.append({'id': len(self.events), 'event': event, 'data': data})
+            self._condition.notify_all()
+
+    def report(self, entry):
+        """Record one finished (disease, algorithm) result"""
+        with self._condition:
+            self.partial_results.append(entry)
+        self.publish('progress', {
+            'completed': len(self.partial_results),
+            'total': self.total,
+            'result': entry
+        })
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def cancel(self):
+        """
+        Ask the job to stop
+
+        A queued job never starts. A running job stops its unfinished fits and
+        finishes with the results it already has and the status 'cancelled'.
+        """
+        self.cancel_requested.set()
+        self.publish('cancelling', {'id': self.id})
+
+    def wait_for_events(self, after, timeout):
+        """
+        Block until there are events newer than `after` or the job is done
+
+        Args:
+            after: Number of events the caller has already seen
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            List of new events (empty on timeout)
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: len(self.events) > after or self.done, timeout)
+            return self.events[after:]
+
+    def to_dict(self):
+        """Return a JSON-serializable status snapshot"""
+        with self._condition:
+            return {
+                'id': self.id,
+                'type': self.kind,
+                'status': self.status,
+                'params': self.params,
+                'progress': {'completed': len(self.partial_results), 'total': self.total},
+                'partial_results': list(self.partial_results),
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+class JobManager:
+    """
+    Bounded background executor for training jobs
+
+    At most max_workers jobs run at once and at most max_pending jobs may be
+    queued or running; further submissions are rejected with QueueFullError
+    so callers can apply backpressure. Finished jobs are kept for inspection,
+    up to max_finished of them.
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, max_finished=100):
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Number of jobs queued or running"""
+        return self._pending
+
+    def submit(self, kind, params, total, fn):
+        """
+        Queue a job
+
+        Args:
+            kind: Job type (e.g. 'train' or 'compare')
+            params: JSON-serializable request parameters
+            total: Number of (disease, algorithm) results the job will produce
+            fn: Callable run as fn(job); its return value becomes job.result
+
+        Returns:
+            The queued Job
+
+        Raises:
+            QueueFullError: If max_pending jobs are already queued or running,
+                or the manager is shutting down
+        """
+        job = Job(kind, params, total)
+
+        with self._lock:
+            if self._closed:
+                raise QueueFullError("Job queue is shutting down")
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({self.max_pending} jobs pending)")
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._prune()
+
+        job.publish('queued', {'id': job.id})
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        """Return a job by id, or None if it is unknown or has been pruned"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and optionally wait for queued and running jobs"""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, fn):
+        job.status = 'running'
+        job.started_at = time.time()
+        JOB_QUEUE_WAIT_SECONDS.observe(job.started_at - job.created_at, type=job.kind)
+        job.publish('started', {'id': job.id})
+
+        try:
+            if not job.cancel_requested.is_set():
+                job.result = fn(job)
+            job.status = 'cancelled' if job.cancel_requested.is_set() else 'completed'
+            job.finished_at = time.time()
+            job.publish(job.status, {'result': job.result})
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+            job.finished_at = time.time()
+            job.publish('failed', {'error': job.error})
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
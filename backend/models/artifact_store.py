@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import stage
+
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts')
+
+# Blobs smaller than this are stored compressed. Larger ones are stored raw so
+# their arrays can be memory-mapped on load and shared through the page cache.
+COMPRESS_BELOW_BYTES = 16 * 1024 * 1024
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_json(path, data):
+    """Write JSON atomically so readers never see a partial file"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+class ArtifactStore:
+    """
+    Versioned, content-addressed store of trained models
+
+    Every saved model becomes a new version of its (disease, algorithm) pair,
+    recorded with its metrics, dataset hash and parameters. Model and
+    pipeline blobs are stored once per content hash, so saving an identical
+    model again adds no file and no version. Writes run on a background
+    thread; until a write has landed, the pending model is served from memory.
+
+    Layout under root:
+        objects/<sha256>.joblib                 model and pipeline blobs
+        <disease>_<algorithm>/<version>.json    version metadata
+        <disease>_<algorithm>/LATEST            id of the current version
+    """
+
+    def __init__(self, root=DEFAULT_ARTIFACT_DIR, max_versions=20, compress_below=COMPRESS_BELOW_BYTES):
+        self.root = root
+        self.max_versions = max_versions
+        self.compress_below = compress_below
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='artifact-writer')
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _pair_dir(self, disease, algorithm):
+        return os.path.join(self.root, f"{disease}_{algorithm}")
+
+    def _object_path(self, object_hash):
+        return os.path.join(self.root, 'objects', f"{object_hash}.joblib")
+
+    def save(self, disease, algorithm, model, pipeline=None, metadata=None):
+        """
+        Store a model as the latest version of a disease/algorithm pair
+
+        Args:
+            disease: Disease identifier
+            algorithm: Algorithm identifier
+            model: Trained model
+            pipeline: Optional FeaturePipeline the model was trained with
+            metadata: Optional JSON-serializable dict (metrics, dataset hash,
+                parameters, ...) recorded with the version
+
+        Returns:
+            Metadata of the stored version (the current latest one if the
+            model and pipeline are identical to it)
+        """
+        with stage('save', disease, algorithm):
+            model_hash, model_compressed = self._put_object(model)
+            pipeline_hash, pipeline_compressed = self._put_object(pipeline) if pipeline is not None else (None, False)
+
+        latest = self.latest_version(disease, algorithm, include_pending=False)
+        if latest is not None and latest['model'] == model_hash and latest['pipeline'] == pipeline_hash:
+            return latest
+
+        version = dict(metadata or {})
+        version.update({
+            'version': f"{time.time_ns()}-{model_hash[:12]}",
+            'disease': disease,
+            'algorithm': algorithm,
+            'model': model_hash,
+            'pipeline': pipeline_hash,
+            'compressed': {'model': model_compressed, 'pipeline': pipeline_compressed},
+            'size_bytes': os.path.getsize(self._object_path(model_hash)),
+            'created_at': time.time()
+        })
+
+        pair_dir = self._pair_dir(disease, algorithm)
+        os.makedirs(pair_dir, exist_ok=True)
+        _write_json(os.path.join(pair_dir, f"{version['version']}.json"), version)
+        # LATEST is replaced last, so readers only ever see complete versions
+        tmp_path = os.path.join(pair_dir, f"LATEST.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(version['version'])
+        os.replace(tmp_path, os.path.join(pair_dir, 'LATEST'))
+
+        self._prune(disease, algorithm)
+        return version
+
+    def save_async(self, disease, algorithm, model, pipeline=None, metadata=None):
+        """
+        Queue a save on the background writer and return immediately
+
+        Until the write lands, latest_version and the pending entry serve the
+        model from memory, so reads in this process see their own writes.
+
+        Returns:
+            concurrent.futures.Future resolving to the stored version's metadata
+        """
+        key = (disease, algorithm)
+        entry = (model, pipeline, dict(metadata or {}, disease=disease, algorithm=algorithm, version=None))
+        with self._lock:
+            self._pending[key] = entry
+
+        def write():
+            try:
+                return self.save(disease, algorithm, model, pipeline, metadata)
+            finally:
+                with self._lock:
+                    if self._pending.get(key) is entry:
+                        del self._pending[key]
+
+        return self._writer.submit(write)
+
+    def pending(self, disease, algorithm):
+        """Return (model, pipeline, metadata) of a queued save, or None"""
+        with self._lock:
+            return self._pending.get((disease, algorithm))
+
+    def flush(self):
+        """Wait until every queued save has been written"""
+        self._writer.submit(lambda: None).result()
+
+    def latest_version_id(self, disease, algorithm):
+        """Return the id of the latest stored version, or None"""
+        try:
+            with open(os.path.join(self._pair_dir(disease, algorithm), 'LATEST'), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def latest_version(self, disease, algorithm, include_pending=True):
+        """
+        Return the metadata of the latest version of a disease/algorithm pair
+
+        Args:
+            disease: Disease identifier
+            algorithm: Algorithm identifier
+            include_pending: Whether a queued, not yet written save counts
+
+        Returns:
+            Metadata dictionary, or None if nothing has been saved
+        """
+        if include_pending:
+            pending = self.pending(disease, algorithm)
+            if pending is not None:
+                return pending[2]
+        version = self.latest_version_id(disease, algorithm)
+        return self.get_version(disease, algorithm, version) if version else None
+
+    def get_version(self, disease, algorithm, version):
+        """Return the metadata of one version, or None if it does not exist"""
+        try:
+            with open(os.path.join(self._pair_dir(disease, algorithm), f"{version}.json"), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def versions(self, disease, algorithm):
+        """Return the metadata of every stored version, newest first"""
+        pair_dir = self._pair_dir(disease, algorithm)
+        if not os.path.isdir(pair_dir):
+            return []
+        names = sorted((name for name in os.listdir(pair_dir) if name.endswith('.json')), reverse=True)
+        versions = [self.get_version(disease, algorithm, name[:-len('.json')]) for name in names]
+        return [version for version in versions if version is not None]
+
+    def load(self, version, mmap=True):
+        """
+        Load the model and pipeline of a version
+
+        Uncompressed blobs are memory-mapped, so the numpy arrays of large
+        models are shared between processes through the page cache.
+
+        Args:
+            version: Version metadata from latest_version, get_version or versions
+            mmap: Whether to memory-map uncompressed blobs; pass False for a
+                private, writable copy of the model (e.g. to update it)
+
+        Returns:
+            model: Trained model
+            pipeline: FeaturePipeline, or None if the version has none
+        """
+        model = self._load_object(version['model'], version['compressed']['model'], mmap)
+        pipeline = None
+        if version.get('pipeline'):
+            pipeline = self._load_object(version['pipeline'], version['compressed']['pipeline'], mmap)
+        return model, pipeline
+
+    def _load_object(self, object_hash, compressed, mmap=True):
+        import joblib
+        # mmap_mode has no effect on compressed files
+        return joblib.load(self._object_path(object_hash), mmap_mode='r' if mmap and not compressed else None)
+
+    def _put_object(self, obj):
+        """Write an object under its content hash, skipping the write if it is already stored"""
+        import joblib
+        objects_dir = os.path.join(self.root, 'objects')
+        os.makedirs(objects_dir, exist_ok=True)
+
+        # The hash is always taken over the uncompressed serialization
+        tmp_path = os.path.join(objects_dir, f"{uuid.uuid4().hex}.tmp")
+        joblib.dump(obj, tmp_path)
+        object_hash = _file_hash(tmp_path)
+        compressed = os.path.getsize(tmp_path) < self.compress_below
+
+        path = self._object_path(object_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return object_hash, compressed
+
+        if compressed:
+            os.remove(tmp_path)
+            joblib.dump(obj, tmp_path, compress=3)
+        os.replace(tmp_path, path)
+        return object_hash, compressed
+
+    def _prune(self, disease, algorithm):
+        """Drop versions beyond max_versions and blobs no version refers to any more"""
+        stale = self.versions(disease, algorithm)[self.max_versions:]
+        if not stale:
+            return
+
+        pair_dir = self._pair_dir(disease, algorithm)
+        for version in stale:
+            os.remove(os.path.join(pair_dir, f"{version['version']}.json"))
+
+        referenced = set()
+        for name in os.listdir(self.root):
+            if name == 'objects' or not os.path.isdir(os.path.join(self.root, name)):
+                continue
+            for path in os.listdir(os.path.join(self.root, name)):
+                if path.endswith('.json'):
+                    with open(os.path.join(self.root, name, path), 'r') as f:
+                        version = json.load(f)
+                    referenced.update(h for h in (version['model'], version['pipeline']) if h)
+
+        for version in stale:
+            for object_hash in (version['model'], version['pipeline']):
+                if object_hash and object_hash not in referenced:
+                    try:
+                        os.remove(self._object_path(object_hash))
+                    except FileNotFoundError:
+                        pass
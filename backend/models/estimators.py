@@ -0,0 +1,88 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+# Rows transformed at a time when scoring, so the kernel features of a large
+# test set are never held in memory all at once
+PREDICT_BATCH_ROWS = 100000
+
+class CalibratedLinearSVC(ClassifierMixin, BaseEstimator):
+    """
+    Linear SVM with sigmoid-calibrated probabilities
+
+    SVC(probability=True) fits a kernel SVM, at least quadratic in the number
+    of rows, and then five more for its Platt calibration. Here every fit is
+    a linear one, O(n · d) per iteration: cv fits produce out-of-fold
+    decision values for the sigmoid and one more fit on all rows gives the
+    final model.
+
+    Args:
+        C: Regularization strength of the SVM (smaller is stronger)
+        cv: Number of folds used to fit the calibration
+        max_iter: Iteration limit of each linear fit
+        random_state: Random seed of the solver
+    """
+
+    def __init__(self, C=1.0, cv=3, max_iter=1000, random_state=None):
+        self.C = C
+        self.cv = cv
+        self.max_iter = max_iter
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        from sklearn.svm import LinearSVC
+        from sklearn.calibration import CalibratedClassifierCV
+
+        svm = LinearSVC(C=self.C, max_iter=self.max_iter, random_state=self.random_state)
+        self.calibrated_ = CalibratedClassifierCV(svm, method='sigmoid', cv=self.cv, ensemble=False).fit(X, y)
+        self.classes_ = self.calibrated_.classes_
+        return self
+
+    def predict_proba(self, X):
+        return self.calibrated_.predict_proba(X)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+class NystroemClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Approximate RBF-kernel classifier: Nystroem features and a logistic regression
+
+    The kernel is approximated from n_components landmark rows, so fitting
+    costs O(n · m · d) for m components instead of the O(n² · d) or worse of
+    an exact kernel SVM, and the model size does not grow with the data.
+    Training holds the n × m feature matrix in memory; scoring transforms
+    PREDICT_BATCH_ROWS rows at a time.
+
+    Args:
+        n_components: Number of landmark rows (m)
+        gamma: RBF kernel coefficient (1 / n_features by default)
+        C: Inverse regularization strength of the logistic regression
+        random_state: Random seed for choosing the landmarks
+    """
+
+    def __init__(self, n_components=200, gamma=None, C=1.0, random_state=None):
+        self.n_components = n_components
+        self.gamma = gamma
+        self.C = C
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        from sklearn.kernel_approximation import Nystroem
+        from sklearn.linear_model import LogisticRegression
+
+        self.feature_map_ = Nystroem(
+            kernel='rbf', gamma=self.gamma, n_components=min(self.n_components, len(X)),
+            random_state=self.random_state
+        ).fit(X)
+        self.classifier_ = LogisticRegression(C=self.C, max_iter=1000).fit(self.feature_map_.transform(X), y)
+        self.classes_ = self.classifier_.classes_
+        return self
+
+    def predict_proba(self, X):
+        return np.vstack([
+            self.classifier_.predict_proba(self.feature_map_.transform(X[start:start + PREDICT_BATCH_ROWS]))
+            for start in range(0, len(X), PREDICT_BATCH_ROWS)
+        ])
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
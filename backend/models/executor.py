@@ -0,0 +1,488 @@
+import os
+import time
+import threading
+import multiprocessing
+from functools import partial, lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import numpy as np
+
+from models.model_factory import create_model, train_model, train_model_incremental, evaluate_model, predict_scores, compute_metrics, ALGORITHM_COMPLEXITY
+from data.dataset_store import open_store, open_fold
+from data.streaming import iter_split_chunks
+from instrumentation import stage, record_stage, collect_task_stages, FITS_STOPPED
+
+# Number of worker processes used to fit models in parallel.
+# Can be overridden with the MEDICOMPARE_WORKERS environment variable.
+DEFAULT_WORKERS = int(os.environ.get('MEDICOMPARE_WORKERS', 0)) or (os.cpu_count() or 1)
+
+# Statuses of fits stopped before they finished, by the budget they exceeded
+TIMED_OUT = 'timed_out'
+MEMORY_EXCEEDED = 'memory_exceeded'
+CANCELLED = 'cancelled'
+
+# How often a budgeted fit's elapsed time, memory use and cancellation are checked
+BUDGET_POLL_SECONDS = 0.1
+
+# Modules imported once by the fork server, so each budgeted fit process starts warm.
+# Preloading __main__ also keeps every fit process from re-running the main script.
+FORKSERVER_PRELOAD = ['__main__', 'models.executor', 'sklearn.linear_model', 'sklearn.ensemble', 'sklearn.svm',
+                      'sklearn.neural_network']
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+_fit_context = None
+_fit_slots = threading.BoundedSemaphore(DEFAULT_WORKERS)
+
+def _init_worker(n_threads=1):
+    """
+    Limit native thread pools so parallel fits don't oversubscribe the cores
+
+    Args:
+        n_threads: Cores available to the process; multi-core algorithms
+            (n_jobs=-1) also use at most this many
+    """
+    # joblib sizes n_jobs=-1 from this variable
+    os.environ['LOKY_MAX_CPU_COUNT'] = str(n_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except ImportError:
+        pass
+
+def get_executor(n_workers=None):
+    """
+    Return the shared process pool, creating it on first use
+
+    Args:
+        n_workers: Number of worker processes (defaults to DEFAULT_WORKERS)
+
+    Returns:
+        ProcessPoolExecutor instance
+    """
+    global _executor, _executor_workers
+    n_workers = n_workers or DEFAULT_WORKERS
+
+    with _executor_lock:
+        if _executor is None or _executor_workers != n_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=True)
+            n_threads = max((os.cpu_count() or 1) // n_workers, 1)
+            _executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(n_threads,))
+            _executor_workers = n_workers
+
+        return _executor
+
+def _get_fit_context():
+    """
+    Return the multiprocessing context used to start budgeted fit processes
+
+    A fork server starts every process from a clean, single-threaded parent
+    with the training modules already imported, instead of forking the
+    multi-threaded server; it falls back to spawn where fork servers are not
+    available.
+    """
+    global _fit_context
+    with _executor_lock:
+        if _fit_context is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                _fit_context = multiprocessing.get_context('forkserver')
+                _fit_context.set_forkserver_preload(FORKSERVER_PRELOAD)
+            else:
+                _fit_context = multiprocessing.get_context('spawn')
+        return _fit_context
+
+def shutdown_executor():
+    """Shut down the shared process pool, waiting for running fits to finish"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        _executor = None
+        _executor_workers = None
+
+def fit_and_evaluate(algorithm, random_state, X_train, X_test, y_train, y_test, params=None):
+    """
+    Create, train and evaluate a single model
+
+    Args:
+        algorithm: String indicating the type of algorithm to use
+        random_state: Random seed for reproducibility
+        X_train, X_test, y_train, y_test: Split datasets
+        params: Optional hyperparameters overriding the algorithm's defaults
+
+    Returns:
+        Tuple of (trained model, metrics dictionary)
+    """
+    model = create_model(algorithm, random_state, **(params or {}))
+    trained_model = train_model(model, X_train, y_train)
+    metrics = evaluate_model(trained_model, X_test, y_test)
+    return trained_model, metrics
+
+@lru_cache(maxsize=64)
+def _split_indices(n_rows, test_size, random_state):
+    """Compute the same row split as split_data, once per worker process"""
+    from sklearn.model_selection import train_test_split
+    return train_test_split(np.arange(n_rows), test_size=test_size, random_state=random_state)
+
+def load_split(store_path, test_size, random_state):
+    """
+    Split a materialized dataset store into training and testing sets
+
+    The store is memory-mapped, so workers share the page cache instead of
+    receiving a pickled copy of the data from the parent process. Plain
+    arrays are returned so the fitted models score raw numpy batches.
+
+    Args:
+        store_path: Store directory returned by data.dataset_store.materialize
+        test_size: Proportion of the dataset to include in the test split
+        random_state: Random seed for reproducibility
+
+    Returns:
+        X_train, X_test, y_train, y_test: Split datasets
+    """
+    with stage('split'):
+        X, y, _ = open_store(store_path)
+        train_idx, test_idx = _split_indices(len(X), test_size, random_state)
+        return X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+
+def fit_and_evaluate_stored(algorithm, random_state, store_path, test_size):
+    """
+    Create, train and evaluate a single model on a materialized dataset store
+
+    Args:
+        algorithm: String indicating the type of algorithm to use
+        random_state: Random seed for the split and the model
+        store_path: Store directory returned by data.dataset_store.materialize
+        test_size: Proportion of the dataset to include in the test split
+
+    Returns:
+        Tuple of (trained model, metrics dictionary)
+    """
+    X_train, X_test, y_train, y_test = load_split(store_path, test_size, random_state)
+    return fit_and_evaluate(algorithm, random_state, X_train, X_test, y_train, y_test)
+
+def evaluate_stored(algorithm, random_state, store_path, test_size):
+    """
+    Like fit_and_evaluate_stored, but return only the metrics
+
+    Used where the fitted model is not kept, so it isn't pickled back to the caller.
+
+    Returns:
+        Metrics dictionary
+    """
+    return fit_and_evaluate_stored(algorithm, random_state, store_path, test_size)[1]
+
+def fit_and_evaluate_fold(algorithm, random_state, folds_path, fold):
+    """
+    Create, train and evaluate a single model on one cross-validation fold
+
+    Args:
+        algorithm: String indicating the type of algorithm to use
+        random_state: Random seed for the model
+        folds_path: Folds directory returned by data.dataset_store.materialize_folds
+        fold: Index of the fold
+
+    Returns:
+        Tuple of (trained model, metrics dictionary)
+    """
+    with stage('split'):
+        X_train, X_test, y_train, y_test = open_fold(folds_path, fold)
+    return fit_and_evaluate(algorithm, random_state, X_train, X_test, y_train, y_test)
+
+def fit_and_evaluate_streaming(algorithm, random_state, file_path, pipeline, classes, test_size, chunk_size, epochs):
+    """
+    Create, train and evaluate an incremental model without loading the whole dataset
+
+    The CSV is read in chunks: the training rows of every chunk are fed to
+    partial_fit for the given number of epochs, then a final pass scores the
+    test rows. Only one chunk is held in memory at a time.
+
+    Args:
+        algorithm: One of INCREMENTAL_ALGORITHMS
+        random_state: Random seed for the split and the model
+        file_path: Path to the CSV file
+        pipeline: FeaturePipeline from data.streaming.fit_pipeline_streaming
+        classes: Array of all target classes in the dataset
+        test_size: Proportion of rows assigned to the test set
+        chunk_size: Number of rows per chunk
+        epochs: Number of passes over the training rows
+
+    Returns:
+        Tuple of (trained model, metrics dictionary)
+    """
+    model = create_model(algorithm, random_state)
+
+    for _ in range(epochs):
+        chunks = iter_split_chunks(file_path, pipeline, test_size, random_state, chunk_size)
+        train_model_incremental(model, ((X[~test], y[~test]) for X, y, test in chunks), classes)
+
+    y_true, y_pred, y_score = [], [], []
+    predict_seconds = 0.0
+    for X, y, test in iter_split_chunks(file_path, pipeline, test_size, random_state, chunk_size):
+        if not test.any():
+            continue
+        start = time.perf_counter()
+        chunk_pred, chunk_score = predict_scores(model, X[test])
+        predict_seconds += time.perf_counter() - start
+        y_true.append(y[test])
+        y_pred.append(chunk_pred)
+        if chunk_score is not None:
+            y_score.append(chunk_score)
+
+    if not y_true:
+        raise ValueError("No rows were assigned to the test set")
+    record_stage('predict', predict_seconds)
+
+    with stage('metrics'):
+        metrics = compute_metrics(
+            np.concatenate(y_true),
+            np.concatenate(y_pred),
+            np.concatenate(y_score) if y_score else None
+        )
+    return model, metrics
+
+def _metrics_only(task_fn, *task):
+    """Run task_fn, but skip shipping the fitted model back to the parent"""
+    return None, task_fn(*task)[1]
+
+def _task_threads(tasks, n_workers):
+    """
+    Cores each task of a batch may use
+
+    Every task gets an equal share of the cores among the tasks that run at
+    once. Multi-core algorithms (see ALGORITHM_COMPLEXITY) also split the
+    cores the single-core tasks running beside them leave over, so the tasks
+    running at any one time never use more threads than there are cores
+    (with at least as many cores as workers).
+
+    Args:
+        tasks: List of task argument tuples, each starting with its algorithm
+        n_workers: Number of tasks run at once
+
+    Returns:
+        List with the number of cores of each task
+    """
+    cores = os.cpu_count() or 1
+    running = max(min(n_workers, len(tasks)), 1)
+    base = max(cores // running, 1)
+    multi_core = [ALGORITHM_COMPLEXITY.get(task[0], {}).get('multi_core', False) for task in tasks]
+
+    # The most multi-core tasks that can run at once, next to as many single-core ones as fit
+    multi_running = min(sum(multi_core), running)
+    single_running = min(len(tasks) - sum(multi_core), running - multi_running)
+    shared = max((cores - base * single_running) // max(multi_running, 1), base)
+    return [shared if is_multi_core else base for is_multi_core in multi_core]
+
+def _threaded_task(n_threads, worker_fn, *args):
+    """Run a task in a pool worker with its native thread pools sized for it"""
+    _init_worker(n_threads)
+    return worker_fn(*args)
+
+def _timed_task(task_fn, submitted_at, *task):
+    """Run task_fn and return its outcome with the stages it recorded, including its wait in the queue"""
+    with collect_task_stages() as stages:
+        record_stage('queue_wait', max(time.time() - submitted_at, 0.0))
+        outcome = task_fn(*task)
+    return outcome, stages
+
+def _process_rss_mb(pid):
+    """Resident memory of a process in megabytes, or None where /proc is not available"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def _budgeted_child(conn, n_threads, worker_fn, args):
+    """Entry point of a budgeted fit process: run the task and send its outcome back"""
+    _init_worker(n_threads)
+    try:
+        message = ('ok', worker_fn(*args))
+    except Exception as e:
+        message = ('error', e)
+    try:
+        conn.send(message)
+    except Exception as e:
+        # The exception itself could not be pickled
+        conn.send(('error', RuntimeError(f"{type(e).__name__}: {e}")))
+    conn.close()
+
+def run_budgeted_task(worker_fn, args, budget=None, should_cancel=None, n_threads=1):
+    """
+    Run one task in its own process, killing it when it goes over budget
+
+    Args:
+        worker_fn: Module-level function (or partial of one) to run
+        args: Tuple of arguments for worker_fn
+        budget: Optional dictionary with the 'seconds' of wall-clock time and
+            the 'memory_mb' of resident memory the task may use (either may be None)
+        should_cancel: Optional callable; the task is killed as soon as it returns True
+        n_threads: Cores the process may use for native thread pools
+
+    Returns:
+        (status, result): status is 'completed' with worker_fn's return value,
+        or TIMED_OUT, MEMORY_EXCEEDED or CANCELLED with None
+
+    Raises:
+        Exception: Whatever worker_fn raised, or RuntimeError if the process died
+    """
+    budget = budget or {}
+    seconds = budget.get('seconds')
+    memory_mb = budget.get('memory_mb')
+
+    context = _get_fit_context()
+    receiver, sender = context.Pipe(duplex=False)
+    # Not daemonic, so multi-core estimators may still start joblib workers;
+    # the process is killed below whenever it didn't deliver its outcome
+    process = context.Process(target=_budgeted_child, args=(sender, n_threads, worker_fn, args), daemon=False)
+    process.start()
+    sender.close()
+    started = time.monotonic()
+    status = None
+    delivered = False
+
+    try:
+        while not receiver.poll(BUDGET_POLL_SECONDS):
+            if not process.is_alive() and not receiver.poll():
+                raise RuntimeError(f"Fit process exited unexpectedly with code {process.exitcode}")
+            if seconds is not None and time.monotonic() - started > seconds:
+                status = TIMED_OUT
+            elif memory_mb is not None and (_process_rss_mb(process.pid) or 0) > memory_mb:
+                status = MEMORY_EXCEEDED
+            elif should_cancel is not None and should_cancel():
+                status = CANCELLED
+            if status is not None:
+                return status, None
+
+        kind, value = receiver.recv()
+        delivered = True
+        if kind == 'error':
+            raise value
+        return 'completed', value
+    finally:
+        if not delivered:
+            process.kill()
+        process.join()
+        receiver.close()
+
+def has_limits(budget):
+    """Whether a budget (see run_budgeted_task) sets a finite time or memory limit"""
+    return bool(budget) and (budget.get('seconds') is not None or budget.get('memory_mb') is not None)
+
+def run_training_tasks(tasks, n_workers=None, return_models=True, task_fn=fit_and_evaluate_stored, on_result=None,
+                       stage_labels=None, budgets=None, should_cancel=None, on_abort=None):
+    """
+    Fit and evaluate a batch of models, fanning them out over the process pool
+
+    Every task carries its own random_state, so results are identical to a
+    sequential run regardless of the number of workers or completion order.
+
+    Args:
+        tasks: List of argument tuples for task_fn
+        n_workers: Number of worker processes (defaults to DEFAULT_WORKERS)
+        return_models: Whether to return the fitted models (None otherwise)
+        task_fn: Module-level function run for each task
+        on_result: Optional callback called as on_result(index, outcome) as
+            soon as each task finishes, in completion order
+        stage_labels: Optional list of dicts with the 'disease' and 'algorithm'
+            of each task, used to label the stage timings the task records
+        budgets: Optional list with the budget of each task (see
+            run_budgeted_task). Tasks whose budget sets a limit run in their
+            own process that is killed once it exceeds the budget or
+            should_cancel returns True, after the other tasks have run in
+            the shared pool.
+        should_cancel: Optional callable polled while tasks run. Budgeted
+            fits are killed; pooled fits that haven't started are dropped
+            and the running ones finish.
+        on_abort: Optional callback called as on_abort(index, status) for
+            each task that was stopped
+
+    Returns:
+        List of (trained model, metrics) tuples in the same order as tasks,
+        with None for stopped tasks
+    """
+    n_workers = n_workers or DEFAULT_WORKERS
+    worker_fn = partial(_timed_task, task_fn if return_models else partial(_metrics_only, task_fn))
+    outcomes = [None] * len(tasks)
+
+    def _complete(index, result):
+        outcome, stages = result
+        labels = stage_labels[index] if stage_labels is not None else {}
+        for name, seconds in stages:
+            record_stage(name, seconds, **labels)
+        outcomes[index] = outcome
+        if on_result is not None:
+            on_result(index, outcome)
+
+    def _abort(index, status):
+        FITS_STOPPED.inc(reason=status)
+        if on_abort is not None:
+            on_abort(index, status)
+
+    # Only fits with a finite budget pay for a process of their own
+    limited = [index for index in range(len(tasks)) if budgets is not None and has_limits(budgets[index])]
+    pooled = [index for index in range(len(tasks)) if index not in limited]
+    threads = _task_threads(tasks, n_workers)
+
+    if n_workers == 1 or len(pooled) <= 1:
+        # Not worth paying the inter-process transfer cost for a single fit;
+        # it runs in this process, whose thread pools use every core
+        for index in pooled:
+            if should_cancel is not None and should_cancel():
+                _abort(index, CANCELLED)
+            else:
+                _complete(index, worker_fn(time.time(), *tasks[index]))
+    else:
+        executor = get_executor(n_workers)
+        futures = {
+            executor.submit(_threaded_task, threads[index], worker_fn, time.time(), *tasks[index]): index
+            for index in pooled
+        }
+        not_done = set(futures)
+        while not_done:
+            done, not_done = wait(not_done, timeout=BUDGET_POLL_SECONDS if should_cancel else None,
+                                  return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    _abort(futures[future], CANCELLED)
+                else:
+                    _complete(futures[future], future.result())
+            if should_cancel is not None and should_cancel():
+                # Pool processes can't be killed safely; drop the fits that haven't started
+                for future in not_done:
+                    future.cancel()
+
+    if limited:
+        _run_budgeted_tasks(worker_fn, [tasks[index] for index in limited], n_workers,
+                            [budgets[index] for index in limited], [threads[index] for index in limited],
+                            should_cancel,
+                            lambda position, result: _complete(limited[position], result),
+                            lambda position, status: _abort(limited[position], status))
+    return outcomes
+
+def _run_budgeted_tasks(worker_fn, tasks, n_workers, budgets, task_threads, should_cancel, complete, on_abort):
+    """
+    Run tasks in budgeted processes, at most n_workers at once
+
+    Fit processes of all concurrent requests share DEFAULT_WORKERS slots, so
+    the cores are not oversubscribed when several requests train together.
+    """
+    def _run(index, submitted_at):
+        with _fit_slots:
+            if should_cancel is not None and should_cancel():
+                return CANCELLED, None
+            return run_budgeted_task(worker_fn, (submitted_at,) + tuple(tasks[index]), budgets[index],
+                                     should_cancel, task_threads[index])
+
+    with ThreadPoolExecutor(max_workers=min(n_workers, len(tasks)) or 1, thread_name_prefix='fit') as threads:
+        futures = {threads.submit(_run, index, time.time()): index for index in range(len(tasks))}
+        for future in as_completed(futures):
+            index = futures[future]
+            status, result = future.result()
+            if status == 'completed':
+                complete(index, result)
+            else:
+                on_abort(index, status)
@@ -0,0 +1,105 @@
+import numpy as np
+
+# How a fitted model of each algorithm takes in appended rows:
+# 'partial_fit' feeds it only the new training rows, 'add_trees' grows extra
+# trees on them, and 'warm_start' refits on all training rows starting from
+# the current coefficients, which converges in a few iterations.
+UPDATE_METHODS = {
+    'sgd_logistic_regression': 'partial_fit',
+    'sgd_linear_svm': 'partial_fit',
+    'incremental_neural_network': 'partial_fit',
+    'naive_bayes': 'partial_fit',
+    'random_forest': 'add_trees',
+    'parallel_random_forest': 'add_trees',
+    'logistic_regression': 'warm_start',
+    'neural_network': 'warm_start'
+}
+
+# Largest shift of a feature mean, in standard deviations of the data a model
+# was trained on, that is still handled by updating the model in place
+DEFAULT_DRIFT_THRESHOLD = 0.25
+
+def feature_drift(reference, current):
+    """
+    Measure how far a dataset's statistics have moved since a model was trained
+
+    Args:
+        reference: FeaturePipeline the model was trained with
+        current: FeaturePipeline of the dataset as it is now
+
+    Returns:
+        Largest absolute shift of a feature mean, in units of the reference
+        feature's standard deviation, or None if the feature layout changed
+        (e.g. a new categorical level appeared)
+    """
+    if list(reference.columns) != list(current.columns):
+        return None
+    if not len(reference.columns):
+        return 0.0
+    return float(np.max(np.abs(current.mean - reference.mean) / reference.scale))
+
+def appended_split(base_rows, n_rows, test_size, random_state):
+    """
+    Train/test assignment of a dataset that has grown since a model's full training
+
+    The first base_rows rows keep the split the model was trained and
+    evaluated with. Each appended row is assigned to the test set with
+    probability test_size by a generator seeded with random_state, so a row's
+    assignment never depends on how the rows were batched.
+
+    Args:
+        base_rows: Number of rows when the model was last fully trained
+        n_rows: Number of rows now
+        test_size: Proportion of rows assigned to the test set
+        random_state: Random seed of the original split
+
+    Returns:
+        train_idx, test_idx: Arrays of row indices
+    """
+    from models.executor import _split_indices
+    train_idx, test_idx = _split_indices(base_rows, test_size, random_state)
+    appended = np.arange(base_rows, n_rows)
+    is_test = np.random.default_rng(random_state).random(n_rows)[base_rows:] < test_size
+    return np.concatenate([train_idx, appended[~is_test]]), np.concatenate([test_idx, appended[is_test]])
+
+def update_model(algorithm, model, X, y, train_idx, new_idx):
+    """
+    Update a fitted model with newly appended training rows
+
+    Args:
+        algorithm: Algorithm identifier (a key of UPDATE_METHODS)
+        model: Fitted model, modified in place
+        X: Feature matrix of the whole dataset, transformed with the model's pipeline
+        y: Target vector of the whole dataset
+        train_idx: Indices of all training rows
+        new_idx: Indices of the training rows the model has not seen yet
+
+    Returns:
+        The updated model
+
+    Raises:
+        ValueError: If the algorithm can't be updated or the new rows can't be used
+    """
+    method = UPDATE_METHODS.get(algorithm)
+    if method is None:
+        raise ValueError(f"{algorithm} models can't be updated incrementally")
+    if not len(new_idx):
+        raise ValueError("None of the new rows were assigned to the training set")
+
+    if method == 'partial_fit':
+        model.partial_fit(X[new_idx], y[new_idx])
+    elif method == 'add_trees':
+        # Trees grown on a single class would disagree with the rest of the forest
+        if len(np.unique(y[new_idx])) < len(model.classes_):
+            raise ValueError("The new training rows must contain every class to grow trees on them")
+        n_trees = len(model.estimators_)
+        extra = max(1, round(n_trees * len(new_idx) / len(train_idx)))
+        model.set_params(warm_start=True, n_estimators=n_trees + extra)
+        model.fit(X[new_idx], y[new_idx])
+        model.set_params(warm_start=False)
+    else:
+        model.set_params(warm_start=True)
+        model.fit(X[train_idx], y[train_idx])
+        model.set_params(warm_start=False)
+
+    return model
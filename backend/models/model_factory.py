@@ -1,30 +1,92 @@
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.neural_network import MLPClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
+import time
+import inspect
+import importlib
+from functools import lru_cache
+import numpy as np
 
-def create_model(algorithm, random_state=42):
+from instrumentation import stage, record_stage
+
+# Estimator of each algorithm as 'module:Class' with its default parameters.
+# Classes are imported on first use, so importing this module (and starting
+# the API) doesn't pay for loading every scikit-learn estimator module.
+ALGORITHM_REGISTRY = {
+    'logistic_regression': ('sklearn.linear_model:LogisticRegression', {'max_iter': 1000}),
+    'random_forest': ('sklearn.ensemble:RandomForestClassifier', {}),
+    'svm': ('sklearn.svm:SVC', {'probability': True}),
+    'neural_network': ('sklearn.neural_network:MLPClassifier', {'max_iter': 1000}),
+    'sgd_logistic_regression': ('sklearn.linear_model:SGDClassifier', {'loss': 'log_loss'}),
+    'sgd_linear_svm': ('sklearn.linear_model:SGDClassifier', {'loss': 'hinge'}),
+    'incremental_neural_network': ('sklearn.neural_network:MLPClassifier', {}),
+    'naive_bayes': ('sklearn.naive_bayes:GaussianNB', {}),
+    'hist_gradient_boosting': ('sklearn.ensemble:HistGradientBoostingClassifier', {}),
+    'linear_svm': ('models.estimators:CalibratedLinearSVC', {}),
+    'nystroem_kernel': ('models.estimators:NystroemClassifier', {}),
+    'parallel_random_forest': ('sklearn.ensemble:RandomForestClassifier', {'n_jobs': -1, 'min_samples_leaf': 2})
+}
+
+# Training cost of each algorithm for n rows and d features, whether one fit
+# uses several cores, and the dataset size above which a fit is expected to
+# be slow (None if it scales linearly and is fine at any size). Clients use
+# this to warn before a slow choice is trained.
+ALGORITHM_COMPLEXITY = {
+    'logistic_regression': {'fit': 'O(n · d) per solver iteration', 'multi_core': False, 'max_rows': 5000000},
+    'random_forest': {'fit': 'O(t · n log n · √d) for t full-depth trees', 'multi_core': False, 'max_rows': 1000000},
+    'svm': {'fit': 'O(n² · d) to O(n³ · d) kernel fit, plus 5-fold Platt calibration', 'multi_core': False,
+            'max_rows': 20000},
+    'neural_network': {'fit': 'O(n · d · h) per epoch for h hidden units', 'multi_core': False, 'max_rows': 1000000},
+    'sgd_logistic_regression': {'fit': 'O(n · d) per epoch', 'multi_core': False, 'max_rows': None},
+    'sgd_linear_svm': {'fit': 'O(n · d) per epoch', 'multi_core': False, 'max_rows': None},
+    'incremental_neural_network': {'fit': 'O(n · d · h) per epoch for h hidden units', 'multi_core': False,
+                                   'max_rows': None},
+    'naive_bayes': {'fit': 'O(n · d), one pass', 'multi_core': False, 'max_rows': None},
+    'hist_gradient_boosting': {'fit': 'O(n · d) per tree on 255-bin histograms', 'multi_core': True,
+                               'max_rows': 20000000},
+    'linear_svm': {'fit': 'O(n · d) per solver iteration, 4 fits including calibration', 'multi_core': False,
+                   'max_rows': 5000000},
+    'nystroem_kernel': {'fit': 'O(n · m · d) for m = 200 kernel components', 'multi_core': False,
+                        'max_rows': 2000000},
+    'parallel_random_forest': {'fit': 'O(t · n log n · √d / cores) for t trees', 'multi_core': True,
+                               'max_rows': 5000000}
+}
+
+# Algorithms that can be trained chunk by chunk with partial_fit
+INCREMENTAL_ALGORITHMS = [
+    'sgd_logistic_regression',
+    'sgd_linear_svm',
+    'incremental_neural_network',
+    'naive_bayes'
+]
+
+def create_model(algorithm, random_state=42, **params):
     """
     Create a model based on the specified algorithm
     
     Args:
         algorithm: String indicating the type of algorithm to use
         random_state: Random seed for reproducibility
+        **params: Hyperparameters overriding the algorithm's defaults
         
     Returns:
         Initialized model instance
     """
-    if algorithm == 'logistic_regression':
-        return LogisticRegression(random_state=random_state, max_iter=1000)
-    elif algorithm == 'random_forest':
-        return RandomForestClassifier(random_state=random_state)
-    elif algorithm == 'svm':
-        return SVC(random_state=random_state, probability=True)
-    elif algorithm == 'neural_network':
-        return MLPClassifier(random_state=random_state, max_iter=1000)
-    else:
+    if algorithm not in ALGORITHM_REGISTRY:
         raise ValueError(f"Algorithm {algorithm} not implemented")
+    
+    estimator_path, defaults = ALGORITHM_REGISTRY[algorithm]
+    estimator_class = _estimator_class(estimator_path)
+    model = estimator_class(**defaults)
+    if 'random_state' in inspect.signature(estimator_class).parameters:
+        model.set_params(random_state=random_state)
+    
+    if params:
+        model.set_params(**params)
+    return model
+
+@lru_cache(maxsize=None)
+def _estimator_class(path):
+    """Import an estimator class given as 'module:Class'"""
+    module_name, class_name = path.split(':')
+    return getattr(importlib.import_module(module_name), class_name)
 
 def train_model(model, X_train, y_train):
     """
@@ -38,9 +100,77 @@ def train_model(model, X_train, y_train):
     Returns:
         Trained model
     """
-    model.fit(X_train, y_train)
+    with stage('fit'):
+        model.fit(X_train, y_train)
+    return model
+
+def train_model_incremental(model, chunks, classes):
+    """
+    Train a model chunk by chunk with partial_fit
+    
+    Args:
+        model: A model from INCREMENTAL_ALGORITHMS
+        chunks: Iterable of (X, y) training chunks
+        classes: Array of all target classes in the dataset
+        
+    Returns:
+        Trained model
+    """
+    # Only partial_fit is timed; reading and transforming the chunks is not
+    seconds = 0.0
+    for X_chunk, y_chunk in chunks:
+        if len(y_chunk):
+            start = time.perf_counter()
+            model.partial_fit(X_chunk, y_chunk, classes=classes)
+            seconds += time.perf_counter() - start
+    record_stage('fit', seconds)
     return model
 
+def labels_from_proba(model, X, proba):
+    """
+    Class labels of a model whose predict_proba output is already computed
+    
+    The most probable class is the model's prediction, except for SVC, whose
+    labels come from its decision function: its Platt-scaled probabilities
+    can disagree with them, so it is asked for its labels directly.
+    
+    Args:
+        model: Trained model
+        X: Feature matrix proba was computed on
+        proba: Output of model.predict_proba(X)
+        
+    Returns:
+        Predicted class labels
+    """
+    if getattr(model, 'probability', False):
+        return model.predict(X)
+    return model.classes_[np.argmax(proba, axis=1)]
+
+def predict_scores(model, X):
+    """
+    Run a single inference pass and derive class labels from its scores
+    
+    Args:
+        model: Trained model
+        X: Feature matrix
+        
+    Returns:
+        y_pred: Predicted class labels
+        y_score: Positive-class probabilities (or decision values for models
+            without predict_proba), or None if the model provides neither
+    """
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(X)
+        y_pred = labels_from_proba(model, X, proba)
+        return y_pred, proba[:, 1] if proba.shape[1] > 1 else None
+    
+    if hasattr(model, 'decision_function'):
+        decision = model.decision_function(X)
+        if decision.ndim == 1:
+            return model.classes_[(decision > 0).astype(int)], decision
+    
+    return model.predict(X), None
+
 def evaluate_model(model, X_test, y_test):
     """
     Evaluate a trained model on test data
@@ -53,40 +183,147 @@ def evaluate_model(model, X_test, y_test):
     Returns:
         Dictionary of evaluation metrics
     """
-    # Make predictions
-    y_pred = model.predict(X_test)
-    
-    # Calculate probabilities for ROC-AUC (if the model supports it)
-    try:
-        y_prob = model.predict_proba(X_test)[:, 1]
-        roc_auc = roc_auc_score(y_test, y_prob)
-    except (AttributeError, IndexError):
-        roc_auc = None
-    
-    # Calculate confusion matrix
-    tn, fp, fn, tp = confusion_matrix(y_test, y_pred).ravel()
-    
-    # Calculate other metrics
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred, zero_division=0)
-    recall = recall_score(y_test, y_pred, zero_division=0)
-    f1 = f1_score(y_test, y_pred, zero_division=0)
-    
-    # Return metrics as a dictionary
-    metrics = {
-        'accuracy': float(accuracy),
-        'precision': float(precision),
-        'recall': float(recall),
-        'f1_score': float(f1),
-        'confusion_matrix': {
-            'true_negative': int(tn),
-            'false_positive': int(fp),
-            'false_negative': int(fn),
-            'true_positive': int(tp)
+    with stage('predict'):
+        y_pred, y_score = predict_scores(model, X_test)
+    with stage('metrics'):
+        return compute_metrics(y_test, y_pred, y_score)
+
+def evaluate_models(models, X_test, y_test):
+    """
+    Evaluate several trained models on the same test data in one batched call
+    
+    Args:
+        models: List of trained models
+        X_test: Testing features
+        y_test: Testing target
+        
+    Returns:
+        List of metric dictionaries, one per model
+    """
+    predictions = [predict_scores(model, X_test) for model in models]
+    return compute_metrics_batch(
+        y_test,
+        [y_pred for y_pred, _ in predictions],
+        [y_score for _, y_score in predictions]
+    )
+
+def compute_metrics(y_test, y_pred, y_score=None):
+    """
+    Compute evaluation metrics from predictions
+    
+    Args:
+        y_test: True target values
+        y_pred: Predicted class labels
+        y_score: Positive-class scores for ROC-AUC, if available
+        
+    Returns:
+        Dictionary of evaluation metrics
+    """
+    return compute_metrics_batch(y_test, [y_pred], [y_score])[0]
+
+def compute_metrics_batch(y_test, y_pred_stack, y_score_stack=None):
+    """
+    Compute evaluation metrics for a stack of prediction vectors at once
+    
+    All confusion-matrix based metrics come from a single vectorized pass
+    over the stacked predictions, and ROC-AUC is computed from the rank sum
+    of the positive samples (one sort per score vector, ties averaged),
+    which equals the area under the ROC curve.
+    
+    Args:
+        y_test: True target values, shape (n_samples,)
+        y_pred_stack: Predicted class labels, shape (n_models, n_samples)
+        y_score_stack: Optional list of positive-class scores per model;
+            entries may be None for models without scores
+        
+    Returns:
+        List of metric dictionaries, one per prediction vector
+    """
+    positive = np.asarray(y_test) == 1
+    predicted = np.asarray(y_pred_stack) == 1
+    n_samples = positive.shape[0]
+    n_positive = int(positive.sum())
+    
+    # Confusion matrices of every model in one pass
+    tp = (predicted & positive).sum(axis=1)
+    fp = predicted.sum(axis=1) - tp
+    fn = n_positive - tp
+    tn = n_samples - tp - fp - fn
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = (tp + tn) / n_samples
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+    
+    roc_auc = [None] * len(predicted)
+    if y_score_stack is not None:
+        scored = [i for i, y_score in enumerate(y_score_stack) if y_score is not None]
+        if scored:
+            aucs = _roc_auc_batch(positive, np.asarray([y_score_stack[i] for i in scored], dtype=np.float64))
+            for i, auc in zip(scored, aucs):
+                roc_auc[i] = None if np.isnan(auc) else auc
+    
+    results = []
+    for i in range(len(predicted)):
+        metrics = {
+            'accuracy': float(accuracy[i]),
+            'precision': float(precision[i]),
+            'recall': float(recall[i]),
+            'f1_score': float(f1[i]),
+            'confusion_matrix': {
+                'true_negative': int(tn[i]),
+                'false_positive': int(fp[i]),
+                'false_negative': int(fn[i]),
+                'true_positive': int(tp[i])
+            }
         }
+        
+        if roc_auc[i] is not None:
+            metrics['roc_auc'] = float(roc_auc[i])
+        
+        results.append(metrics)
+    
+    return results
+
+def summarize_fold_metrics(fold_metrics):
+    """
+    Combine the metrics of every cross-validation fold
+    
+    Args:
+        fold_metrics: List of metric dictionaries, one per fold
+        
+    Returns:
+        Dictionary with the mean of each metric across folds, their standard
+        deviations under 'std', the confusion matrix summed over all folds
+        and the number of folds under 'cv_folds'
+    """
+    names = ['accuracy', 'precision', 'recall', 'f1_score']
+    # ROC-AUC is only reported when every fold could compute it
+    if all('roc_auc' in metrics for metrics in fold_metrics):
+        names.append('roc_auc')
+    
+    values = np.array([[metrics[name] for name in names] for metrics in fold_metrics], dtype=np.float64)
+    mean = values.mean(axis=0)
+    std = values.std(axis=0)
+    
+    summary = {name: float(mean[i]) for i, name in enumerate(names)}
+    summary['std'] = {name: float(std[i]) for i, name in enumerate(names)}
+    summary['confusion_matrix'] = {
+        cell: sum(metrics['confusion_matrix'][cell] for metrics in fold_metrics)
+        for cell in fold_metrics[0]['confusion_matrix']
     }
+    summary['cv_folds'] = len(fold_metrics)
     
-    if roc_auc is not None:
-        metrics['roc_auc'] = float(roc_auc)
+    return summary
+
+def _roc_auc_batch(positive, scores):
+    """ROC-AUC of each row of scores via the Mann-Whitney rank sum (NaN if undefined)"""
+    n_positive = int(positive.sum())
+    n_negative = positive.shape[0] - n_positive
+    if n_positive == 0 or n_negative == 0:
+        return np.full(scores.shape[0], np.nan)
     
-    return metrics 
\ No newline at end of file
+    from scipy.stats import rankdata
+    ranks = rankdata(scores, axis=1)
+    return (ranks[:, positive].sum(axis=1) - n_positive * (n_positive + 1) / 2) / (n_positive * n_negative)
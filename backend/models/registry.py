@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import OrderedDict
+
+from data.pipeline import load_pipeline
+from models.model_factory import labels_from_proba
+
+class ModelNotFoundError(Exception):
+    """Raised when no trained model artifact exists for a disease/algorithm pair"""
+
+def pipeline_path_for(model_path):
+    """Return where the preprocessing pipeline of a model artifact is saved"""
+    return os.path.splitext(model_path)[0] + '.pipeline.joblib'
+
+class ModelRegistry:
+    """
+    In-process cache of trained models
+
+    Models are resolved through the artifact store: the latest version of a
+    (disease, algorithm) pair, or a specific version when one is requested,
+    is loaded once together with its preprocessing pipeline and kept
+    resident with least-recently-used eviction once more than max_models
+    are loaded. A new version saved through /api/train is picked up on the
+    next call; a save still being written in the background is served from
+    memory. Pairs without any stored version fall back to a legacy
+    models/{disease}_{algo}.joblib file, reloaded when it changes on disk.
+    """
+
+    def __init__(self, store=None, model_dir='models', max_models=16):
+        self.store = store
+        self.model_dir = model_dir
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, disease, algorithm):
+        return os.path.join(self.model_dir, f"{disease}_{algorithm}.joblib")
+
+    def get(self, disease, algorithm, version=None):
+        """
+        Return the trained model for a disease/algorithm pair
+
+        Args:
+            disease: Disease identifier
+            algorithm: Algorithm identifier
+            version: Optional version id; the latest version by default
+
+        Returns:
+            model: Trained model instance
+            pipeline: FeaturePipeline the model was trained with, or None
+                for artifacts saved without one
+
+        Raises:
+            ModelNotFoundError: If the model has not been trained yet or the
+                requested version does not exist
+        """
+        if self.store is not None:
+            if version is None:
+                pending = self.store.pending(disease, algorithm)
+                if pending is not None:
+                    return pending[0], pending[1]
+                version = self.store.latest_version_id(disease, algorithm)
+            if version is not None:
+                return self._get_version(disease, algorithm, version)
+
+        return self._get_legacy(disease, algorithm)
+
+    def _get_version(self, disease, algorithm, version):
+        # Versions are immutable, so a cached entry never goes stale
+        key = (disease, algorithm, version)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[1], entry[2]
+
+            metadata = self.store.get_version(disease, algorithm, version)
+            if metadata is None:
+                raise ModelNotFoundError(f"No version {version} of the {algorithm} model for {disease}")
+            model, pipeline = self.store.load(metadata)
+            return self._remember(key, None, model, pipeline)
+
+    def _get_legacy(self, disease, algorithm):
+        key = (disease, algorithm, None)
+        path = self._path(disease, algorithm)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            raise ModelNotFoundError(f"No trained {algorithm} model for {disease}. Train it first.")
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._models.move_to_end(key)
+                return entry[1], entry[2]
+
+            import joblib
+            model = joblib.load(path)
+            pipeline_path = pipeline_path_for(path)
+            pipeline = load_pipeline(pipeline_path) if os.path.exists(pipeline_path) else None
+            return self._remember(key, mtime, model, pipeline)
+
+    def _remember(self, key, mtime, model, pipeline):
+        self._models[key] = (mtime, model, pipeline)
+        self._models.move_to_end(key)
+        while len(self._models) > self.max_models:
+            self._models.popitem(last=False)
+        return model, pipeline
+
+    def invalidate(self, disease=None, algorithm=None):
+        """Drop cached models, optionally only those matching a disease/algorithm"""
+        with self._lock:
+            for key in list(self._models):
+                if (disease is None or key[0] == disease) and (algorithm is None or key[1] == algorithm):
+                    del self._models[key]
+
+def predict_batch(model, X):
+    """
+    Score a batch of feature vectors in one vectorized call
+
+    Args:
+        model: Trained model
+        X: Feature matrix of shape (n_records, n_features)
+
+    Returns:
+        predictions: List of predicted class labels
+        probabilities: List of positive-class probabilities, or None if the
+            model does not support predict_proba
+    """
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(X)
+        predictions = labels_from_proba(model, X, proba)
+        return predictions.tolist(), proba[:, -1].tolist()
+
+    return model.predict(X).tolist(), None
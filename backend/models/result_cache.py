@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Bump when model configurations or metric definitions change so that
+# results computed by older code are never served.
+CACHE_VERSION = 4
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'results')
+
+def make_key(dataset_hash, disease, algorithm, test_size, random_state, **params):
+    """
+    Build a cache key for one (dataset, algorithm, parameters) training run
+
+    Args:
+        dataset_hash: Content hash of the dataset file
+        disease: Disease identifier
+        algorithm: Algorithm identifier
+        test_size: Proportion of the dataset used for testing
+        random_state: Random seed used for the split and the model
+        **params: Any additional parameters that affect the result
+
+    Returns:
+        Hex digest identifying the run
+    """
+    payload = {
+        'version': CACHE_VERSION,
+        'dataset': dataset_hash,
+        'disease': disease,
+        'algorithm': algorithm,
+        'test_size': float(test_size),
+        'random_state': int(random_state),
+        'params': params
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+class ResultCache:
+    """
+    Two-tier cache of training results
+
+    Results live in a bounded in-memory LRU and are also written as JSON files
+    to a bounded on-disk directory, so they survive restarts and are shared
+    between worker processes. Keys are content addressed (see make_key), so a
+    changed dataset simply produces new keys and stale entries age out.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_memory_entries=512, max_disk_entries=10000):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_entries = None
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Look up a cached result
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            # Refresh the modification time so disk eviction is least-recently-used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        """
+        Store a JSON-serializable result in both tiers
+
+        Args:
+            key: Cache key from make_key
+            value: Result to store
+        """
+        self._remember(key, value)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f)
+        existed = os.path.exists(path)
+        os.replace(tmp_path, path)
+
+        if not existed:
+            self._evict_disk()
+
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._disk_entries = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        with self._lock:
+            if self._disk_entries is None:
+                self._disk_entries = sum(1 for name in os.listdir(self.cache_dir) if name.endswith('.json'))
+            else:
+                self._disk_entries += 1
+
+            if self._disk_entries <= self.max_disk_entries:
+                return
+
+            # Drop the least recently used tenth of the entries in one sweep
+            paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+            paths.sort(key=_mtime)
+            excess = len(paths) - self.max_disk_entries + self.max_disk_entries // 10
+            for path in paths[:max(excess, 0)]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_entries = len(paths) - max(excess, 0)
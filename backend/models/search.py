@@ -0,0 +1,326 @@
+import json
+import math
+import time
+import numpy as np
+
+from models.executor import load_split, fit_and_evaluate, run_training_tasks, _split_indices
+from models.model_factory import create_model, train_model, evaluate_model
+from models.result_cache import make_key
+from data.dataset_store import open_store
+
+# Parameter spaces searched when a request does not provide one. A list is a
+# set of choices; a dict draws uniformly from [low, high] (log-uniformly with
+# 'log': true), as integers when both bounds are integers.
+DEFAULT_SEARCH_SPACES = {
+    'logistic_regression': {
+        'C': {'low': 0.001, 'high': 100.0, 'log': True}
+    },
+    'random_forest': {
+        'n_estimators': {'low': 50, 'high': 400},
+        'max_depth': [None, 4, 8, 16],
+        'min_samples_leaf': {'low': 1, 'high': 10},
+        'max_features': ['sqrt', 'log2', None]
+    },
+    'svm': {
+        'C': {'low': 0.01, 'high': 100.0, 'log': True},
+        'gamma': {'low': 0.0001, 'high': 1.0, 'log': True}
+    },
+    'neural_network': {
+        'hidden_layer_sizes': [[50], [100], [100, 50]],
+        'alpha': {'low': 0.00001, 'high': 0.1, 'log': True},
+        'learning_rate_init': {'low': 0.0001, 'high': 0.01, 'log': True}
+    },
+    'sgd_logistic_regression': {
+        'alpha': {'low': 0.000001, 'high': 0.01, 'log': True}
+    },
+    'sgd_linear_svm': {
+        'alpha': {'low': 0.000001, 'high': 0.01, 'log': True}
+    },
+    'incremental_neural_network': {
+        'hidden_layer_sizes': [[50], [100], [100, 50]],
+        'alpha': {'low': 0.00001, 'high': 0.1, 'log': True}
+    },
+    'naive_bayes': {
+        'var_smoothing': {'low': 1e-11, 'high': 1e-6, 'log': True}
+    },
+    'hist_gradient_boosting': {
+        'learning_rate': {'low': 0.01, 'high': 0.3, 'log': True},
+        'max_leaf_nodes': {'low': 15, 'high': 63},
+        'l2_regularization': {'low': 0.000001, 'high': 1.0, 'log': True}
+    },
+    'linear_svm': {
+        'C': {'low': 0.001, 'high': 100.0, 'log': True}
+    },
+    'nystroem_kernel': {
+        'gamma': {'low': 0.001, 'high': 1.0, 'log': True},
+        'C': {'low': 0.01, 'high': 100.0, 'log': True}
+    },
+    'parallel_random_forest': {
+        'n_estimators': {'low': 50, 'high': 400},
+        'min_samples_leaf': {'low': 1, 'high': 10}
+    }
+}
+
+SEARCH_METRICS = ['accuracy', 'precision', 'recall', 'f1_score', 'roc_auc']
+
+# Share of the training split held out to score configurations, so the test
+# split is only used to evaluate the final model
+VALIDATION_SIZE = 0.25
+
+# Smallest number of training rows the first rung may use
+MIN_ROWS = 50
+
+def _sample_value(distribution, rng):
+    """Draw one value from a parameter distribution"""
+    if isinstance(distribution, list):
+        return distribution[int(rng.integers(len(distribution)))]
+    if not isinstance(distribution, dict):
+        return distribution
+
+    try:
+        low, high = distribution['low'], distribution['high']
+    except KeyError:
+        raise ValueError(f"Range distributions need 'low' and 'high': {distribution}")
+
+    if distribution.get('log'):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+
+    if isinstance(low, int) and isinstance(high, int):
+        return int(round(value))
+    return float(value)
+
+def sample_configurations(space, n_candidates, rng):
+    """
+    Draw distinct configurations from a parameter space
+
+    Args:
+        space: Dictionary mapping parameter names to distributions
+        n_candidates: Number of configurations to draw
+        rng: numpy Generator
+
+    Returns:
+        List of up to n_candidates parameter dictionaries (fewer if the space
+        is too small to hold that many distinct configurations)
+    """
+    configs = []
+    seen = set()
+
+    for _ in range(n_candidates * 10):
+        if len(configs) == n_candidates:
+            break
+        config = {name: _sample_value(space[name], rng) for name in sorted(space)}
+        encoded = json.dumps(config, sort_keys=True)
+        if encoded not in seen:
+            seen.add(encoded)
+            configs.append(config)
+
+    return configs
+
+def fit_and_score_config(algorithm, random_state, store_path, test_size, params, n_rows):
+    """
+    Fit one configuration on a subset of the training rows and score it on the validation rows
+
+    Args:
+        algorithm: String indicating the type of algorithm to use
+        random_state: Random seed for the splits and the model
+        store_path: Store directory returned by data.dataset_store.materialize
+        test_size: Proportion of the dataset held out as the test split
+        params: Hyperparameters to evaluate
+        n_rows: Number of training rows to fit on
+
+    Returns:
+        Tuple of (None, metrics dictionary), with an 'error' entry instead of
+        metrics if the configuration could not be fitted
+    """
+    X_train, _, y_train, _ = load_split(store_path, test_size, random_state)
+    fit_idx, val_idx = _split_indices(len(X_train), VALIDATION_SIZE, random_state)
+    rows = fit_idx[:n_rows]
+
+    try:
+        model = train_model(create_model(algorithm, random_state, **params), X_train[rows], y_train[rows])
+        return None, evaluate_model(model, X_train[val_idx], y_train[val_idx])
+    except Exception as e:
+        return None, {'error': str(e)}
+
+def fit_and_evaluate_config(algorithm, random_state, store_path, test_size, params):
+    """
+    Fit a configuration on the whole training split and evaluate it on the test split
+
+    Returns:
+        Tuple of (trained model, metrics dictionary)
+    """
+    X_train, X_test, y_train, y_test = load_split(store_path, test_size, random_state)
+    return fit_and_evaluate(algorithm, random_state, X_train, X_test, y_train, y_test, params)
+
+def _rung_rows(n_fit, n_candidates, eta, min_rows):
+    """Training-set size of every rung, growing by eta up to all training rows"""
+    n_rungs = int(math.log(max(n_candidates, 1)) / math.log(eta) + 1e-9) + 1
+    while n_rungs > 1 and n_fit / eta ** (n_rungs - 1) < min_rows:
+        n_rungs -= 1
+    return [int(n_fit / eta ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+
+def _task_budgets(budgets, algorithms):
+    """List the budget of each task of a batch from the budgets per algorithm"""
+    if budgets is None:
+        return None
+    return [budgets.get(algorithm) for algorithm in algorithms]
+
+def run_search(disease, dataset_hash, store_path, spaces, test_size=0.2, random_state=42, budget_seconds=None,
+               n_candidates=27, eta=3, metric='accuracy', min_rows=MIN_ROWS, cache=None, n_workers=None,
+               budgets=None, should_cancel=None):
+    """
+    Tune several algorithms on one dataset with successive halving
+
+    Every algorithm starts with n_candidates sampled configurations fitted
+    on a small share of the training rows. After each rung only the best
+    1/eta of each algorithm's configurations survive, and the next rung
+    fits them on eta times as many rows, up to the whole training split.
+    The configurations of all algorithms in a rung are fitted as one
+    parallel batch. Before a rung starts, the search stops if the elapsed
+    time plus the duration of the previous rung would exceed the budget.
+    Already-evaluated (configuration, rows) pairs are served from the cache.
+    The best configuration of each algorithm is finally refitted on the
+    whole training split and evaluated on the test split. Every fit, the
+    refit included, is held to its algorithm's budget.
+
+    Args:
+        disease: Disease identifier
+        dataset_hash: Content hash of the dataset file, for cache keys
+        store_path: Store directory returned by data.dataset_store.materialize
+        spaces: Dictionary mapping algorithm identifiers to parameter spaces
+        test_size: Proportion of the dataset held out as the test split
+        random_state: Random seed for sampling, the splits and the models
+        budget_seconds: Optional wall-clock budget of the search
+        n_candidates: Number of configurations sampled per algorithm
+        eta: Halving rate
+        metric: Validation metric to maximize
+        min_rows: Smallest number of training rows the first rung may use
+        cache: Optional ResultCache for configuration scores
+        n_workers: Number of worker processes
+        budgets: Optional dictionary mapping each algorithm to the budget of
+            one of its fits (see executor.run_budgeted_task); a configuration
+            stopped for going over it is dropped with the status as its error
+        should_cancel: Optional callable checked before each rung; once it
+            returns True the search stops and nothing is refitted
+
+    Returns:
+        results: Dictionary mapping each algorithm to its best_params,
+            best_score, test metrics and search trace
+        models: Dictionary mapping each algorithm to its refitted best model
+    """
+    if metric not in SEARCH_METRICS:
+        raise ValueError(f"metric must be one of {', '.join(SEARCH_METRICS)}")
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(random_state)
+
+    survivors = {}
+    for algorithm, space in spaces.items():
+        survivors[algorithm] = sample_configurations(space, n_candidates, rng)
+        # Fail fast on unknown parameter names
+        if survivors[algorithm]:
+            create_model(algorithm, random_state, **survivors[algorithm][0])
+
+    X, _, _ = open_store(store_path)
+    n_train = len(_split_indices(len(X), test_size, random_state)[0])
+    n_fit = len(_split_indices(n_train, VALIDATION_SIZE, random_state)[0])
+
+    traces = {algorithm: [] for algorithm in spaces}
+    best = {}
+    stopped_early = False
+    cancelled = False
+    last_rung_seconds = 0.0
+
+    for rung, n_rows in enumerate(_rung_rows(n_fit, n_candidates, eta, min_rows)):
+        elapsed = time.perf_counter() - start
+        if rung > 0 and budget_seconds is not None and elapsed + last_rung_seconds > budget_seconds:
+            stopped_early = True
+            break
+        if should_cancel is not None and should_cancel():
+            stopped_early = cancelled = True
+            break
+        rung_start = time.perf_counter()
+
+        scored = {algorithm: [] for algorithm in survivors}
+        tasks = []
+        task_keys = []
+
+        def _record(algorithm, params, metrics, cached):
+            score = metrics.get(metric)
+            traces[algorithm].append({
+                'rung': rung,
+                'rows': n_rows,
+                'params': params,
+                'score': score,
+                'cached': cached,
+                'error': metrics.get('error')
+            })
+            if score is not None:
+                scored[algorithm].append((score, params))
+
+        for algorithm, configs in survivors.items():
+            for params in configs:
+                key = make_key(dataset_hash, disease, algorithm, test_size, random_state,
+                               search_params=params, rows=n_rows, validation_size=VALIDATION_SIZE)
+                metrics = cache.get(key) if cache is not None else None
+                if metrics is not None:
+                    _record(algorithm, params, metrics, True)
+                else:
+                    tasks.append((algorithm, random_state, store_path, test_size, params, n_rows))
+                    task_keys.append((algorithm, params, key))
+
+        def _finish(index, outcome):
+            algorithm, params, key = task_keys[index]
+            metrics = outcome[1]
+            if cache is not None and 'error' not in metrics:
+                cache.set(key, metrics)
+            _record(algorithm, params, metrics, False)
+
+        def _abort(index, status):
+            algorithm, params, _ = task_keys[index]
+            _record(algorithm, params, {'error': status}, False)
+
+        run_training_tasks(tasks, n_workers, return_models=False, task_fn=fit_and_score_config, on_result=_finish,
+                           stage_labels=[{'disease': disease, 'algorithm': algorithm} for algorithm, _, _ in task_keys],
+                           budgets=_task_budgets(budgets, [algorithm for algorithm, _, _ in task_keys]),
+                           on_abort=_abort)
+
+        for algorithm in survivors:
+            ranked = sorted(scored[algorithm], key=lambda entry: entry[0], reverse=True)
+            if ranked:
+                best[algorithm] = {'best_params': ranked[0][1], 'best_score': ranked[0][0], 'rows': n_rows}
+            survivors[algorithm] = [params for _, params in ranked[:max(len(ranked) // eta, 1)]]
+
+        last_rung_seconds = time.perf_counter() - rung_start
+
+    # Refit each algorithm's best configuration on the whole training split
+    refit = [algorithm for algorithm in spaces if algorithm in best and not cancelled]
+    refit_stopped = {}
+
+    def _refit_abort(index, status):
+        refit_stopped[refit[index]] = status
+
+    outcomes = run_training_tasks(
+        [(algorithm, random_state, store_path, test_size, best[algorithm]['best_params']) for algorithm in refit],
+        n_workers, task_fn=fit_and_evaluate_config,
+        stage_labels=[{'disease': disease, 'algorithm': algorithm} for algorithm in refit],
+        budgets=_task_budgets(budgets, refit),
+        on_abort=_refit_abort
+    )
+
+    results = {}
+    models = {}
+    for algorithm in spaces:
+        results[algorithm] = dict(best.get(algorithm, {'error': 'No configuration could be fitted'}),
+                                  trace=traces[algorithm], stopped_early=stopped_early)
+    for algorithm, outcome in zip(refit, outcomes):
+        if outcome is None:
+            results[algorithm]['status'] = refit_stopped[algorithm]
+            continue
+        results[algorithm]['metrics'], models[algorithm] = outcome[1], outcome[0]
+
+    return results, models
@@ -0,0 +1,96 @@
+"""
+Serve the MediCompare API with gunicorn
+
+The Flask app runs in gunicorn worker processes, each with a pool of
+threads. Training endpoints are capped by per-endpoint concurrency limits
+(see admission.py) and every worker gets enough threads for all of those
+slots plus --light-threads more, so cheap metadata endpoints such as
+/api/diseases and /metrics are answered even while every training slot is
+busy. Requests over a limit, and jobs submitted to a full queue, are answered
+at once with 429 and a Retry-After header. A train/compare request identical
+to one already running joins it without taking a slot.
+
+On SIGTERM or SIGINT each worker stops accepting connections and finishes its
+in-flight requests, then waits for its queued and running background jobs
+and pending model writes before exiting, all within --graceful-timeout.
+
+Background jobs live in the worker that created them, so keep a single
+worker (the default) when clients poll /api/jobs. Model fitting is spread
+over a process pool in any case; with several workers, each gets an equal
+share of the CPU cores unless MEDICOMPARE_WORKERS is set.
+
+Run from the backend directory:
+
+    python serve.py
+    python serve.py --bind 0.0.0.0:8000 --graceful-timeout 600
+"""
+import os
+import sys
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from admission import endpoint_limits
+
+def _worker_exit(server, worker):
+    """gunicorn hook: let accepted training finish before the worker process exits"""
+    import app as backend_app
+    backend_app.shutdown()
+
+def build_options(args):
+    """
+    Translate command-line arguments into gunicorn settings
+
+    Returns:
+        Dictionary of gunicorn setting names to values
+    """
+    return {
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': sum(endpoint_limits().values()) + args.light_threads,
+        'graceful_timeout': args.graceful_timeout,
+        'timeout': args.timeout,
+        'chdir': BACKEND_DIR,
+        'accesslog': '-',
+        'worker_exit': _worker_exit
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bind', default=os.environ.get('MEDICOMPARE_BIND', '127.0.0.1:5000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MEDICOMPARE_SERVER_WORKERS', 1)),
+                        help='gunicorn worker processes')
+    parser.add_argument('--light-threads', type=int, default=8,
+                        help='Threads per worker kept free for endpoints without a concurrency limit')
+    parser.add_argument('--graceful-timeout', type=int, default=300,
+                        help='Seconds a stopping worker gets to finish requests, jobs and model writes')
+    parser.add_argument('--timeout', type=int, default=60,
+                        help='Seconds without a heartbeat before a worker is considered hung and restarted')
+    args = parser.parse_args(argv)
+
+    from gunicorn.app.base import BaseApplication
+
+    class MediCompareServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    # Share the cores between the fit pools of all workers
+    os.environ.setdefault('MEDICOMPARE_WORKERS', str(max((os.cpu_count() or 1) // args.workers, 1)))
+
+    MediCompareServer(build_options(args)).run()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
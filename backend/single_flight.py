@@ -0,0 +1,95 @@
+import json
+import threading
+
+from instrumentation import REGISTRY, Counter
+
+COALESCED_CALLS = REGISTRY.register(Counter(
+    'medicompare_coalesced_calls_total',
+    'Calls to a single-flight group, by whether they ran the work or joined a call in flight',
+    ['group', 'role']
+))
+
+def make_flight_key(**params):
+    """Build a stable key from JSON-serializable request parameters"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is still running wait for it and receive the same
+    result, or the same exception. Nothing is kept once the call finishes,
+    so later calls run again (and hit the result cache instead).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, limiter=None):
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable key identifying the work
+            fn: Function called without arguments by the first caller
+            limiter: Optional ConcurrencyLimiter; only a caller that has to
+                run fn takes one of its slots, callers joining a call in
+                flight are always admitted
+
+        Returns:
+            fn's return value, shared by every caller for the key
+
+        Raises:
+            AdmissionRejectedError: If fn has to run and the limiter is full
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                if limiter is not None:
+                    limiter.acquire()
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            COALESCED_CALLS.inc(group=self.name, role='follower')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        COALESCED_CALLS.inc(group=self.name, role='leader')
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if limiter is not None:
+                limiter.release()
+        return call.result
+
+    def followers(self, key):
+        """Number of callers waiting on the call in flight for a key (0 if there is none)"""
+        with self._lock:
+            call = self._calls.get(key)
+            return call.followers if call is not None else 0
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The backend runs with backend/ as its working directory; make its modules importable from anywhere
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,32 @@
+import itertools
+
+import pytest
+
+from models import executor
+from models.model_factory import ALGORITHM_COMPLEXITY
+
+SINGLE_CORE = [algo for algo, info in ALGORITHM_COMPLEXITY.items() if not info['multi_core']]
+MULTI_CORE = [algo for algo, info in ALGORITHM_COMPLEXITY.items() if info['multi_core']]
+
+@pytest.mark.parametrize('cores', [1, 2, 4, 8, 16, 64])
+@pytest.mark.parametrize('n_single, n_multi', [(0, 1), (1, 0), (1, 1), (3, 2), (10, 2), (9, 3), (0, 6), (20, 4)])
+def test_concurrent_tasks_never_use_more_threads_than_cores(monkeypatch, cores, n_single, n_multi):
+    monkeypatch.setattr(executor.os, 'cpu_count', lambda: cores)
+    tasks = [(algo,) for algo in itertools.islice(itertools.cycle(SINGLE_CORE), n_single)]
+    tasks += [(algo,) for algo in itertools.islice(itertools.cycle(MULTI_CORE), n_multi)]
+
+    for n_workers in range(1, cores + 1):
+        threads = executor._task_threads(tasks, n_workers)
+        # The busiest set of tasks the pool can run at once
+        running = sorted(threads, reverse=True)[:n_workers]
+        assert sum(running) <= cores
+        assert min(threads) >= 1
+
+def test_multi_core_tasks_get_the_cores_single_core_tasks_leave(monkeypatch):
+    monkeypatch.setattr(executor.os, 'cpu_count', lambda: 16)
+    tasks = [(algo,) for algo in SINGLE_CORE[:9]] + [(MULTI_CORE[0],)] * 3
+
+    threads = executor._task_threads(tasks, 16)
+
+    assert threads[:9] == [1] * 9
+    assert threads[9:] == [2] * 3
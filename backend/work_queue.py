@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import uuid
+import shutil
+
+# Root of the shared queue directory. Point every API server and worker at the
+# same directory (e.g. an NFS mount) with MEDICOMPARE_QUEUE_DIR.
+DEFAULT_QUEUE_DIR = os.environ.get('MEDICOMPARE_QUEUE_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'queue'
+)
+
+# Seconds a claimed unit stays leased without a heartbeat before another
+# worker may take it over
+DEFAULT_LEASE_SECONDS = 60
+
+# Claims a unit gets before it is recorded as failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Dataset snapshots added this recently are kept even if no sweep refers to
+# them yet, since their sweep may still be being submitted
+DATASET_GRACE_SECONDS = 600
+
+STATES = ('pending', 'leased', 'done', 'failed')
+
+def _write_json(path, data):
+    """Write JSON atomically so readers never see a partial file"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    """Read a JSON file, or return None if it has been moved away"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _unit_files(directory):
+    try:
+        return sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    except FileNotFoundError:
+        return []
+
+class Lease:
+    """A work unit claimed by one worker until it completes, fails or the lease expires"""
+
+    def __init__(self, queue, sweep_id, unit):
+        self.queue = queue
+        self.sweep_id = sweep_id
+        self.unit = unit
+
+    @property
+    def path(self):
+        return self.queue._unit_path(self.sweep_id, 'leased', self.unit['id'])
+
+    def renew(self):
+        """Extend the lease; returns False if it was lost to the reaper"""
+        try:
+            os.utime(self.path)
+            return True
+        except FileNotFoundError:
+            return False
+
+class WorkQueue:
+    """
+    Durable queue of comparison work units in a shared directory
+
+    A sweep is a batch of (disease, algorithm, seed) units submitted
+    together. Each unit is a JSON file that moves between the state
+    directories of its sweep by rename, which is atomic on local file systems
+    and NFS, so any number of processes on any number of nodes can share the
+    queue without a lock server: whoever renames a pending file first owns it.
+
+    A worker holds a lease on the unit it runs by touching the leased file.
+    A leased file not touched for lease_seconds belongs to a worker that died
+    and is moved back to pending. Units whose fit raised are retried, and
+    recorded as failed after max_attempts claims.
+
+    Layout under root:
+        datasets/<disease>-<hash>.csv           dataset snapshots read by workers, removed
+                                                once no sweep in the queue refers to them
+        <sweep>/sweep.json                      shared parameters and unit ids
+        <sweep>/{pending,leased,done,failed}/   one <unit>.json per unit
+        <sweep>/CANCELLED                       present once the sweep is cancelled
+    """
+
+    def __init__(self, root=DEFAULT_QUEUE_DIR, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.join(root, 'datasets'), exist_ok=True)
+
+    def _unit_path(self, sweep_id, state, unit_id):
+        return os.path.join(self.root, sweep_id, state, f"{unit_id}.json")
+
+    def add_dataset(self, disease, file_path, data_hash):
+        """
+        Snapshot a dataset into the queue so workers on other nodes can read it
+
+        Sweeps refer to their snapshots from spec['datasets'] (see submit),
+        which keeps them from being collected.
+
+        Args:
+            disease: Disease identifier
+            file_path: Path to the CSV file
+            data_hash: Content hash of the file
+
+        Returns:
+            Path of the snapshot relative to the queue root
+        """
+        relative = os.path.join('datasets', f"{disease}-{data_hash[:16]}.csv")
+        path = os.path.join(self.root, relative)
+        try:
+            # Restart the grace period of a snapshot that is being reused
+            os.utime(path)
+        except FileNotFoundError:
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, path)
+        return relative
+
+    def dataset_path(self, relative):
+        """Absolute path of a dataset snapshot returned by add_dataset"""
+        return os.path.join(self.root, relative)
+
+    def submit(self, spec, units):
+        """
+        Queue a sweep of work units
+
+        Args:
+            spec: JSON-serializable parameters shared by every unit; its
+                optional 'datasets' dictionary maps names to paths returned
+                by add_dataset
+            units: List of unit dictionaries with an 'id' unique within the sweep
+
+        Returns:
+            Id of the sweep
+        """
+        # Ids sort by submission time, so workers drain older sweeps first
+        sweep_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(self.root, f"{sweep_id}.tmp")
+        for state in STATES:
+            os.makedirs(os.path.join(tmp_path, state))
+        _write_json(os.path.join(tmp_path, 'sweep.json'), {
+            'id': sweep_id,
+            'created_at': time.time(),
+            'lease_seconds': self.lease_seconds,
+            'max_attempts': self.max_attempts,
+            'spec': spec,
+            'units': [unit['id'] for unit in units]
+        })
+        for unit in units:
+            _write_json(os.path.join(tmp_path, 'pending', f"{unit['id']}.json"), dict(unit, attempts=0, errors=[]))
+
+        # Rename the complete sweep into place so workers never see half of it
+        os.rename(tmp_path, os.path.join(self.root, sweep_id))
+        return sweep_id
+
+    def sweeps(self):
+        """Ids of every sweep in the queue, oldest first"""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.endswith('.tmp') and os.path.exists(os.path.join(self.root, name, 'sweep.json'))
+        )
+
+    def sweep(self, sweep_id):
+        """Return a sweep's record (see submit), or None if it was purged"""
+        return _read_json(os.path.join(self.root, sweep_id, 'sweep.json'))
+
+    def cancel(self, sweep_id):
+        """Stop workers from claiming more units of a sweep; running units stop at their next check"""
+        with open(os.path.join(self.root, sweep_id, 'CANCELLED'), 'w'):
+            pass
+
+    def is_cancelled(self, sweep_id):
+        return os.path.exists(os.path.join(self.root, sweep_id, 'CANCELLED'))
+
+    def purge(self, sweep_id):
+        """Delete a sweep once its results have been collected, with the snapshots only it used"""
+        shutil.rmtree(os.path.join(self.root, sweep_id), ignore_errors=True)
+        self.collect_datasets()
+
+    def collect_datasets(self):
+        """
+        Remove dataset snapshots that no sweep in the queue refers to
+
+        Returns:
+            Number of snapshots removed
+        """
+        referenced = set()
+        for sweep_id in self.sweeps():
+            record = self.sweep(sweep_id)
+            if record is not None:
+                referenced.update(os.path.normpath(path) for path in record['spec'].get('datasets', {}).values())
+
+        removed = 0
+        grace_before = time.time() - DATASET_GRACE_SECONDS
+        for name in os.listdir(os.path.join(self.root, 'datasets')):
+            relative = os.path.join('datasets', name)
+            path = os.path.join(self.root, relative)
+            try:
+                if relative in referenced or os.path.getmtime(path) > grace_before:
+                    continue
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def claim(self, worker_id):
+        """
+        Lease the next pending unit of the oldest sweep that has one
+
+        Args:
+            worker_id: Name of the claiming worker, recorded in the unit
+
+        Returns:
+            A Lease, or None if no unit is pending
+        """
+        for sweep_id in self.sweeps():
+            if self.is_cancelled(sweep_id):
+                continue
+            record = self.sweep(sweep_id)
+            if record is None:
+                continue
+            self.reap(sweep_id)
+
+            for name in _unit_files(os.path.join(self.root, sweep_id, 'pending')):
+                unit_id = name[:-len('.json')]
+                pending = self._unit_path(sweep_id, 'pending', unit_id)
+                leased = self._unit_path(sweep_id, 'leased', unit_id)
+                try:
+                    # Touch first: rename keeps the modification time, which is the lease clock
+                    os.utime(pending)
+                    os.rename(pending, leased)
+                except FileNotFoundError:
+                    # Another worker claimed it first
+                    continue
+
+                unit = _read_json(leased)
+                if unit is None:
+                    continue
+                unit['attempts'] += 1
+                unit['worker'] = worker_id
+                if unit['attempts'] > record['max_attempts']:
+                    self._finish(sweep_id, unit, 'failed', {
+                        'status': 'failed',
+                        'error': f"Lease expired {record['max_attempts']} times"
+                    })
+                    continue
+                _write_json(leased, unit)
+                return Lease(self, sweep_id, unit)
+
+        return None
+
+    def reap(self, sweep_id):
+        """Move units whose lease expired back to pending so another worker retries them"""
+        record = self.sweep(sweep_id)
+        if record is None:
+            return
+        expired_before = time.time() - record['lease_seconds']
+        for name in _unit_files(os.path.join(self.root, sweep_id, 'leased')):
+            leased = os.path.join(self.root, sweep_id, 'leased', name)
+            try:
+                if os.path.getmtime(leased) < expired_before:
+                    os.rename(leased, os.path.join(self.root, sweep_id, 'pending', name))
+            except FileNotFoundError:
+                continue
+
+    def complete(self, lease, result):
+        """
+        Record the result of a leased unit
+
+        Args:
+            lease: Lease returned by claim
+            result: JSON-serializable result with at least a 'status'
+        """
+        self._finish(lease.sweep_id, lease.unit, 'done', result)
+
+    def fail(self, lease, error):
+        """Record a failed attempt: the unit goes back to pending, or to failed once it used all its attempts"""
+        unit = dict(lease.unit, errors=lease.unit['errors'] + [error])
+        record = self.sweep(lease.sweep_id)
+        if record is None or not lease.renew():
+            # Purged, or already re-queued by the reaper
+            return
+        if unit['attempts'] >= record['max_attempts']:
+            self._finish(lease.sweep_id, unit, 'failed', {'status': 'failed', 'error': error})
+            return
+        _write_json(self._unit_path(lease.sweep_id, 'leased', unit['id']), unit)
+        try:
+            os.rename(self._unit_path(lease.sweep_id, 'leased', unit['id']),
+                      self._unit_path(lease.sweep_id, 'pending', unit['id']))
+        except FileNotFoundError:
+            pass
+
+    def _finish(self, sweep_id, unit, state, result):
+        if not os.path.isdir(os.path.join(self.root, sweep_id, state)):
+            # The sweep was purged while the unit ran
+            return
+        _write_json(self._unit_path(sweep_id, state, unit['id']), dict(result, unit=unit))
+        # The unit may also have been re-queued by the reaper while it ran
+        for other in ('leased', 'pending'):
+            try:
+                os.remove(self._unit_path(sweep_id, other, unit['id']))
+            except FileNotFoundError:
+                pass
+
+    def counts(self, sweep_id):
+        """Number of units of a sweep in each state"""
+        return {state: len(_unit_files(os.path.join(self.root, sweep_id, state))) for state in STATES}
+
+    def results(self, sweep_id):
+        """
+        Return the finished units of a sweep
+
+        Returns:
+            Dictionary mapping unit id to its result (done or failed)
+        """
+        results = {}
+        for state in ('done', 'failed'):
+            for name in _unit_files(os.path.join(self.root, sweep_id, state)):
+                result = _read_json(os.path.join(self.root, sweep_id, state, name))
+                if result is not None:
+                    results[name[:-len('.json')]] = result
+        return results
@@ -8,6 +8,38 @@ import ComparisonChart from './components/ComparisonChart';
 import Footer from './components/Footer';
 import { fetchDiseases, fetchAlgorithms, trainModels, compareModels } from './services/api';
 
+const STOP_REASONS = {
+  timed_out: 'ran out of time',
+  memory_exceeded: 'ran out of memory',
+  cancelled: 'was cancelled',
+  failed: 'failed on every attempt'
+};
+
+// Remove algorithms that were stopped before finishing (they have no metrics) and describe them
+const separateStoppedResults = (resultsData) => {
+  const stopped = [];
+  const keepFinished = (diseaseName, diseaseResults) => diseaseResults.filter(result => {
+    if (result.metrics) {
+      return true;
+    }
+    stopped.push(`${result.algorithm_name} on ${diseaseName} ${STOP_REASONS[result.status] || 'did not finish'}`);
+    return false;
+  });
+
+  if (resultsData.results) {
+    return {
+      results: { ...resultsData, results: keepFinished(resultsData.disease_name, resultsData.results) },
+      stopped
+    };
+  }
+  const results = {};
+  Object.keys(resultsData).forEach(key => {
+    const entry = resultsData[key];
+    results[key] = entry && entry.results ? { ...entry, results: keepFinished(entry.disease_name, entry.results) } : entry;
+  });
+  return { results, stopped };
+};
+
 function App() {
   const [diseases, setDiseases] = useState([]);
   const [algorithms, setAlgorithms] = useState([]);
@@ -16,6 +48,7 @@ function App() {
   const [results, setResults] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [notice, setNotice] = useState(null);
 
   // Fetch available diseases and algorithms on component mount
   useEffect(() => {
@@ -63,6 +96,7 @@ function App() {
     try {
       setLoading(true);
       setError(null);
+      setNotice(null);
       setResults(null);
       
       let resultsData;
@@ -75,7 +109,11 @@ function App() {
         resultsData = await compareModels(selectedDiseases, selectedAlgorithms);
       }
       
-      setResults(resultsData);
+      const { results: finished, stopped } = separateStoppedResults(resultsData);
+      if (stopped.length > 0) {
+        setNotice(`Partial results: ${stopped.join('; ')}.`);
+      }
+      setResults(finished);
     } catch (err) {
       setError('An error occurred while comparing models. Please try again.');
       console.error('Error comparing models:', err);
@@ -110,6 +148,12 @@ function App() {
               <Typography color="error">{error}</Typography>
             </Box>
           )}
+
+          {notice && (
+            <Box bgcolor="#fff8e1" p={2} my={2} borderRadius={1}>
+              <Typography>{notice}</Typography>
+            </Box>
+          )}
           
           <Box className="card" mb={3}>
             <Typography variant="h5" component="h2" gutterBottom>
@@ -130,6 +174,7 @@ function App() {
               algorithms={algorithms} 
               selectedAlgorithms={selectedAlgorithms} 
               onChange={handleAlgorithmChange} 
+              datasetRows={Math.max(0, ...diseases.filter(d => selectedDiseases.includes(d.id)).map(d => d.rows || 0))}
             />
           </Box>
           
@@ -1,7 +1,7 @@
 import React from 'react';
 import { FormControl, FormGroup, FormControlLabel, Checkbox, Typography, Box, Grid } from '@mui/material';
 
-const AlgorithmSelection = ({ algorithms, selectedAlgorithms, onChange }) => {
+const AlgorithmSelection = ({ algorithms, selectedAlgorithms, onChange, datasetRows = 0 }) => {
   const handleChange = (event) => {
     const algoId = event.target.value;
     const isChecked = event.target.checked;
@@ -21,12 +21,22 @@ const AlgorithmSelection = ({ algorithms, selectedAlgorithms, onChange }) => {
       'logistic_regression': 'A statistical model that uses a logistic function to model binary outcomes.',
       'random_forest': 'An ensemble learning method that builds multiple decision trees during training.',
       'svm': 'A supervised learning model that analyzes data for classification and regression.',
-      'neural_network': 'A series of algorithms that attempt to recognize underlying relationships in data through processes that mimic the human brain.'
+      'neural_network': 'A series of algorithms that attempt to recognize underlying relationships in data through processes that mimic the human brain.',
+      'hist_gradient_boosting': 'Gradient-boosted trees grown on binned features; fast and accurate on large datasets.',
+      'linear_svm': 'A linear support vector machine with calibrated probabilities; scales to millions of rows.',
+      'nystroem_kernel': 'Approximates an RBF-kernel SVM with a fixed number of kernel features and a linear model.',
+      'parallel_random_forest': 'A random forest with smaller trees that are grown on all CPU cores at once.'
     };
     
     return descriptions[algoId] || 'A machine learning algorithm for classification';
   };
   
+  // Selected algorithms expected to be slow at the size of the largest selected dataset
+  const isSlow = (algorithm) => (
+    algorithm.complexity && algorithm.complexity.max_rows != null && datasetRows > algorithm.complexity.max_rows
+  );
+  const slowSelected = algorithms.filter(algo => selectedAlgorithms.includes(algo.id) && isSlow(algo));
+  
   return (
     <Box>
       {algorithms.length === 0 ? (
@@ -62,6 +72,12 @@ const AlgorithmSelection = ({ algorithms, selectedAlgorithms, onChange }) => {
                       <Typography variant="body2" color="textSecondary">
                         {getAlgorithmDescription(algorithm.id)}
                       </Typography>
+                      {algorithm.complexity && (
+                        <Typography variant="caption" display="block" color={isSlow(algorithm) ? 'error' : 'textSecondary'}>
+                          Training cost: {algorithm.complexity.fit}
+                          {algorithm.complexity.multi_core ? ' (multi-core)' : ''}
+                        </Typography>
+                      )}
                     </Box>
                   }
                 />
@@ -71,6 +87,13 @@ const AlgorithmSelection = ({ algorithms, selectedAlgorithms, onChange }) => {
         </Grid>
       )}
       
+      {slowSelected.length > 0 && (
+        <Typography color="error" sx={{ mt: 1 }}>
+          {slowSelected.map(algo => algo.name).join(', ')} will be slow on {datasetRows.toLocaleString()} rows.
+          Consider a scalable alternative such as Hist Gradient Boosting or Linear Svm.
+        </Typography>
+      )}
+      
       {algorithms.length > 0 && selectedAlgorithms.length === 0 && (
         <Typography color="error" sx={{ mt: 1 }}>
           Please select at least one algorithm
@@ -89,7 +89,7 @@ const ComparisonChart = ({ results }) => {
       // For single disease
       else if (results && results.results) {
         const metrics = ['accuracy', 'precision', 'recall', 'f1_score'];
-        if (results.results[0].metrics.roc_auc) {
+        if (results.results.length > 0 && results.results[0].metrics.roc_auc) {
           metrics.push('roc_auc');
         }
         
@@ -2,11 +2,47 @@ import axios from 'axios';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
+// Prefix of the localStorage entries holding metadata responses and their ETags
+const ETAG_CACHE_PREFIX = 'medicompare:etag:';
+
+const readCached = (url) => {
+  try {
+    return JSON.parse(window.localStorage.getItem(ETAG_CACHE_PREFIX + url));
+  } catch (error) {
+    return null;
+  }
+};
+
+const writeCached = (url, etag, data) => {
+  try {
+    window.localStorage.setItem(ETAG_CACHE_PREFIX + url, JSON.stringify({ etag, data }));
+  } catch (error) {
+    // Storage is full or disabled; the response is simply not cached
+  }
+};
+
+// GET a metadata endpoint, revalidating the copy kept from an earlier load with
+// If-None-Match so an unchanged response comes back as an empty 304
+const getWithETag = async (url) => {
+  const cached = readCached(url);
+  const response = await axios.get(url, {
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || (status === 304 && cached !== null)
+  });
+  if (response.status === 304) {
+    return cached.data;
+  }
+  const etag = response.headers.etag;
+  if (etag) {
+    writeCached(url, etag, response.data);
+  }
+  return response.data;
+};
+
 // Fetch the list of available diseases
 export const fetchDiseases = async () => {
   try {
-    const response = await axios.get(`${API_URL}/diseases`);
-    return response.data;
+    return await getWithETag(`${API_URL}/diseases`);
   } catch (error) {
     console.error('Error fetching diseases:', error);
     throw error;
@@ -16,8 +52,7 @@ export const fetchDiseases = async () => {
 // Fetch the list of available ML algorithms
 export const fetchAlgorithms = async () => {
   try {
-    const response = await axios.get(`${API_URL}/algorithms`);
-    return response.data;
+    return await getWithETag(`${API_URL}/algorithms`);
   } catch (error) {
     console.error('Error fetching algorithms:', error);
     throw error;
@@ -31,7 +66,8 @@ export const trainModels = async (disease, algorithms, options = {}) => {
       disease,
       algorithms,
       test_size: options.testSize || 0.2,
-      random_state: options.randomState || 42
+      random_state: options.randomState || 42,
+      cv_folds: options.cvFolds
     });
     return response.data;
   } catch (error) {
@@ -47,11 +83,66 @@ export const compareModels = async (diseases, algorithms, options = {}) => {
       diseases,
       algorithms,
       test_size: options.testSize || 0.2,
-      random_state: options.randomState || 42
+      random_state: options.randomState || 42,
+      cv_folds: options.cvFolds
     });
     return response.data;
   } catch (error) {
     console.error('Error comparing models:', error);
     throw error;
   }
-}; 
\ No newline at end of file
+}; 
+// Queue a training run in the background ('train' or 'compare')
+export const createJob = async (type, payload, options = {}) => {
+  try {
+    const response = await axios.post(`${API_URL}/jobs`, {
+      type,
+      ...payload,
+      test_size: options.testSize || 0.2,
+      random_state: options.randomState || 42,
+      cv_folds: options.cvFolds
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error creating job:', error);
+    throw error;
+  }
+};
+
+// Fetch the status and partial results of a background job
+export const fetchJob = async (jobId) => {
+  try {
+    const response = await axios.get(`${API_URL}/jobs/${jobId}`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching job:', error);
+    throw error;
+  }
+};
+
+// Subscribe to the progress events of a background job.
+// Returns a function that closes the stream.
+export const subscribeToJob = (jobId, { onProgress, onCompleted, onFailed, onCancelled } = {}) => {
+  const source = new EventSource(`${API_URL}/jobs/${jobId}/events`);
+
+  source.addEventListener('progress', (event) => {
+    if (onProgress) onProgress(JSON.parse(event.data));
+  });
+
+  source.addEventListener('completed', (event) => {
+    source.close();
+    if (onCompleted) onCompleted(JSON.parse(event.data).result);
+  });
+
+  source.addEventListener('failed', (event) => {
+    source.close();
+    if (onFailed) onFailed(new Error(JSON.parse(event.data).error));
+  });
+
+  source.addEventListener('cancelled', (event) => {
+    source.close();
+    if (onCancelled) onCancelled(JSON.parse(event.data).result);
+  });
+
+  return () => source.close();
+};
@@ -1,18 +1,20 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-import joblib
+import io
 import sys
+import json
+import math
+import hashlib
 
 # Add the backend directory to the path
 sys.path.append('backend')
 
 # Import backend modules
-from models.model_factory import create_model, train_model, evaluate_model
-from data.data_processor import load_data, preprocess_data, split_data
+from models.model_factory import create_model, train_model, evaluate_model, ALGORITHM_COMPLEXITY
+from data.data_processor import load_data, preprocess_data, split_data, dataset_hash, dataset_rows
+from models.artifact_store import ArtifactStore
 
 # Set page configuration
 st.set_page_config(
@@ -56,20 +58,59 @@ ALGORITHMS = [
     'logistic_regression',
     'random_forest',
     'svm',
-    'neural_network'
+    'neural_network',
+    'hist_gradient_boosting',
+    'linear_svm',
+    'nystroem_kernel',
+    'parallel_random_forest'
 ]
 
+# Algorithms selected when the app opens
+DEFAULT_ALGORITHMS = ALGORITHMS[:4]
+
+@st.cache_resource
+def get_artifact_store():
+    """One artifact store (and background writer) shared by every script run"""
+    return ArtifactStore()
+
+# Training runs kept per session before the oldest is dropped
+MAX_SESSION_RUNS = 20
+
+# Rows shown in the sample data preview
+PREVIEW_ROWS = 5
+
+def current_file_hash(file_path):
+    """Content hash of a dataset file, writing the sample dataset first if it is missing"""
+    if not os.path.exists(file_path):
+        load_data(file_path)
+    return dataset_hash(file_path)
+
+# The file hash argument keys these caches, so they refresh when a file changes
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_dataset(file_path, file_hash):
+    """Load a dataset once per file version"""
+    return load_data(file_path)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_preprocessed(disease, file_path, file_hash):
+    """Preprocess a dataset once per file version"""
+    return preprocess_data(load_dataset(file_path, file_hash), disease)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_preview(file_path, file_hash):
+    """Read only the first rows of a dataset"""
+    return pd.read_csv(file_path, nrows=PREVIEW_ROWS)
+
 # Helper functions
 def format_name(name):
     """Format a snake_case string to Title Case"""
     return name.replace('_', ' ').title()
 
-def plot_metrics_comparison(results, metric_name='accuracy'):
-    """Create a bar plot comparing algorithms by a specific metric"""
+def draw_metric_bars(ax, results, metric_name):
+    """Draw a bar plot comparing algorithms by a specific metric onto an axis"""
     algorithms = [result['algorithm_name'] for result in results]
     metrics = [result['metrics'][metric_name] for result in results]
     
-    fig, ax = plt.subplots(figsize=(10, 5))
     bars = ax.bar(algorithms, metrics, color='skyblue')
     ax.set_xlabel('Algorithm')
     ax.set_ylabel(format_name(metric_name))
@@ -84,23 +125,146 @@ def plot_metrics_comparison(results, metric_name='accuracy'):
                     xytext=(0, 3),  # 3 points vertical offset
                     textcoords="offset points",
                     ha='center', va='bottom')
-    
-    return fig
 
-def plot_confusion_matrix(cm_data, algorithm_name):
-    """Create a heatmap for the confusion matrix"""
+def draw_confusion_matrix(ax, cm_data, algorithm_name):
+    """Draw a heatmap of a confusion matrix onto an axis"""
+    import seaborn as sns
+    
     cm = np.array([[cm_data['true_negative'], cm_data['false_positive']], 
                   [cm_data['false_negative'], cm_data['true_positive']]])
     
-    fig, ax = plt.subplots(figsize=(8, 6))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax)
     ax.set_xlabel('Predicted')
     ax.set_ylabel('Actual')
-    ax.set_title(f'Confusion Matrix - {algorithm_name}')
+    ax.set_title(algorithm_name)
     ax.set_xticklabels(['Negative', 'Positive'])
     ax.set_yticklabels(['Negative', 'Positive'])
+
+def figure_to_png(fig):
+    """Render a figure to PNG bytes and release it"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    fig.clear()
+    return buffer.getvalue()
+
+def results_hash(results):
+    """Content hash of a list of results, used to key rendered charts"""
+    return hashlib.sha256(json.dumps(results, sort_keys=True).encode('utf-8')).hexdigest()
+
+# Charts are rendered with matplotlib.figure.Figure rather than pyplot, so no
+# figure stays registered with pyplot after rendering. The leading underscore
+# keeps Streamlit from hashing the results; result_key identifies them.
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_metrics_chart(result_key, _results):
+    """Render all metric comparisons of a run into one multi-panel PNG"""
+    # Plotting libraries are only imported once a chart is drawn
+    from matplotlib.figure import Figure
+    
+    fig = Figure(figsize=(16, 10))
+    axes = fig.subplots(2, 2)
+    for ax, metric_name in zip(axes.flat, ['accuracy', 'f1_score', 'precision', 'recall']):
+        draw_metric_bars(ax, _results, metric_name)
+    fig.tight_layout()
+    
+    return figure_to_png(fig)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_confusion_matrices(result_key, _results):
+    """Render the confusion matrices of a run into one grid PNG"""
+    from matplotlib.figure import Figure
+    
+    n_cols = min(3, len(_results))
+    n_rows = math.ceil(len(_results) / n_cols)
+    fig = Figure(figsize=(5 * n_cols, 4 * n_rows))
+    axes = fig.subplots(n_rows, n_cols, squeeze=False)
+    for ax, result in zip(axes.flat, _results):
+        draw_confusion_matrix(ax, result['metrics']['confusion_matrix'], result['algorithm_name'])
+    # Hide the unused cells of the last row
+    for ax in axes.flat[len(_results):]:
+        ax.set_visible(False)
+    fig.tight_layout()
     
-    return fig
+    return figure_to_png(fig)
+
+def train_and_evaluate(disease, algorithms, test_size, random_state, file_hash):
+    """Train every selected algorithm on the cached preprocessed dataset and collect its metrics"""
+    file_path = DISEASES[disease]['filename']
+    df = load_dataset(file_path, file_hash)
+    X, y = load_preprocessed(disease, file_path, file_hash)
+    X_train, X_test, y_train, y_test = split_data(X, y, test_size, random_state)
+    
+    results = []
+    
+    # Train and evaluate each requested algorithm
+    for algo in algorithms:
+        model = create_model(algo, random_state)
+        trained_model = train_model(model, X_train, y_train)
+        
+        # Evaluate the model
+        metrics = evaluate_model(trained_model, X_test, y_test)
+        
+        # Save the model as a new version in the background
+        get_artifact_store().save_async(disease, algo, trained_model, metadata={
+            'metrics': metrics,
+            'dataset_hash': file_hash,
+            'params': {'test_size': test_size, 'random_state': random_state}
+        })
+        
+        results.append({
+            'algorithm': algo,
+            'algorithm_name': format_name(algo),
+            'metrics': metrics
+        })
+    
+    return {
+        'disease': disease,
+        'results': results,
+        'n_samples': len(df),
+        'n_train': len(X_train),
+        'n_test': len(X_test)
+    }
+
+def show_results(run):
+    """Display the metrics table and charts of a training run"""
+    results = run['results']
+    
+    # Display dataset information
+    st.subheader("Dataset Information")
+    st.write(f"Dataset: **{format_name(run['disease'])}**")
+    st.write(f"Total samples: **{run['n_samples']}**")
+    st.write(f"Training samples: **{run['n_train']}**")
+    st.write(f"Testing samples: **{run['n_test']}**")
+    
+    # Display results in a tabular format
+    st.subheader("Performance Metrics")
+    
+    # Create a DataFrame for the metrics
+    metrics_df = pd.DataFrame([
+        {
+            'Algorithm': result['algorithm_name'],
+            'Accuracy': result['metrics']['accuracy'],
+            'Precision': result['metrics']['precision'],
+            'Recall': result['metrics']['recall'],
+            'F1 Score': result['metrics']['f1_score'],
+            'ROC AUC': result['metrics'].get('roc_auc', 'N/A')
+        }
+        for result in results
+    ])
+    
+    st.dataframe(metrics_df, hide_index=True)
+    
+    # Display visualization tabs
+    st.subheader("Visualizations")
+    viz_tab1, viz_tab2 = st.tabs(["Metrics Comparison", "Confusion Matrices"])
+    
+    # Each chart is rendered once per distinct set of results
+    result_key = results_hash(results)
+    
+    with viz_tab1:
+        st.image(render_metrics_chart(result_key, results), use_column_width=True)
+    
+    with viz_tab2:
+        st.image(render_confusion_matrices(result_key, results), use_column_width=True)
 
 # Main app layout
 st.title("🩺 MediCompare AI")
@@ -123,10 +287,24 @@ st.sidebar.info(DISEASES[selected_disease]['description'])
 selected_algorithms = st.sidebar.multiselect(
     "Select ML Algorithms",
     options=ALGORITHMS,
-    default=ALGORITHMS,
+    default=DEFAULT_ALGORITHMS,
     format_func=format_name
 )
 
+# Warn about algorithms whose training cost grows too fast for this dataset
+dataset_path = DISEASES[selected_disease]['filename']
+if os.path.exists(dataset_path):
+    n_rows = dataset_rows(dataset_path)
+    slow = [
+        algo for algo in selected_algorithms
+        if ALGORITHM_COMPLEXITY[algo]['max_rows'] is not None and n_rows > ALGORITHM_COMPLEXITY[algo]['max_rows']
+    ]
+    if slow:
+        st.sidebar.warning(
+            f"{', '.join(format_name(algo) for algo in slow)} will be slow on {n_rows:,} rows "
+            f"({'; '.join(ALGORITHM_COMPLEXITY[algo]['fit'] for algo in slow)})."
+        )
+
 # Test size and random state parameters
 test_size = st.sidebar.slider("Test Size", 0.1, 0.5, 0.2, 0.05)
 random_state = st.sidebar.number_input("Random State", 1, 100, 42)
@@ -136,105 +314,46 @@ if not selected_algorithms:
     st.warning("Please select at least one algorithm to continue.")
     st.stop()
 
+# Trained runs of this session, keyed by their settings, so widget changes
+# don't throw results away
+if 'runs' not in st.session_state:
+    st.session_state.runs = {}
+    st.session_state.last_run_key = None
+
+file_hash = current_file_hash(DISEASES[selected_disease]['filename'])
+run_key = (selected_disease, tuple(selected_algorithms), test_size, random_state, file_hash)
+
 # Train models button
 if st.button("Train and Compare Models"):
     try:
         # Display loading spinner
         with st.spinner("Training models and calculating metrics..."):
-            # Load and preprocess the data
-            df = load_data(DISEASES[selected_disease]['filename'])
-            X, y = preprocess_data(df, selected_disease)
-            X_train, X_test, y_train, y_test = split_data(X, y, test_size, random_state)
-            
-            results = []
-            
-            # Train and evaluate each requested algorithm
-            for algo in selected_algorithms:
-                model = create_model(algo, random_state)
-                trained_model = train_model(model, X_train, y_train)
-                
-                # Evaluate the model
-                metrics = evaluate_model(trained_model, X_test, y_test)
-                
-                # Save the model
-                model_dir = "backend/models"
-                os.makedirs(model_dir, exist_ok=True)
-                model_filename = f"{model_dir}/{selected_disease}_{algo}.joblib"
-                joblib.dump(trained_model, model_filename)
-                
-                results.append({
-                    'algorithm': algo,
-                    'algorithm_name': format_name(algo),
-                    'metrics': metrics
-                })
-                
-        # Display dataset information
-        st.subheader("Dataset Information")
-        st.write(f"Dataset: **{format_name(selected_disease)}**")
-        st.write(f"Total samples: **{len(df)}**")
-        st.write(f"Training samples: **{len(X_train)}**")
-        st.write(f"Testing samples: **{len(X_test)}**")
-        
-        # Display results in a tabular format
-        st.subheader("Performance Metrics")
+            run = train_and_evaluate(selected_disease, selected_algorithms, test_size, random_state, file_hash)
         
-        # Create a DataFrame for the metrics
-        metrics_df = pd.DataFrame([
-            {
-                'Algorithm': result['algorithm_name'],
-                'Accuracy': result['metrics']['accuracy'],
-                'Precision': result['metrics']['precision'],
-                'Recall': result['metrics']['recall'],
-                'F1 Score': result['metrics']['f1_score'],
-                'ROC AUC': result['metrics'].get('roc_auc', 'N/A')
-            }
-            for result in results
-        ])
+        runs = st.session_state.runs
+        runs.pop(run_key, None)
+        runs[run_key] = run
+        while len(runs) > MAX_SESSION_RUNS:
+            runs.pop(next(iter(runs)))
+        st.session_state.last_run_key = run_key
         
-        st.dataframe(metrics_df, hide_index=True)
-        
-        # Display visualization tabs
-        st.subheader("Visualizations")
-        viz_tab1, viz_tab2 = st.tabs(["Metrics Comparison", "Confusion Matrices"])
-        
-        with viz_tab1:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.pyplot(plot_metrics_comparison(results, 'accuracy'))
-                
-            with col2:
-                st.pyplot(plot_metrics_comparison(results, 'f1_score'))
-                
-            col3, col4 = st.columns(2)
-            
-            with col3:
-                st.pyplot(plot_metrics_comparison(results, 'precision'))
-                
-            with col4:
-                st.pyplot(plot_metrics_comparison(results, 'recall'))
-        
-        with viz_tab2:
-            # Create a grid of confusion matrices
-            cols = st.columns(min(3, len(results)))
-            for i, result in enumerate(results):
-                col_idx = i % 3
-                with cols[col_idx]:
-                    cm_data = result['metrics']['confusion_matrix']
-                    st.write(f"**{result['algorithm_name']}**")
-                    st.pyplot(plot_confusion_matrix(cm_data, result['algorithm_name']))
-                    
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
 
-# If no button pressed, show instructions
+if run_key in st.session_state.runs:
+    show_results(st.session_state.runs[run_key])
+
+elif st.session_state.last_run_key in st.session_state.runs:
+    st.info("Showing the last results, trained with different settings. Click 'Train and Compare Models' to train with the current ones.")
+    show_results(st.session_state.runs[st.session_state.last_run_key])
+
+# If nothing has been trained yet, show instructions
 else:
     st.info("👈 Select a disease dataset and algorithm(s) from the sidebar, then click 'Train and Compare Models' to see the results.")
     
     # Display sample data
     st.subheader("Sample Data")
     try:
-        sample_df = load_data(DISEASES[selected_disease]['filename'])
-        st.dataframe(sample_df.head())
+        st.dataframe(load_preview(DISEASES[selected_disease]['filename'], file_hash))
     except Exception as e:
-        st.error(f"Could not load sample data: {str(e)}") 
\ No newline at end of file
+        st.error(f"Could not load sample data: {str(e)}")